@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import importlib.util
+import json
+import os
+import sys
+import getopt
+
+# import name of this plugin, when it is loaded outside of QGIS
+PACKAGE_NAME = "easy_right_angle_draw"
+
+
+def load_plugin_package():
+    """ Imports this repository as package, relative imports need a parent package. """
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+
+    repo_location = os.path.dirname(os.path.abspath(__file__))  # dieses Verzeichnis
+    spec = importlib.util.spec_from_file_location(PACKAGE_NAME,
+                                                  os.path.join(repo_location, "__init__.py"),
+                                                  submodule_search_locations=[repo_location])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = module
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def write_output(data: dict, output: str = ""):
+    text = json.dumps(data, indent=2)
+    if not output:
+        print(text)
+        return
+
+    with open(output, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def run_replay(argv):
+    opts, args = getopt.getopt(argv, "t:p:o:r", [])
+    map_ = dict(opts)
+
+    load_plugin_package()
+    from easy_right_angle_draw.benchmarks import start_application
+    from easy_right_angle_draw.benchmarks.replay import replay
+
+    app = start_application()
+    result = replay(map_['-t'], map_.get('-p'), realtime='-r' in map_)
+    write_output(result.to_dict(), map_.get('-o', ''))
+
+    app.exitQgis()
+    return result
+
+
+def run_suite(argv):
+    opts, args = getopt.getopt(argv, "s:p:d:n:o:b:t:u", [])
+    map_ = dict(opts)
+
+    load_plugin_package()
+    from easy_right_angle_draw.benchmarks import start_application, history
+    from easy_right_angle_draw.benchmarks.suite import DEFAULT_SIZES, PROVIDERS, run_suite, qgis_version
+
+    sizes = [int(x) for x in map_['-s'].split(",")] if '-s' in map_ else DEFAULT_SIZES
+    providers = map_['-p'].split(",") if '-p' in map_ else PROVIDERS
+
+    app = start_application()
+    results = run_suite(sizes, providers, map_.get('-d', ''), int(map_.get('-n', 200)))
+    record = history.new_record(results, qgis_version=qgis_version())
+    app.exitQgis()
+
+    history.append_history(map_.get('-o', "benchmark_history.json"), record)
+
+    baseline = map_.get('-b', "benchmark_baseline.json")
+    if '-u' in map_:
+        history.write_baseline(baseline, record)
+        return record
+
+    if os.path.exists(baseline):
+        return check(history.load_baseline(baseline), record, float(map_.get('-t', history.DEFAULT_TOLERANCE)))
+
+    return record
+
+
+def run_writers(argv):
+    opts, args = getopt.getopt(argv, "s:n:d:o:", [])
+    map_ = dict(opts)
+
+    load_plugin_package()
+    from easy_right_angle_draw.benchmarks import start_application
+    from easy_right_angle_draw.benchmarks.writers import run_writers as run
+
+    sizes = [int(x) for x in map_['-s'].split(",")] if '-s' in map_ else [10_000, 1_000_000]
+
+    app = start_application()
+    results = run(sizes, int(map_.get('-n', 500)), map_.get('-d', ''))
+    write_output(results, map_.get('-o', ''))
+
+    app.exitQgis()
+    return results
+
+
+def run_check(argv):
+    opts, args = getopt.getopt(argv, "o:b:t:", [])
+    map_ = dict(opts)
+
+    load_plugin_package()
+    from easy_right_angle_draw.benchmarks import history
+
+    records = history.load_history(map_.get('-o', "benchmark_history.json"))
+    if not records:
+        print("no benchmark history found")
+        return None
+
+    baseline = history.load_baseline(map_.get('-b', "benchmark_baseline.json"))
+    return check(baseline, records[-1], float(map_.get('-t', history.DEFAULT_TOLERANCE)))
+
+
+def check(baseline: dict, record: dict, tolerance: float):
+    from easy_right_angle_draw.benchmarks import history
+
+    regressions = history.check_regressions(baseline, record, tolerance)
+    for text in regressions:
+        print("REGRESSION", text)
+
+    if regressions:
+        sys.exit(1)
+
+    print("no regressions found")
+    return record
+
+
+COMMANDS = {
+    "replay": run_replay,
+    "suite": run_suite,
+    "check": run_check,
+    "writers": run_writers,
+}
+
+
+def from_sys_args(argv):
+    """ Run benchmarks from console without QGIS desktop.
+
+        .. code-block::
+
+            # replay a recorded drawing session (menu "Interaktionen aufzeichnen")
+            python path/to/plugin/benchmark.py replay -t "path/to/trace.jsonl" -p "manual/project/Dreieck.qgs"
+
+        Arguments for `replay`:
+
+            * `-t` trace file
+            * `-p` optional project file, defaults to recorded project
+            * `-o` optional json output file, defaults to stdout
+            * `-r` wait between events like recorded
+
+        .. code-block::
+
+            # synthetic line networks, results are appended to the history file
+            python path/to/plugin/benchmark.py suite -s 10000,100000 -p memory,gpkg
+
+            # compare last history record with the stored baseline
+            python path/to/plugin/benchmark.py check
+
+        Arguments for `suite` and `check`:
+
+            * `-s` comma separated vertex counts, defaults to 10k, 100k, 1M and 10M
+            * `-p` comma separated providers "memory" and "gpkg", defaults to both
+            * `-d` folder for GeoPackage files, defaults to current folder
+            * `-n` measurements per metric, defaults to 200
+            * `-o` json history file, defaults to "benchmark_history.json"
+            * `-b` json baseline file, defaults to "benchmark_baseline.json"
+            * `-t` allowed slowdown before a regression is reported, defaults to 0.25
+            * `-u` store this run as new baseline (`suite` only)
+
+        .. code-block::
+
+            # current provider writes against the GeoPackage writer on local GeoPackages
+            python path/to/plugin/benchmark.py writers -s 10000,1000000 -n 500
+
+        Arguments for `writers`:
+
+            * `-s` comma separated vertex counts of the existing networks, defaults to 10k and 1M
+            * `-n` written corners per run, defaults to 500
+            * `-d` folder for GeoPackage files, defaults to current folder
+            * `-o` optional json output file, defaults to stdout
+
+    """
+    if not argv or argv[0] not in COMMANDS:
+        print(from_sys_args.__doc__)
+        return None
+
+    return COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == "__main__":
+    from_sys_args(sys.argv[1:])
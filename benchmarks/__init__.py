@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import os
+
+from typing import List, Optional
+
+
+def start_application(argv: Optional[List[str]] = None):
+    """ Starts a QgsApplication without a desktop for benchmarks and replays.
+        Uses the Qt offscreen platform, when no other platform is set.
+
+        :param argv: command line arguments for Qt, defaults to an empty list
+        :return: initialized QgsApplication
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from qgis.core import QgsApplication
+
+    app = QgsApplication.instance()
+    if app is not None:
+        return app
+
+    app = QgsApplication(argv or [], True)
+    app.initQgis()
+
+    return app
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import os
+
+from qgis.PyQt.QtCore import QEvent, QPointF, Qt
+from qgis.PyQt.QtGui import QKeyEvent, QMouseEvent
+from qgis.PyQt.QtWidgets import QAction, QMainWindow, QMenu, QToolBar, QWidget
+
+from qgis.core import (QgsApplication, QgsLocatorFilter, QgsMapLayer, QgsPointXY,
+                       QgsProject, QgsVectorLayer)
+from qgis.gui import QgisInterface, QgsMapCanvas, QgsMessageBar, QgsStatusBar
+
+from typing import Dict, List, Optional
+
+
+class HeadlessInterface(QgisInterface):
+    """ QgisInterface without QGIS desktop, backed by a QMainWindow with an offscreen QgsMapCanvas
+        and the real `QgsProject.instance()`.
+
+        Implements the parts of the interface used by this plugin and `ModuleBase`:
+        map canvas, message bar, status bar, main window with menu and tool bars,
+        plugin menu, tool bar icons, active layer and locator filters.
+
+        Needs a running QgsApplication, see `benchmarks.start_application`.
+
+        :param canvas: map canvas to use, defaults to a new one
+        :param size: canvas size in pixels
+    """
+
+    def __init__(self, canvas: Optional[QgsMapCanvas] = None, size=(1000, 800)):
+        super().__init__()
+
+        self._main_window = QMainWindow()
+        self._canvas = canvas if canvas is not None else QgsMapCanvas()
+        self._message_bar = QgsMessageBar()
+        self._status_bar = QgsStatusBar()
+        self._plugin_menu = self._main_window.menuBar().addMenu("Erweiterungen")
+        self._plugin_menus: Dict[str, QMenu] = {}
+        self._plugin_toolbar = self._main_window.addToolBar("Plugins")
+        self._plugin_toolbar.setObjectName("mPluginToolBar")
+        self._active_layer: Optional[QgsMapLayer] = None
+        self._locator_filters: List[QgsLocatorFilter] = []
+
+        self._canvas.setFixedSize(*size)
+        self._main_window.setCentralWidget(self._canvas)
+        self._main_window.statusBar().addPermanentWidget(self._status_bar, 1)
+        self._main_window.show()
+
+        # canvas layers follow the checked layers of the layer tree, snapping follows the project like in QGIS
+        project = QgsProject.instance()
+        root = project.layerTreeRoot()
+        self._canvas.setDestinationCrs(project.crs())
+        self._connections = [
+            (project.crsChanged, self._update_canvas_crs),
+            (root.visibilityChanged, self._update_canvas_layers),
+            (root.addedChildren, self._update_canvas_layers),
+            (root.removedChildren, self._update_canvas_layers),
+            (project.layersAdded, self._update_canvas_layers),
+            (project.layersRemoved, self._update_canvas_layers),
+            (project.snappingConfigChanged, self._update_snapping_config),
+        ]
+        for signal, slot in self._connections:
+            signal.connect(slot)
+        self._update_canvas_layers()
+
+        QgsApplication.processEvents()
+
+    def _update_canvas_crs(self):
+        self._canvas.setDestinationCrs(QgsProject.instance().crs())
+
+    def _update_canvas_layers(self, *_):
+        self._canvas.setLayers(QgsProject.instance().layerTreeRoot().checkedLayers())
+        self._update_snapping_config()
+
+    def _update_snapping_config(self, *_):
+        self._canvas.snappingUtils().setConfig(QgsProject.instance().snappingConfig())
+
+    # noinspection PyPep8Naming
+    def mapCanvas(self) -> QgsMapCanvas:
+        return self._canvas
+
+    # noinspection PyPep8Naming
+    def mapCanvases(self) -> List[QgsMapCanvas]:
+        return [self._canvas]
+
+    # noinspection PyPep8Naming
+    def messageBar(self) -> QgsMessageBar:
+        return self._message_bar
+
+    # noinspection PyPep8Naming
+    def statusBarIface(self) -> QgsStatusBar:
+        return self._status_bar
+
+    # noinspection PyPep8Naming
+    def mainWindow(self) -> QMainWindow:
+        return self._main_window
+
+    # noinspection PyPep8Naming
+    def activeLayer(self) -> Optional[QgsMapLayer]:
+        return self._active_layer
+
+    # noinspection PyPep8Naming
+    def setActiveLayer(self, layer: Optional[QgsMapLayer]) -> bool:
+        if layer is not None and QgsProject.instance().mapLayer(layer.id()) is None:
+            return False
+
+        self._active_layer = layer
+        # current layer of the canvas is the layer of the ActiveLayer snapping mode
+        self._canvas.setCurrentLayer(layer)
+        self.currentLayerChanged.emit(layer)
+        return True
+
+    # noinspection PyPep8Naming
+    def addVectorLayer(self, path: str, base_name: str, provider_key: str) -> Optional[QgsVectorLayer]:
+        layer = QgsVectorLayer(path, base_name, provider_key)
+        if not layer.isValid():
+            return None
+
+        QgsProject.instance().addMapLayer(layer)
+        self.setActiveLayer(layer)
+        return layer
+
+    # noinspection PyPep8Naming
+    def pluginMenu(self) -> QMenu:
+        return self._plugin_menu
+
+    # noinspection PyPep8Naming
+    def addPluginToMenu(self, name: str, action: QAction):
+        menu = self._plugin_menus.get(name)
+        if menu is None:
+            menu = self._plugin_menu.addMenu(name)
+            self._plugin_menus[name] = menu
+        menu.addAction(action)
+
+    # noinspection PyPep8Naming
+    def removePluginMenu(self, name: str, action: QAction):
+        menu = self._plugin_menus.get(name)
+        if menu is None:
+            return
+
+        menu.removeAction(action)
+        if not menu.actions():
+            self._plugin_menu.removeAction(menu.menuAction())
+            del self._plugin_menus[name]
+
+    # noinspection PyPep8Naming
+    def addToolBarIcon(self, action: QAction) -> int:
+        self._plugin_toolbar.addAction(action)
+        return 0
+
+    # noinspection PyPep8Naming
+    def removeToolBarIcon(self, action: QAction):
+        self._plugin_toolbar.removeAction(action)
+
+    # noinspection PyPep8Naming
+    def addToolBar(self, name: str) -> QToolBar:
+        return self._main_window.addToolBar(name)
+
+    # noinspection PyPep8Naming
+    def addToolBarWidget(self, widget: QWidget) -> QAction:
+        return self._plugin_toolbar.addWidget(widget)
+
+    # noinspection PyPep8Naming
+    def registerLocatorFilter(self, filter_: QgsLocatorFilter):
+        self._locator_filters.append(filter_)
+
+    # noinspection PyPep8Naming
+    def deregisterLocatorFilter(self, filter_: QgsLocatorFilter):
+        if filter_ in self._locator_filters:
+            self._locator_filters.remove(filter_)
+
+    # noinspection PyPep8Naming
+    def invalidateLocatorResults(self):
+        ...
+
+    # noinspection PyPep8Naming
+    def zoomFull(self):
+        self._canvas.zoomToFullExtent()
+
+    # noinspection PyPep8Naming
+    def zoomToActiveLayer(self):
+        if self._active_layer is not None:
+            self._canvas.setExtent(self._canvas.mapSettings().layerExtentToOutputExtent(
+                self._active_layer, self._active_layer.extent()))
+
+    def close(self):
+        """ closes main window and canvas """
+        for signal, slot in self._connections:
+            try:
+                signal.disconnect(slot)
+            except (RuntimeError, TypeError):
+                ...
+        self._connections.clear()
+
+        self._main_window.close()
+        self._main_window.deleteLater()
+        QgsApplication.processEvents()
+
+
+class PluginHarness:
+    """ Drives the plugin lifecycle without QGIS desktop:
+        `initGui`, tool activation, simulated clicks/keys, `unload` and `reload`.
+
+        .. code-block:: python
+
+            app = start_application()
+            harness = PluginHarness()
+            harness.iface.addVectorLayer("lines.gpkg|layername=lines", "lines", "ogr")
+            harness.load()
+            harness.activate_tool()
+            for point in (xa, a, b):
+                harness.click(point)
+            harness.unload()
+
+        :param iface: headless interface, defaults to a new one
+    """
+
+    def __init__(self, iface: Optional[HeadlessInterface] = None):
+        self.iface = iface if iface is not None else HeadlessInterface()
+        self.plugin = None
+
+    def load(self):
+        """ loads the plugin like QGIS does: `classFactory` and `initGui` """
+        from qgis import utils
+        from .. import classFactory
+
+        # ModuleBase and add_action use the global interface
+        utils.iface = self.iface
+
+        self.plugin = classFactory(self.iface)
+        self.plugin.initGui()
+
+        # needed by `qgis_unload_keyerror` during unload
+        utils._plugin_modules.setdefault(os.path.basename(self.plugin.plugin_dir), [])
+
+        return self.plugin
+
+    def unload(self):
+        """ unloads the plugin like the plugin manager """
+        if self.plugin is None:
+            return
+
+        self.plugin.unload()
+        self.plugin = None
+        QgsApplication.processEvents()
+
+    def reload(self):
+        """ unloads and loads a new plugin instance, emits `pluginReloaded` like `qgis.utils.reloadPlugin` """
+        self.unload()
+        plugin = self.load()
+        plugin.pluginReloaded.emit()
+        return plugin
+
+    def activate_tool(self):
+        """ triggers the drawing action, like a click on the tool bar button """
+        self.plugin.draw_action.trigger()
+        QgsApplication.processEvents()
+        return getattr(self.plugin, "triangle_tool", None)
+
+    def to_pixel(self, point: QgsPointXY) -> QPointF:
+        """ converts a point in canvas crs into a canvas pixel position """
+        pixel = self.iface.mapCanvas().getCoordinateTransform().transform(point)
+        return QPointF(pixel.x(), pixel.y())
+
+    def _send_mouse(self, type_: QEvent.Type, pos: QPointF, button: Qt.MouseButton, buttons: Qt.MouseButtons):
+        event = QMouseEvent(type_, pos, button, buttons, Qt.NoModifier)
+        QgsApplication.sendEvent(self.iface.mapCanvas().viewport(), event)
+
+    def move(self, point: QgsPointXY):
+        """ moves the mouse to a point in canvas crs """
+        self._send_mouse(QEvent.MouseMove, self.to_pixel(point), Qt.NoButton, Qt.NoButton)
+        QgsApplication.processEvents()
+
+    def click(self, point: QgsPointXY, button: Qt.MouseButton = Qt.LeftButton):
+        """ simulates move, press and release on a point in canvas crs """
+        pos = self.to_pixel(point)
+        self._send_mouse(QEvent.MouseMove, pos, Qt.NoButton, Qt.NoButton)
+        self._send_mouse(QEvent.MouseButtonPress, pos, button, button)
+        self._send_mouse(QEvent.MouseButtonRelease, pos, button, Qt.NoButton)
+        QgsApplication.processEvents()
+
+    def key(self, key: int):
+        """ simulates a key press and release on the canvas """
+        canvas = self.iface.mapCanvas()
+        QgsApplication.sendEvent(canvas, QKeyEvent(QEvent.KeyPress, key, Qt.NoModifier))
+        QgsApplication.sendEvent(canvas, QKeyEvent(QEvent.KeyRelease, key, Qt.NoModifier))
+        QgsApplication.processEvents()
+
+    def close(self):
+        self.unload()
+        self.iface.close()
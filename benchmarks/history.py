@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import json
+import os
+import platform
+
+from datetime import datetime
+
+from typing import Any, Dict, List
+
+# relative slowdown, which is still no regression (0.25 = 25 % slower)
+DEFAULT_TOLERANCE = 0.25
+
+
+def new_record(results: Dict[str, Dict[str, float]], **info) -> Dict[str, Any]:
+    """ creates a new history record for benchmark results
+
+        :param results: {case name: {metric: value}}
+        :param info: additional information, e.g. qgis version
+    """
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    record.update(info)
+    return record
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    """ loads all records from a history file, missing file means empty history """
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def append_history(path: str, record: Dict[str, Any]):
+    """ appends a record to the history file """
+    history = load_history(path)
+    history.append(record)
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(history, file, indent=2)
+
+
+def write_baseline(path: str, record: Dict[str, Any]):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(record, file, indent=2)
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def higher_is_better(metric: str) -> bool:
+    """ throughput metrics end with `_per_s`, all others are durations """
+    return metric.endswith("_per_s")
+
+
+def check_regressions(baseline: Dict[str, Any], record: Dict[str, Any],
+                      tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """ Compares a record with the baseline.
+        Only metrics available in both records will be compared.
+
+        :param baseline: baseline record
+        :param record: record to check
+        :param tolerance: allowed relative slowdown
+        :return: list with a readable text for each regression
+    """
+    regressions = []
+
+    for case, metrics in record["results"].items():
+        base_metrics = baseline["results"].get(case, {})
+
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if not base or value is None:
+                continue
+
+            if higher_is_better(metric):
+                slowdown = base / value - 1 if value else float("inf")
+            else:
+                slowdown = value / base - 1
+
+            if slowdown > tolerance:
+                regressions.append(f"{case} {metric}: {value:.4g} (baseline {base:.4g}, "
+                                   f"{slowdown * 100:.1f} % slower)")
+
+    return regressions
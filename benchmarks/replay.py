@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import statistics
+
+from time import perf_counter, sleep
+
+from qgis.PyQt.QtCore import QEvent, QPointF, Qt
+from qgis.PyQt.QtGui import QKeyEvent, QMouseEvent
+
+from qgis.core import (QgsApplication, QgsCoordinateReferenceSystem, QgsFeatureRequest,
+                       QgsProject, QgsRectangle, QgsVectorLayer, QgsWkbTypes)
+
+from typing import Any, Dict, List, Optional
+
+from ..modules.draw import RightAngleTool
+from ..submodules.qgis.canvas.event_recorder import read_trace
+from .headless import HeadlessInterface
+
+
+class ReplayResult:
+    """ Result of a replayed trace.
+
+        :param trace: trace file path
+    """
+
+    def __init__(self, trace: str):
+        self.trace = trace
+        self.latencies: Dict[str, List[float]] = {}
+        self.geometries: List[str] = []
+        self.duration = 0.0
+
+    def add_latency(self, kind: str, seconds: float):
+        self.latencies.setdefault(kind, []).append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ latency statistics in milliseconds per event type """
+        result = {}
+        for kind, values in self.latencies.items():
+            ordered = sorted(values)
+            result[kind] = {
+                "count": len(ordered),
+                "mean_ms": statistics.fmean(ordered) * 1000,
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace": self.trace,
+            "duration_s": self.duration,
+            "summary": self.summary(),
+            "latencies_ms": {k: [v * 1000 for v in values] for k, values in self.latencies.items()},
+            "geometries": self.geometries,
+        }
+
+
+def _target_layer(project: QgsProject, header: Dict[str, Any]) -> QgsVectorLayer:
+    """ returns an in memory copy of the recorded target layer,
+        replays never change the source data
+    """
+    info = header.get("layer") or {}
+
+    layer = project.mapLayer(info.get("id", ""))
+    if layer is None:
+        layers = project.mapLayersByName(info.get("name", ""))
+        layer = layers[0] if layers else None
+
+    if isinstance(layer, QgsVectorLayer) and layer.isValid():
+        copy = layer.materialize(QgsFeatureRequest())
+        copy.setName(layer.name())
+    else:
+        # data source is missing, draw into an empty layer
+        wkb_type = QgsWkbTypes.parseType(info.get("wkb_type", "LineString"))
+        geometry = QgsWkbTypes.displayString(wkb_type) or "LineString"
+        copy = QgsVectorLayer(f"{geometry}?crs={info.get('crs') or header['crs']}",
+                              info.get("name", "replay"), "memory")
+
+    # in the layer tree: rendered, part of the canvas layers and found by all layers snapping
+    project.addMapLayer(copy, False)
+    project.layerTreeRoot().insertLayer(0, copy)
+
+    if isinstance(layer, QgsVectorLayer):
+        # copy uses the same snapping settings as the source layer
+        config = project.snappingConfig()
+        config.setIndividualLayerSettings(copy, config.individualLayerSettings(layer))
+        project.setSnappingConfig(config)
+
+    if info.get("editable"):
+        copy.startEditing()
+
+    return copy
+
+
+def _create_interface(header: Dict[str, Any], layer: QgsVectorLayer) -> HeadlessInterface:
+    iface = HeadlessInterface(size=header["size"])
+    canvas = iface.mapCanvas()
+    canvas.setDestinationCrs(QgsCoordinateReferenceSystem(header["crs"]))
+    canvas.setExtent(QgsRectangle(*header["extent"]))
+    iface.setActiveLayer(layer)
+    return iface
+
+
+def _mouse_event(entry: Dict[str, Any]) -> QMouseEvent:
+    types = {"move": QEvent.MouseMove, "release": QEvent.MouseButtonRelease}
+    return QMouseEvent(types[entry["type"]],
+                       QPointF(entry["x"], entry["y"]),
+                       Qt.MouseButton(entry["button"]),
+                       Qt.MouseButtons(entry["buttons"]),
+                       Qt.KeyboardModifiers(entry["modifiers"]))
+
+
+def replay(trace: str, project_file: Optional[str] = None, realtime: bool = False) -> ReplayResult:
+    """ Replays a trace recorded by `CanvasEventRecorder` against an offscreen canvas.
+        A QgsApplication must be running, see `benchmarks.start_application`.
+
+        Each event is sent through the canvas to `MapToolQgisSnap`,
+        the latency is measured until all resulting Qt events are processed.
+        The drawing tool gets the recorded options (two click mode, windowed snapping, ...).
+
+        :param trace: trace file path
+        :param project_file: project to load, defaults to the recorded project
+        :param realtime: wait between events like recorded, defaults to False
+        :return: latencies and created geometries (WKT)
+    """
+    entries = read_trace(trace)
+    header = next(entries)
+
+    project = QgsProject.instance()
+    project_file = project_file or header.get("project")
+    if project_file and not project.read(project_file):
+        raise FileNotFoundError(f"project '{project_file}' could not be read")
+
+    layer = _target_layer(project, header)
+    iface = _create_interface(header, layer)
+    canvas = iface.mapCanvas()
+
+    existing_ids = set(layer.allFeatureIds())
+
+    # recorded tool options, traces of version 1 use the defaults
+    options = dict(header.get("options") or {})
+    if options.get("windowed"):
+        # the replayed layer is a memory copy, which is never cached
+        options["windowed"] = dict(options["windowed"], cache=None)
+
+    tool = RightAngleTool(iface, layer, drawings=[], **options)
+    tool.start()
+
+    result = ReplayResult(trace)
+    start = perf_counter()
+    last_time = 0.0
+
+    for entry in entries:
+        kind = entry["type"]
+
+        if realtime:
+            sleep(max(0.0, entry["t"] - last_time))
+            last_time = entry["t"]
+
+        begin = perf_counter()
+        if kind == "extent":
+            canvas.setExtent(QgsRectangle(*entry["extent"]))
+        elif kind == "key":
+            event = QKeyEvent(QEvent.KeyRelease, entry["key"], Qt.KeyboardModifiers(entry["modifiers"]))
+            QgsApplication.sendEvent(canvas, event)
+        else:
+            QgsApplication.sendEvent(canvas.viewport(), _mouse_event(entry))
+
+        QgsApplication.processEvents()
+        result.add_latency(kind, perf_counter() - begin)
+
+    result.duration = perf_counter() - start
+
+    # like ending the session in QGIS: writers and journals are closed, buffered features written
+    tool.unload()
+    QgsApplication.processEvents()
+
+    for feature in layer.getFeatures():
+        if feature.id() not in existing_ids:
+            result.geometries.append(feature.geometry().asWkt())
+
+    project.removeMapLayer(layer.id())
+    iface.close()
+
+    return result
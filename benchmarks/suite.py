@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import os
+import statistics
+
+from random import Random
+from time import perf_counter
+
+from qgis.PyQt.QtCore import QPoint
+
+from qgis.core import (Qgis, QgsApplication, QgsPointXY, QgsProject, QgsRectangle,
+                       QgsSnappingConfig, QgsTolerance, QgsVectorLayer)
+
+from typing import Callable, Dict, Iterable, List
+
+from ..modules.draw import RightAngleTool
+from .headless import HeadlessInterface
+from .synthetic import create_geopackage_layer, create_memory_layer
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+PROVIDERS = ("memory", "gpkg")
+
+# visible canvas area in layer units, zoomed in like a digitizer
+VIEW_SIZE = 500.0
+
+
+def _timed(callable_: Callable, count: int) -> List[float]:
+    values = []
+    for _ in range(count):
+        start = perf_counter()
+        callable_()
+        values.append(perf_counter() - start)
+    return values
+
+
+def _ms(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def _snapping_config() -> QgsSnappingConfig:
+    config = QgsSnappingConfig()
+    config.setEnabled(True)
+    config.setMode(QgsSnappingConfig.AllLayers)
+    config.setTypeFlag(QgsSnappingConfig.VertexFlag | QgsSnappingConfig.SegmentFlag)
+    config.setTolerance(12)
+    config.setUnits(QgsTolerance.Pixels)
+    return config
+
+
+def _create_interface(layer: QgsVectorLayer) -> HeadlessInterface:
+    QgsProject.instance().addMapLayer(layer)
+    QgsProject.instance().setSnappingConfig(_snapping_config())
+
+    iface = HeadlessInterface(size=(1000, 800))
+    iface.setActiveLayer(layer)
+    canvas = iface.mapCanvas()
+    canvas.setDestinationCrs(layer.crs())
+
+    centre = layer.extent().center()
+    half = VIEW_SIZE / 2
+    canvas.setExtent(QgsRectangle(centre.x() - half, centre.y() - half, centre.x() + half, centre.y() + half))
+    return iface
+
+
+class BenchmarkCase:
+    """ One layer with canvas and started `RightAngleTool`.
+
+        :param layer: synthetic layer
+        :param samples: count of measurements per metric
+        :param seed: random seed for clicks
+    """
+
+    def __init__(self, layer: QgsVectorLayer, samples: int = 200, seed: int = 0):
+        self.layer = layer
+        self.samples = samples
+        self.random = Random(seed)
+
+        self.iface = _create_interface(layer)
+        self.canvas = self.iface.mapCanvas()
+        self.drawings = []
+        self.tool = RightAngleTool(self.iface, layer, drawings=self.drawings)
+        self.tool.start()
+
+    def random_pixel(self) -> QPoint:
+        return QPoint(self.random.randrange(self.canvas.width()), self.random.randrange(self.canvas.height()))
+
+    def random_point(self) -> QgsPointXY:
+        extent = self.canvas.extent()
+        return QgsPointXY(self.random.uniform(extent.xMinimum(), extent.xMaximum()),
+                          self.random.uniform(extent.yMinimum(), extent.yMaximum()))
+
+    def corner_points(self) -> List[QgsPointXY]:
+        """ three clicks, which create a valid corner """
+        xa = self.random_point()
+        a = QgsPointXY(xa.x() + self.random.uniform(10, 50), xa.y() + self.random.uniform(-5, 5))
+        b = QgsPointXY(a.x() + self.random.uniform(10, 50), a.y() + self.random.uniform(10, 50))
+        return [xa, a, b]
+
+    def snap(self) -> Dict[str, float]:
+        """ snap query latency of `MapToolQgisSnap`, first query includes building the snapping index """
+        map_tool = self.tool._tool
+        first = _timed(lambda: map_tool._get_point(self.random_pixel()), 1)[0]
+        values = _timed(lambda: map_tool._get_point(self.random_pixel()), self.samples)
+
+        result = {"snap_first_ms": first * 1000}
+        result.update({f"snap_{k}": v for k, v in _ms(values).items()})
+        return result
+
+    def corners(self) -> Dict[str, float]:
+        """ corner computation throughput of `RightAngleTool._get_shapes`, the construction of preview and commit
+            (`RightAngleTool._construct`, local projection on geographic layers)
+        """
+        triples = [self.corner_points() for _ in range(self.samples * 10)]
+        start = perf_counter()
+        for points in triples:
+            self.tool._get_shapes(points)
+        return {"corners_per_s": len(triples) / (perf_counter() - start)}
+
+    def preview(self) -> Dict[str, float]:
+        """ preview redraw cost of `RightAngleTool._draw` with two clicked points """
+        values = []
+        for _ in range(self.samples):
+            xa, a, b = self.corner_points()
+            self.tool._points = [xa, a]
+            values.append(_timed(lambda: self.tool._draw(b), 1)[0])
+
+        self.tool._points = []
+        self.tool._draw_tool.remove_all_drawings()
+        return {f"preview_{k}": v for k, v in _ms(values).items()}
+
+    def commit(self) -> Dict[str, float]:
+        """ commit throughput of `RightAngleTool._finalize` with `flush` and the next snap query after a commit """
+        map_tool = self.tool._tool
+        commits = max(1, self.samples // 10)
+        commit_values = []
+        snap_values = []
+
+        for _ in range(commits):
+            self.tool._points = self.corner_points()
+            # flushed like on undo: buffered writers are measured with their commit
+            commit_values.append(_timed(lambda: (self.tool._finalize(), self.tool.flush()), 1)[0])
+            self.tool._points = []
+            snap_values.append(_timed(lambda: map_tool._get_point(self.random_pixel()), 1)[0])
+
+        result = {"commit_per_s": commits / sum(commit_values)}
+        result.update({f"snap_after_commit_{k}": v for k, v in _ms(snap_values).items()})
+        return result
+
+    def run(self) -> Dict[str, float]:
+        result = {}
+        # commit is the last one, it changes the layer
+        for benchmark in (self.snap, self.corners, self.preview, self.commit):
+            result.update(benchmark())
+        return result
+
+    def close(self):
+        self.tool._tool.unload_tool()
+        self.tool._draw_tool.remove_all_drawings()
+        QgsProject.instance().removeMapLayer(self.layer.id())
+        self.iface.close()
+        QgsApplication.processEvents()
+
+
+def create_layer(vertices: int, provider: str, work_dir: str) -> QgsVectorLayer:
+    if provider == "memory":
+        return create_memory_layer(vertices)
+
+    if provider == "gpkg":
+        return create_geopackage_layer(vertices, os.path.join(work_dir, f"synthetic_{vertices}.gpkg"))
+
+    raise ValueError(f"provider '{provider}' not supported, use one of {PROVIDERS}")
+
+
+def run_suite(sizes: Iterable[int] = DEFAULT_SIZES, providers: Iterable[str] = PROVIDERS,
+              work_dir: str = "", samples: int = 200,
+              log: Callable[[str], None] = print) -> Dict[str, Dict[str, float]]:
+    """ Runs all benchmarks for each layer size and provider.
+        A QgsApplication must be running, see `benchmarks.start_application`.
+
+        :param sizes: vertex counts of the synthetic layers
+        :param providers: "memory" and/or "gpkg"
+        :param work_dir: folder for GeoPackage files
+        :param samples: count of measurements per metric
+        :param log: progress output
+        :return: {"provider/size": {metric: value}}
+    """
+    results = {}
+    work_dir = work_dir or os.getcwd()
+
+    for provider in providers:
+        for vertices in sizes:
+            name = f"{provider}/{vertices}"
+            log(f"generating {name}")
+            layer = create_layer(vertices, provider, work_dir)
+
+            log(f"running {name}")
+            case = BenchmarkCase(layer, samples)
+            try:
+                results[name] = case.run()
+            finally:
+                case.close()
+
+    return results
+
+
+def qgis_version() -> str:
+    return Qgis.QGIS_VERSION
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import os
+
+from math import ceil, sqrt
+from random import Random
+
+from qgis.core import (QgsCoordinateReferenceSystem, QgsCoordinateTransformContext, QgsFeature,
+                       QgsField, QgsFields, QgsGeometry, QgsPointXY, QgsVectorFileWriter,
+                       QgsVectorLayer, QgsWkbTypes)
+from qgis.PyQt.QtCore import QVariant
+
+from typing import Iterator, List
+
+# vertices per generated feature
+VERTICES_PER_FEATURE = 50
+# mean distance between two vertices in layer units
+VERTEX_SPACING = 10.0
+# features per `addFeatures` call
+BATCH_SIZE = 10000
+
+
+def network_extent_size(vertices: int) -> float:
+    """ side length of the square area, keeps the vertex density constant for all sizes """
+    return ceil(sqrt(vertices) * VERTEX_SPACING)
+
+
+def generate_lines(vertices: int, seed: int = 0,
+                   vertices_per_feature: int = VERTICES_PER_FEATURE) -> Iterator[List[QgsPointXY]]:
+    """ Generates an orthogonal line network (stair like polylines with right angles).
+
+        :param vertices: total count of vertices
+        :param seed: random seed, same seed creates the same network
+        :param vertices_per_feature: vertices of each polyline
+    """
+    random = Random(seed)
+    size = network_extent_size(vertices)
+    remaining = vertices
+
+    while remaining > 1:
+        count = min(vertices_per_feature, remaining)
+        remaining -= count
+
+        x = random.uniform(0, size)
+        y = random.uniform(0, size)
+        points = [QgsPointXY(x, y)]
+        for i in range(1, count):
+            step = random.uniform(0.5, 1.5) * VERTEX_SPACING * random.choice((-1, 1))
+            if i % 2:
+                x = min(max(x + step, 0), size)
+            else:
+                y = min(max(y + step, 0), size)
+            points.append(QgsPointXY(x, y))
+
+        yield points
+
+
+def _fields() -> QgsFields:
+    fields = QgsFields()
+    fields.append(QgsField("name", QVariant.String))
+    return fields
+
+
+def _features(vertices: int, seed: int, fields: QgsFields) -> Iterator[List[QgsFeature]]:
+    batch = []
+    for points in generate_lines(vertices, seed):
+        feature = QgsFeature(fields)
+        feature.setGeometry(QgsGeometry.fromPolylineXY(points))
+        batch.append(feature)
+
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def create_memory_layer(vertices: int, crs: str = "EPSG:25832", seed: int = 0) -> QgsVectorLayer:
+    """ Creates a memory layer (LineString) with a synthetic line network.
+
+        :param vertices: total count of vertices
+        :param crs: crs auth id of the new layer
+        :param seed: random seed
+    """
+    layer = QgsVectorLayer(f"LineString?crs={crs}&index=yes", f"synthetic_{vertices}", "memory")
+    provider = layer.dataProvider()
+    provider.addAttributes(_fields().toList())
+    layer.updateFields()
+
+    for batch in _features(vertices, seed, layer.fields()):
+        provider.addFeatures(batch)
+
+    layer.updateExtents()
+    return layer
+
+
+def create_geopackage_layer(vertices: int, path: str, crs: str = "EPSG:25832", seed: int = 0) -> QgsVectorLayer:
+    """ Creates a GeoPackage (LineString) with a synthetic line network.
+        An existing file will be overwritten.
+
+        :param vertices: total count of vertices
+        :param path: new GeoPackage file
+        :param crs: crs auth id of the new layer
+        :param seed: random seed
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    layer_name = f"synthetic_{vertices}"
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    options.layerName = layer_name
+
+    fields = _fields()
+    writer = QgsVectorFileWriter.create(path, fields, QgsWkbTypes.LineString,
+                                        QgsCoordinateReferenceSystem(crs),
+                                        QgsCoordinateTransformContext(), options)
+    if writer.hasError() != QgsVectorFileWriter.NoError:
+        raise IOError(f"GeoPackage '{path}' could not be created: {writer.errorMessage()}")
+
+    for batch in _features(vertices, seed, fields):
+        writer.addFeatures(batch)
+
+    # flushes and closes the data source
+    del writer
+
+    layer = QgsVectorLayer(f"{path}|layername={layer_name}", layer_name, "ogr")
+    if not layer.isValid():
+        raise IOError(f"GeoPackage '{path}' is not valid")
+
+    return layer
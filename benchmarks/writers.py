@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import os
+
+from random import Random
+from time import perf_counter
+
+from qgis.core import QgsFeature, QgsGeometry, QgsPointXY, QgsVectorLayer
+
+from typing import Callable, Dict, Iterable, List
+
+from ..submodules.qgis.layer.writers import GeoPackageWriter
+from .synthetic import create_geopackage_layer
+
+
+def corner_features(layer: QgsVectorLayer, corners: int, seed: int = 0) -> List[List[QgsFeature]]:
+    """ two line features per corner, like `RightAngleTool._finalize` """
+    random = Random(seed)
+    extent = layer.extent()
+    fields = layer.dataProvider().fields()
+
+    result = []
+    for _ in range(corners):
+        x = random.uniform(extent.xMinimum(), extent.xMaximum())
+        y = random.uniform(extent.yMinimum(), extent.yMaximum())
+        a, c, b = QgsPointXY(x, y), QgsPointXY(x + 10, y), QgsPointXY(x + 10, y + 10)
+        features = []
+        for line in ([a, c], [c, b]):
+            feature = QgsFeature(fields)
+            feature.setGeometry(QgsGeometry.fromPolylineXY(line))
+            features.append(feature)
+        result.append(features)
+
+    return result
+
+
+def _provider_per_corner(layer: QgsVectorLayer, corners: List[List[QgsFeature]]):
+    """ code before the writers: one `addFeatures` per corner """
+    provider = layer.dataProvider()
+    for features in corners:
+        provider.addFeatures(features)
+
+
+def _geopackage_writer(layer: QgsVectorLayer, corners: List[List[QgsFeature]], wal: bool = False):
+    """ flush pattern of a drawing session: corners are added, written on undo (`flush`) and session end """
+    writer = GeoPackageWriter(layer, wal=wal)
+    for features in corners:
+        writer.add(features)
+    writer.close()
+
+
+def _geopackage_writer_undo(layer: QgsVectorLayer, corners: List[List[QgsFeature]]):
+    """ worst case of the session batch: the user undoes after each corner, each undo flushes """
+    writer = GeoPackageWriter(layer)
+    for features in corners:
+        writer.add(features)
+        writer.flush()
+    writer.close()
+
+
+WRITERS: Dict[str, Callable[[QgsVectorLayer, List[List[QgsFeature]]], None]] = {
+    "provider": _provider_per_corner,
+    "gpkg_writer": _geopackage_writer,
+    "gpkg_writer_wal": lambda layer, corners: _geopackage_writer(layer, corners, wal=True),
+    "gpkg_writer_undo": _geopackage_writer_undo,
+}
+
+
+def run_writers(sizes: Iterable[int], corners: int = 500, work_dir: str = "") -> Dict[str, Dict[str, float]]:
+    """ Writes `corners` corners into local GeoPackages, each writer gets a fresh file.
+
+        :param sizes: vertex counts of the existing line networks
+        :param corners: written corners per run
+        :param work_dir: folder of the GeoPackage files
+        :return: {case: {metric: value}}, e.g. {"gpkg_10000_provider": {"total_ms": .., "corner_ms": ..}}
+    """
+    results = {}
+    for vertices in sizes:
+        for name, write in WRITERS.items():
+            path = os.path.join(work_dir, f"writer_{vertices}_{name}.gpkg")
+            layer = create_geopackage_layer(vertices, path)
+            features = corner_features(layer, corners)
+
+            start = perf_counter()
+            write(layer, features)
+            total = perf_counter() - start
+
+            results[f"gpkg_{vertices}_{name}"] = {
+                "total_ms": total * 1000,
+                "corner_ms": total * 1000 / corners,
+            }
+            del layer
+
+    return results
@@ -14,35 +14,122 @@
  *                                                                         *
  ***************************************************************************/
 """
-from math import degrees, radians, cos
+import os
 
-from qgis.PyQt.QtCore import Qt
+from datetime import datetime
+
+from qgis.PyQt.QtCore import Qt, QTimer
 from qgis.PyQt.QtGui import QColor
 
-from qgis.core import (QgsWkbTypes, QgsTriangle, QgsVectorLayer,
-                       QgsPointXY, QgsGeometry, QgsFeature)
+from qgis.core import (QgsWkbTypes, QgsVectorLayer,
+                       QgsPointXY, QgsGeometry, QgsFeature, QgsTolerance, QgsFeatureRequest,
+                       QgsRectangle, QgsUnitTypes, QgsCsException)
+
+from typing import Any, Dict, List, Optional, Tuple
 
+from ..submodules.right_angle import DegenerateInputError, corner, corner_lines, rectangle
 from ..submodules.qgis.canvas.maptool_click_snap import MapToolQgisSnap
 from ..submodules.qgis.canvas.canvas_drawing import DrawTool
+from ..submodules.qgis.canvas.event_recorder import CanvasEventRecorder
+from ..submodules.qgis.canvas.snap_warmup import SnapIndexWarmUp
+from ..submodules.qgis.geometry.transform import CoordinateConverter
+from ..submodules.qgis.layer.attributes import AttributeFiller
+from ..submodules.qgis.layer.journal import SessionJournal, UnsavedJournals
+from ..submodules.qgis.layer.writers import EditBufferWriter, FeatureWriter, create_writer
+from ..submodules.qgis.constants import EPSILON, EPSILON_METRES
+from ..submodules.qgis.geometry.history import UNKNOWN_FID, CornerHistory
+from ..submodules.qgis.geometry.lines import geometry_lines
+from ..submodules.qgis.geometry.local_projection import LocalProjections
+from ..submodules.qgis.geometry.weld import Welder
+from ..submodules.qgis.geometry.zm import ZM, complete_zm, corner_zm, make_geometry, sample_zm, shape_values
+from ..submodules.basics.profiling import SessionProfiler
+from ..submodules.basics.lifecycle import LifecycleTracker
+
+
+# coalesces repaints of non editable layers after writing features (milliseconds)
+REFRESH_DELAY_MS = 300
 
 
 class RightAngleTool:
 
-    def __init__(self, iface, layer: QgsVectorLayer, drawings, max_creations: int = -1):
+    def __init__(self, iface, layer: QgsVectorLayer, drawings, max_creations: int = -1,
+                 recorder: Optional[CanvasEventRecorder] = None,
+                 tracker: Optional[LifecycleTracker] = None,
+                 warm_up: Optional[SnapIndexWarmUp] = None,
+                 windowed: Optional[Dict[str, Any]] = None, two_click: bool = False,
+                 journal_dir: Optional[str] = None, history: Optional[CornerHistory] = None,
+                 corners_per_command: int = 1, local_projection: bool = False,
+                 unsaved_journals: Optional[UnsavedJournals] = None, geopackage_wal: bool = False):
         self._iface = iface
         self._layer = layer
+        # polygon layers get a rectangle from the three points
+        self._rectangle = layer.geometryType() == QgsWkbTypes.PolygonGeometry
+        self._zm = QgsWkbTypes.hasZ(layer.wkbType()) or QgsWkbTypes.hasM(layer.wkbType())
         self._points = []
-        self._draw_tool = DrawTool(self._iface.mapCanvas(), drawings=drawings)
+        # one cached canvas <-> layer conversion for preview and snapping
+        self._converter = CoordinateConverter(self._iface.mapCanvas())
+        self._draw_tool = DrawTool(self._iface.mapCanvas(), drawings=drawings, tracker=tracker,
+                                   converter=self._converter)
         self._tool = None
+        self._filler: Optional[AttributeFiller] = None
+        self._writer: Optional[FeatureWriter] = None
+        # endpoints and duplicates, see `_weld`
+        self._welder: Optional[Welder] = None
+        self._welded_fids = set()
+        # crash safe record of all created features, see `SessionJournal`
+        self._journal_dir = journal_dir
+        self._journal: Optional[SessionJournal] = None
+        # journals with unsaved edits after the session, see `_close_journal`
+        self._unsaved_journals = unsaved_journals
+        self._write_errors = False
+        # undo of the last corner, see `undo_last_corner`
+        self._history = history
+        self._corners_per_command = corners_per_command
+        self._geopackage_wal = geopackage_wal
         self._max_creations = max_creations
         self._creations = 0
+        self._recorder = recorder
+        self._tracker = tracker
+        self._warm_up = warm_up
+        self._windowed = windowed
+        # first point snapped onto a segment gives the direction, see `_edge_direction`
+        self._two_click = two_click
+        # geographic layers: constructions in a local conformal projection, see `_construct`
+        self._local: Optional[LocalProjections] = None
+        if local_projection and layer.crs().isGeographic():
+            self._local = LocalProjections(layer.crs())
+
+        # provider writes: one repaint for many corners, one reload at the end of the session
+        self._reload_pending = False
+        self._refresh_timer = QTimer()
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(REFRESH_DELAY_MS)
+        self._refresh_timer.timeout.connect(self._refresh_layer)
 
     def start(self):
         self._draw_tool.remove_all_drawings()
-        self._tool = MapToolQgisSnap(self._iface, self._layer)
+        # expressions are prepared once for the whole session
+        self._filler = AttributeFiller(self._layer, self._layer.dataProvider().fields())
+        self._tool = MapToolQgisSnap(self._iface, self._layer, recorder=self._recorder, warm_up=self._warm_up,
+                                     windowed=self._windowed, converter=self._converter)
         self._tool.clicked.connect(self._clicked)
-        self._tool.aborted.connect(self._aborted)
         self._tool.moved.connect(self._moved)
+        self._tool.unloaded.connect(self._unloaded)
+        self._layer.afterCommitChanges.connect(self._edits_finished)
+        self._layer.editingStopped.connect(self._edits_finished)
+
+        if self._local is not None:
+            # transforms of the visible area are created before the first click
+            center = self._converter.to_layer(self._layer, self._iface.mapCanvas().extent().center())
+            try:
+                self._local.transforms((center.x(), center.y()))
+            except QgsCsException:
+                ...
+
+        if self._tracker is not None:
+            self._tracker.track(self, "tool")
+            self._tracker.track(self._tool, "tool")
+            self._tracker.track(self._draw_tool, "tool")
 
     def _draw(self, point):
         self._draw_tool.remove_all_drawings()
@@ -59,7 +146,7 @@ class RightAngleTool:
 
         if len(self._points) == 2:
             # draw pre calculated line
-            lines = self._get_lines(self._points + [point])
+            lines = self._get_shapes(self._points + [point])
             for line in lines:
                 self._draw_tool.create_rubber_band(
                     QgsGeometry.fromPolylineXY(line),
@@ -77,52 +164,303 @@ class RightAngleTool:
 
         self._draw(point)
 
+        if self._two_click and not self._points:
+            # direction of the first side from the snapped segment, the corner needs two clicks only
+            direction = self._edge_direction(point)
+            if direction is not None:
+                self._points.append(direction)
+
         self._points.append(point)
 
         if len(self._points) == 3:
-            self._finalize()
+            created = self._finalize()
+            self._points.clear()
+            if not created:
+                return
 
             self._creations += 1
-            self._points.clear()
             if self._creations >= self._max_creations and self._max_creations > -1:
                 self._tool.unload_tool()
 
+    def _edge_direction(self, point: QgsPointXY) -> Optional[QgsPointXY]:
+        """ end point of the clicked segment, which is more distant to `point`,
+            None if the click was not snapped onto a segment
+        """
+        edge = self._tool.snapped_edge()
+        if edge is None:
+            return None
+
+        direction = max(edge, key=point.sqrDist)
+        if direction.sqrDist(point) == 0:
+            return None
+
+        return direction
+
     def _moved(self, point: QgsPointXY):
         self._draw_tool.remove_all_drawings()
         self._draw(point)
 
-    def _finalize(self):
-        lines = self._get_lines(self._points)
+    def _finalize(self) -> bool:
+        """ writes the corner of the three points
+
+            :return: features were written
+        """
+        lines = self._weld(self._get_shapes(self._points))
         self._draw_tool.remove_all_drawings()
+        if not lines:
+            # no direction or everything exists already (double click)
+            return False
 
-        for line in lines:
+        features = []
+        for line, values in zip(lines, self._get_values(lines)):
             feature = QgsFeature(self._layer.dataProvider().fields())
-            feature.setGeometry(QgsGeometry.fromPolylineXY(line))
-            if self._layer.isEditable():
-                self._layer.addFeature(feature)
-            else:
-                self._layer.dataProvider().addFeatures([feature])
-                self._layer.reload()
+            # z/m and multi types are created directly, no conversion of the layer needed
+            feature.setGeometry(make_geometry(line, values, self._layer.wkbType()))
+            features.append(feature)
+        self._filler.fill(features)
 
-    def _get_lines(self, points):
-        xa, a, b = points
+        # new lines are snappable immediately, independent of layer size and provider
+        for line in lines:
+            self._tool.add_session_geometry(line)
 
-        length_hypo = a.distance(b)
+        if self._journal_dir is not None:
+            # journal first, a crash while writing must not lose the corner
+            if self._journal is None:
+                self._journal = SessionJournal(self._journal_dir, self._layer)
+            self._journal.append(features)
 
-        triangle = QgsTriangle(xa, a, b)
-        angles = triangle.angles()
-        angle_new_a = 180 - degrees(angles[1])
+        writer = self._get_writer()
+        if not writer.add(features):
+            self._write_failed(writer)
+            return False
+        self._truncate_journal()
 
-        length_b = length_hypo * cos(radians(angle_new_a))
-        azimuth = xa.azimuth(a)
+        if self._history is not None:
+            self._history.push([[(point.x(), point.y()) for point in line] for line in lines], writer.added_fids)
 
-        c = a.project(length_b, azimuth)
-        return [[a, c], [c, b]]
+        if writer.deferred:
+            # A reload per corner would drop the layer's snapping index and rebuild it on the next move.
+            # Repaint (and buffered writes) are coalesced and reload deferred to the end of the session.
+            self._reload_pending = True
+            self._refresh_timer.start()
 
-    def _aborted(self):
-        self._draw_tool.remove_all_drawings()
+        return True
+
+    def _weld(self, shapes: List[List[QgsPointXY]]) -> List[List[QgsPointXY]]:
+        """ welds vertices onto existing and session vertices within `EPSILON_METRES`, drops duplicates """
+        if self._welder is None:
+            factor = QgsUnitTypes.fromUnitToUnitFactor(QgsUnitTypes.DistanceMeters, self._layer.crs().mapUnits())
+            self._welder = Welder(EPSILON_METRES * factor)
+
+        tolerance = self._welder.tolerance
+        for point in (point for shape in shapes for point in shape):
+            rectangle = QgsRectangle(point.x() - tolerance, point.y() - tolerance,
+                                     point.x() + tolerance, point.y() + tolerance)
+            request = QgsFeatureRequest().setFilterRect(rectangle).setNoAttributes()
+            for feature in self._layer.getFeatures(request):
+                if feature.id() in self._welded_fids:
+                    continue
+
+                self._welded_fids.add(feature.id())
+                for line in geometry_lines(feature.geometry()):
+                    self._welder.add_existing([(vertex.x(), vertex.y()) for vertex in line])
+
+        welded = self._welder.weld([[(point.x(), point.y()) for point in shape] for shape in shapes])
+        # a ring needs three different vertices
+        minimum = 4 if self._rectangle else 2
+        return [[QgsPointXY(x, y) for x, y in shape] for shape in welded if len(shape) >= minimum]
+
+    def forget(self, layer: QgsVectorLayer, lines: List[List[QgsPointXY]]):
+        """ lines of an undone corner are neither welded onto nor snapped anymore """
+        if layer.id() != self._layer.id():
+            return
+
+        if self._welder is not None:
+            for line in lines:
+                self._welder.remove([(point.x(), point.y()) for point in line])
+
+            # neighbours sharing removed vertices are added to the welder again on the next corner
+            tolerance = self._welder.tolerance
+            points = [point for line in lines for point in line]
+            rectangle = QgsRectangle(min(p.x() for p in points) - tolerance, min(p.y() for p in points) - tolerance,
+                                     max(p.x() for p in points) + tolerance, max(p.y() for p in points) + tolerance)
+            for feature in layer.getFeatures(QgsFeatureRequest().setFilterRect(rectangle).setNoAttributes()):
+                self._welded_fids.discard(feature.id())
+
+        if self._tool is not None:
+            for line in lines:
+                self._tool.remove_session_geometry(line)
+
+    def _get_writer(self) -> FeatureWriter:
+        """ writer of the current layer state, edit mode can change during the session """
+        editable = isinstance(self._writer, EditBufferWriter)
+        if self._writer is None or editable != self._layer.isEditable():
+            if self._writer is not None and not self._writer.close():
+                self._write_failed(self._writer)
+            self._writer = create_writer(self._layer, corners_per_command=self._corners_per_command,
+                                         wal=self._geopackage_wal)
+
+        return self._writer
+
+    def flush(self):
+        """ writes buffered features and closes an open undo command """
+        if self._writer is not None and not self._writer.flush():
+            self._write_failed(self._writer)
+        self._truncate_journal()
+
+    def _truncate_journal(self):
+        """ features committed into the data provider are saved, the journal does not need them anymore """
+        if self._journal is None or self._write_errors:
+            return
+
+        if self._writer is not None and not isinstance(self._writer, EditBufferWriter) and not self._writer.uncommitted:
+            self._journal.truncate()
+
+    def _edits_finished(self):
+        """ edits of the layer are saved or rolled back, the edit buffer does not hold session features """
+        if self._journal is not None and not self._write_errors and not self._layer.isModified():
+            self._journal.truncate()
+
+    def _write_failed(self, writer: FeatureWriter):
+        self._iface.messageBar().pushWarning("Easy Right Angle Drawing",
+                                             f"Features wurden nicht gespeichert: {writer.error}")
+        writer.error = None
+        # journal is kept, see `plugin.restore_journals`
+        self._write_errors = True
+
+    def _close_journal(self):
+        """ removes the journal, when all features of the session are saved """
+        journal, self._journal = self._journal, None
+        if journal is None:
+            return
+
+        if self._write_errors:
+            journal.close()
+        elif self._layer.isEditable() and self._layer.isModified():
+            # edit buffer is lost on a crash, journal is needed until the edits are saved
+            journal.close()
+            if self._unsaved_journals is not None:
+                self._unsaved_journals.keep(journal, self._layer)
+        else:
+            journal.discard()
+
+    def _get_values(self, shapes: List[List[QgsPointXY]]) -> List[List[ZM]]:
+        """ z/m values of all shape vertices: clicked points from the layer geometry below them,
+            corners interpolated along a -> c -> b
+        """
+        _, a, b = self._points
+        value_a = value_b = (None, None)
+        if self._zm:
+            radius = QgsTolerance.vertexSearchRadius(self._layer, self._iface.mapCanvas().mapSettings())
+            value_a, value_b = complete_zm(sample_zm(self._layer, a, radius), sample_zm(self._layer, b, radius))
+
+        [[c]] = self._construct(lambda *points: [[corner(*points)]], self._points)
+        c = QgsPointXY(*c)
+        value_c = corner_zm(a, c, b, value_a, value_b)
+        known = [(a, value_a), (b, value_b), (c, value_c)]
+        if self._rectangle:
+            d = QgsPointXY(a.x() + b.x() - c.x(), a.y() + b.y() - c.y())
+            known.append((d, tuple(va + vb - vc if vc is not None else None
+                                   for va, vb, vc in zip(value_a, value_b, value_c))))
+
+        return shape_values(shapes, known)
+
+    def _refresh_layer(self):
+        """ repaints the layer with new features written into the data provider,
+            writers committing in batches are not committed for it
+        """
+        if self._writer is not None and not self._writer.session_batch:
+            if not self._writer.flush():
+                self._write_failed(self._writer)
+            self._truncate_journal()
+
+        self._layer.dataProvider().updateExtents()
+        self._layer.updateExtents()
+        self._layer.triggerRepaint()
+
+    def _reload_layer(self):
+        """ one reload after the session, QGIS' snapping index will contain all new features """
+        self._refresh_timer.stop()
+        if self._writer is not None:
+            if not self._writer.close():
+                self._write_failed(self._writer)
+            if self._writer.warning:
+                self._iface.messageBar().pushWarning("Easy Right Angle Drawing", self._writer.warning)
+            self._writer = None
+
+        self._close_journal()
+
+        if self._reload_pending:
+            self._reload_pending = False
+            self._layer.reload()
+
+    def _get_shapes(self, points) -> List[List[QgsPointXY]]:
+        """ lines of the right angle or the closed ring of the rectangle (polygon layers),
+            empty for degenerate points, see `right_angle.DegenerateInputError`
+        """
+        construction = (lambda *abc: [rectangle(*abc)]) if self._rectangle else corner_lines
+        try:
+            shapes = self._construct(construction, points)
+        except (DegenerateInputError, QgsCsException):
+            return []
+
+        return [[QgsPointXY(x, y) for x, y in shape] for shape in shapes]
+
+    def _construct(self, construction, points) -> List[List[Tuple[float, float]]]:
+        """ shapes of a `right_angle` construction from (xa, a, b) in layer coordinates,
+            geographic layers in a local conformal projection, see `LocalProjections`
+        """
+        coordinates = [(point.x(), point.y()) for point in points]
+        if self._local is None:
+            return construction(*coordinates)
+
+        return self._local.apply(construction, coordinates)
+
+    def _unloaded(self):
+        """ map tool is unloaded, releases all canvas objects of this session """
+        self._reload_layer()
+        if self._welder is not None and (self._welder.welded or self._welder.dropped):
+            self._iface.messageBar().pushInfo("Easy Right Angle Drawing",
+                                              f"{self._welder.welded} Endpunkte verschweißt, "
+                                              f"{self._welder.dropped} doppelte Linien verworfen.")
+        if self._filler is not None and self._filler.errors:
+            self._iface.messageBar().pushWarning("Easy Right Angle Drawing",
+                                                 "Fehler in Attributausdrücken: " + "; ".join(self._filler.errors[:3]))
+        self._draw_tool.close()
+        self._converter.unload()
+        if self._local is not None:
+            self._local.clear()
         self._points.clear()
-        del self._layer
+
+        for signal, slot in ((self._tool.clicked, self._clicked),
+                             (self._tool.moved, self._moved),
+                             (self._tool.unloaded, self._unloaded)):
+            try:
+                signal.disconnect(slot)
+            except (RuntimeError, TypeError):
+                ...
+
+        for signal in ("afterCommitChanges", "editingStopped"):
+            try:
+                getattr(self._layer, signal).disconnect(self._edits_finished)
+            except (RuntimeError, TypeError):
+                ...
+
+        # map tools are children of the canvas, they are not deleted otherwise
+        self._tool.deleteLater()
+
+        if self._tracker is not None:
+            self._tracker.release(self, self._tool, self._draw_tool)
+
+    @property
+    def map_tool(self) -> Optional[MapToolQgisSnap]:
+        return self._tool
+
+    def unload(self):
+        """ unloads the map tool, when it is still active """
+        self._draw_tool.remove_all_drawings()
+        if self._tool is not None and not self._tool.disabled:
+            self._tool.unload_tool()
 
     @classmethod
     def draw(cls, plugin):
@@ -133,13 +471,148 @@ class RightAngleTool:
             plugin.draw_action.setChecked(False)
             return
 
-        if layer.wkbType() != QgsWkbTypes.LineString:
-            iface.messageBar().pushWarning("Easy Right Angle Drawing", "Bitte einen Linienlayer (LineString) auswählen.")
+        if QgsWkbTypes.flatType(layer.wkbType()) not in (QgsWkbTypes.LineString, QgsWkbTypes.MultiLineString,
+                                                         QgsWkbTypes.Polygon, QgsWkbTypes.MultiPolygon):
+            iface.messageBar().pushWarning("Easy Right Angle Drawing",
+                                           "Bitte einen Linienlayer (LineString) oder Flächenlayer (Polygon) auswählen.")
             plugin.draw_action.setChecked(False)
             return
 
-        tool = RightAngleTool(iface, layer, drawings=plugin.drawings)
+        windowed = plugin.windowed_snapping_options()
+
+        recorder = None
+        if plugin.record_events:
+            # trace file for record and replay, see `benchmark.py`
+            file_name = f"{plugin.log_filename}_trace_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+            # options which change the drawing, the index cache is no JSON value and not replayed
+            options = {
+                "windowed": {k: v for k, v in windowed.items() if k != "cache"} if windowed else None,
+                "two_click": plugin.two_click,
+                "local_projection": plugin.local_projection,
+                "corners_per_command": plugin.corners_per_command,
+            }
+            recorder = CanvasEventRecorder(iface.mapCanvas(), os.path.join(plugin.log_dir, file_name), layer, options)
+
+        profiler = None
+        if plugin.profile_session:
+            # profiles the whole session, written on unload of the map tool
+            profiler = SessionProfiler()
+            profiler.start()
+
+        tool = RightAngleTool(iface, layer, drawings=plugin.drawings, recorder=recorder,
+                              tracker=plugin.lifecycle_tracker, warm_up=plugin.snap_warm_up,
+                              windowed=windowed, two_click=plugin.two_click,
+                              journal_dir=plugin.journal_dir,
+                              history=plugin.corner_histories.setdefault(layer.id(), CornerHistory()),
+                              corners_per_command=plugin.corners_per_command,
+                              local_projection=plugin.local_projection,
+                              unsaved_journals=plugin.unsaved_journals,
+                              geopackage_wal=plugin.geopackage_wal)
         tool.start()
+        tool.map_tool.unloaded.connect(lambda p=plugin, t=tool: release_tool(p, t))
+        if profiler is not None:
+            tool.map_tool.unloaded.connect(lambda p=plugin, pr=profiler: write_profile(p, pr))
+
         plugin.triangle_tool = tool
         plugin.draw_action.setChecked(True)
         return tool
+
+
+def _same_shape(feature: QgsFeature, shape: List[Tuple[float, float]]) -> bool:
+    """ feature has a line with exactly the vertices of `shape` """
+    for line in geometry_lines(feature.geometry()):
+        if len(line) == len(shape) and all(abs(point.x() - x) <= EPSILON and abs(point.y() - y) <= EPSILON
+                                           for point, (x, y) in zip(line, shape)):
+            return True
+
+    return False
+
+
+def _find_shape(layer: QgsVectorLayer, shape: List[Tuple[float, float]], fid: int, exclude: set) -> Optional[int]:
+    """ id of a feature with exactly the vertices of `shape`
+
+        :param fid: id recorded by the writer, it is used if the feature still has the shape.
+            Ids change, e.g. the negative ids of the edit buffer on commit, then the shape is searched.
+        :param exclude: ids already found for other shapes of the corner
+    """
+    if fid != UNKNOWN_FID and fid not in exclude:
+        request = QgsFeatureRequest().setFilterFid(fid).setNoAttributes()
+        for feature in layer.getFeatures(request):
+            if _same_shape(feature, shape):
+                return fid
+
+    xs = [x for x, _ in shape]
+    ys = [y for _, y in shape]
+    rectangle = QgsRectangle(min(xs) - EPSILON, min(ys) - EPSILON, max(xs) + EPSILON, max(ys) + EPSILON)
+    for feature in layer.getFeatures(QgsFeatureRequest().setFilterRect(rectangle).setNoAttributes()):
+        if feature.id() not in exclude and _same_shape(feature, shape):
+            return feature.id()
+
+    return None
+
+
+def undo_last_corner(plugin):
+    """ removes the features of the last corner drawn on the active layer
+
+        Corners, which are not in the layer anymore (deleted or changed by the user), are dropped
+        from the history and the next older corner is undone.
+    """
+    iface = plugin.iface
+    layer = iface.activeLayer()
+    history = plugin.corner_histories.get(layer.id()) if isinstance(layer, QgsVectorLayer) else None
+    if not history:
+        iface.messageBar().pushInfo("Easy Right Angle Drawing", "Keine Ecke zum Rückgängigmachen.")
+        return
+
+    if plugin.triangle_tool is not None:
+        # buffered features must be in the layer
+        plugin.triangle_tool.flush()
+
+    skipped = 0
+    fids = set()
+    lines = []
+    while history and not fids:
+        shapes, recorded = history.pop()
+        for shape, fid in zip(shapes, recorded):
+            fid = _find_shape(layer, shape, fid, fids)
+            if fid is not None:
+                fids.add(fid)
+                lines.append([QgsPointXY(x, y) for x, y in shape])
+
+        skipped += not fids
+
+    if skipped:
+        iface.messageBar().pushWarning("Easy Right Angle Drawing",
+                                       f"{skipped} Ecke(n) wurden im Layer nicht gefunden und übersprungen.")
+    if not fids:
+        return
+
+    if layer.isEditable():
+        layer.beginEditCommand("Easy Right Angle Drawing: Ecke rückgängig")
+        layer.deleteFeatures(list(fids))
+        layer.endEditCommand()
+    else:
+        layer.dataProvider().deleteFeatures(list(fids))
+        layer.triggerRepaint()
+
+    if plugin.triangle_tool is not None:
+        plugin.triangle_tool.forget(layer, lines)
+
+
+def release_tool(plugin, tool: RightAngleTool):
+    """ removes the plugin's reference to an unloaded tool """
+    if plugin.triangle_tool is tool:
+        plugin.triangle_tool = None
+
+
+def write_profile(plugin, profiler: SessionProfiler):
+    """ writes session profile and summary into the plugin's log directory """
+    try:
+        profile_file, summary_file = profiler.write(plugin.log_dir, plugin.log_filename)
+    except OSError as e:
+        plugin.iface.messageBar().pushWarning("Easy Right Angle Drawing",
+                                              f"Profil konnte nicht gespeichert werden: {e}")
+        return
+
+    plugin.iface.messageBar().pushInfo("Easy Right Angle Drawing",
+                                       f"Profil gespeichert: {profile_file} (Zusammenfassung: {summary_file})")
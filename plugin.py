@@ -25,17 +25,24 @@ from datetime import datetime
 
 from pathlib import Path
 
-from qgis.core import QgsApplication
+from qgis.core import QgsApplication, QgsProject, QgsVectorLayer, QgsWkbTypes
 from qgis.gui import QgisInterface
 
 from qgis.PyQt.QtWidgets import QMenu, QMessageBox, QApplication, QAction
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import pyqtSignal
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from .submodules.basics.versions_reader import VersionPlugin
 from .submodules.basics.compatibility import qgis_unload_keyerror
+from .submodules.basics.lifecycle import LifecycleTracker
+from .submodules.qgis.canvas.index_cache import SnapIndexCache
+from .submodules.qgis.canvas.snap_warmup import SnapIndexWarmUp
+from .submodules.qgis.geometry.history import CornerHistory
+from .submodules.qgis.layer.angle_check import AngleCheckTask
+from .submodules.qgis.layer.journal import UnsavedJournals, find_journals, journal_pid, read_journal, replay_journal
+from .utilities.settings import read_setting
 
 from .submodules.module_base.base_class import ModuleBase, Plugin
 
@@ -73,6 +80,12 @@ class EasyRightAngleDraw(Plugin):
         self.log_filename = f"{self.plugin_name}_{str(self.plugin_version).replace('.', '_')}"
         self.log_dir = os.path.join(QgsApplication.qgisSettingsDirPath(), '_logs')
         self.temp_files = os.path.join(QgsApplication.qgisSettingsDirPath(), '_temp_files', self.log_filename)
+        # snapping indexes of large file based layers, kept between sessions
+        self.cache_files = os.path.join(QgsApplication.qgisSettingsDirPath(), '_cache_files', self.log_filename)
+        # journals of drawing sessions, left after a crash
+        self.journal_dir = os.path.join(self.temp_files, 'journals')
+        # journals of finished sessions until their edits are saved
+        self.unsaved_journals = UnsavedJournals()
 
         self.menu_bar: Optional[QMenu] = kwargs.get("menu_bar", None)
         self.menu_bar_action: Optional[QAction] = kwargs.get("menu_bar_action", None)
@@ -80,6 +93,32 @@ class EasyRightAngleDraw(Plugin):
         self.zip_file_name = VersionPlugin.get_local_zipname(self.meta_file)
         self.repo_version = self.repo_version_error = None
 
+        # record canvas events of each drawing session into `log_dir`
+        self.record_events = False
+        # profile each drawing session into `log_dir`
+        self.profile_session = False
+        self.triangle_tool = None
+        # builds snapping indexes in background, see `initGui`
+        self.snap_warm_up: Optional[SnapIndexWarmUp] = None
+        # very large layers: snapping index only for the visible extent, see `windowed_snapping_options`
+        self.windowed_snapping: bool = read_setting("windowed_snapping", False)
+        self.snap_index_cache = SnapIndexCache(self.cache_files)
+        # corner from two clicks, direction from the snapped segment of the first click
+        self.two_click: bool = read_setting("two_click", False)
+        # geographic layers: right angles in a local conformal projection instead of degrees
+        self.local_projection: bool = read_setting("local_projection", True)
+        # undo of drawn corners per layer id, see `modules.draw.undo_last_corner`
+        self.corner_histories: Dict[str, CornerHistory] = {}
+        # corners of one undo command in editable layers
+        self.corners_per_command: int = read_setting("corners_per_command", 1)
+        # GeoPackages in WAL mode while drawing, the previous journal mode is restored afterwards
+        self.geopackage_wal: bool = read_setting("geopackage_wal", False)
+        # running right angle checks, see `check_right_angles`
+        self.angle_checks: List[AngleCheckTask] = []
+
+        # counts tools, modules and scene items, only in development mode
+        self.lifecycle_tracker: Optional[LifecycleTracker] = LifecycleTracker() if self.is_dev_mode() else None
+
         super().__init__(*args, log_name=self.log_filename,
                          name=self.plugin_name, **kwargs)
 
@@ -152,10 +191,136 @@ class EasyRightAngleDraw(Plugin):
                             True,
                             tool_tip=tool_tip)
 
+        # snapping indexes are built, when the active layer changes
+        # cached indexes are snapped on, while QGIS builds its indexes
+        self.snap_warm_up = SnapIndexWarmUp(
+            self.iface.mapCanvas(), self.iface.statusBarIface().showMessage,
+            cache=self.snap_index_cache if read_setting("window_index_cache", True) else None)
+        self.connect(self.iface.currentLayerChanged, self.warm_up_snapping)
+
         # Do not add you actions in initGui, keep it clean and use load_tool_bar instead
         from .utilities import ui_control
         ui_control.load_tool_bar(self)
 
+        if find_journals(self.journal_dir):
+            self.iface.messageBar().pushWarning(
+                "Easy Right Angle Drawing",
+                "Es gibt nicht gespeicherte Zeichensitzungen. "
+                "Nach dem Öffnen des Projekts mit 'Zeichensitzungen wiederherstellen' übernehmen.")
+
+    def warm_up_snapping(self, layer):
+        """ starts building snapping indexes for a new active line or polygon layer in background """
+        if self.snap_warm_up is None or self.windowed_snapping or not isinstance(layer, QgsVectorLayer):
+            return
+
+        if layer.geometryType() not in (QgsWkbTypes.LineGeometry, QgsWkbTypes.PolygonGeometry):
+            return
+
+        self.snap_warm_up.start(self.snap_warm_up.snapping_layers(layer))
+
+    def windowed_snapping_options(self) -> Optional[Dict[str, Any]]:
+        """ keyword arguments for `TiledSnapIndex` from the plugin settings,
+            None if windowed snapping is disabled
+        """
+        if not self.windowed_snapping:
+            return None
+
+        tile_size = read_setting("window_tile_size", 0.0)
+        return {
+            "margin": read_setting("window_margin", 0.5),
+            "tile_size": tile_size if tile_size > 0 else None,
+            "max_vertices": read_setting("window_max_vertices", 2_000_000),
+            "cache": self.snap_index_cache if read_setting("window_index_cache", True) else None,
+        }
+
+    def restore_journals(self):
+        """ asks for each journal left by a crash: write its features into the layer or discard it """
+        journals = find_journals(self.journal_dir)
+        if not journals:
+            self.iface.messageBar().pushInfo("Easy Right Angle Drawing", "Keine Zeichensitzungen zum Wiederherstellen.")
+            return
+
+        restored = 0
+        for path in journals:
+            try:
+                header, features = read_journal(path)
+            except (OSError, ValueError) as e:
+                self.iface.messageBar().pushWarning("Easy Right Angle Drawing", str(e))
+                continue
+
+            answer = QMessageBox.question(
+                self.iface.mainWindow(), "Zeichensitzung wiederherstellen",
+                f"Sitzung vom {header.get('created')}: {len(features)} Features für Layer '{header.get('name')}'.\n"
+                "Features in den Layer schreiben (Ja), Sitzung verwerfen (Verwerfen) oder später entscheiden (Nein)?",
+                QMessageBox.Yes | QMessageBox.Discard | QMessageBox.No)
+
+            if answer == QMessageBox.Discard:
+                self._remove_journal(path)
+            elif answer == QMessageBox.Yes:
+                try:
+                    restored += replay_journal(path)
+                except (OSError, ValueError) as e:
+                    self.iface.messageBar().pushWarning("Easy Right Angle Drawing", str(e))
+                    continue
+                self._remove_journal(path)
+
+        if restored:
+            self.iface.messageBar().pushSuccess("Easy Right Angle Drawing", f"{restored} Features wiederhergestellt.")
+
+    def _remove_journal(self, path: str):
+        """ removes a restored or discarded journal, it would be offered again otherwise """
+        try:
+            os.remove(path)
+        except OSError as e:
+            self.iface.messageBar().pushWarning("Easy Right Angle Drawing",
+                                                f"Zeichensitzung '{path}' konnte nicht gelöscht werden: {e}")
+
+    def check_right_angles(self):
+        """ checks all vertex angles of the active line layer in background, read-only """
+        layer = self.iface.activeLayer()
+        if not isinstance(layer, QgsVectorLayer) or layer.geometryType() != QgsWkbTypes.LineGeometry:
+            self.iface.messageBar().pushWarning("Easy Right Angle Drawing", "Bitte einen Linienlayer auswählen")
+            return
+
+        report = os.path.join(self.log_dir, f"{self.log_filename}_angle_check_{datetime.now():%Y%m%d_%H%M%S}.json")
+        task = AngleCheckTask(layer, read_setting("angle_check_max_deviation", 5.0),
+                              read_setting("angle_check_tolerance", 0.01), report)
+        task.checked.connect(lambda t=task: self._angle_check_finished(t))
+        task.taskCompleted.connect(lambda t=task: self.angle_checks.remove(t) if t in self.angle_checks else None)
+        task.taskTerminated.connect(lambda t=task: self.angle_checks.remove(t) if t in self.angle_checks else None)
+        self.angle_checks.append(task)
+        QgsApplication.taskManager().addTask(task)
+
+    def _angle_check_finished(self, task: AngleCheckTask):
+        """ adds the violations layer and reports the summary """
+        statistics = task.statistics
+        if task.violations_layer is not None and task.violations_layer.featureCount():
+            QgsProject.instance().addMapLayer(task.violations_layer)
+
+        message = (f"'{task.layer_name}': {statistics.count} Winkel, {statistics.right_angles} rechte Winkel, "
+                   f"{statistics.violations} Abweichungen bis {statistics.max_deviation:g}°")
+        if task.error is None:
+            message += f", Bericht: {task.report_path}"
+        else:
+            message += f", Bericht nicht geschrieben: {task.error}"
+
+        self.iface.messageBar().pushInfo("Easy Right Angle Drawing", message)
+
+    def write_lifecycle_report(self) -> Optional[str]:
+        """ writes live instances and objects surviving their unload into `log_dir` """
+        if self.lifecycle_tracker is None:
+            return None
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = os.path.join(self.log_dir, f"{self.log_filename}_lifecycle_{datetime.now():%Y%m%d_%H%M%S}.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.lifecycle_tracker.report())
+
+        survivors = len(self.lifecycle_tracker.survivors())
+        self.iface.messageBar().pushInfo(f"{self.plugin_menu_name}",
+                                         f"{survivors} Objekte nach dem Entladen noch vorhanden, Bericht: {path}")
+        return path
+
     def reloaded(self):
         self.iface.messageBar().pushSuccess(f"{self.plugin_menu_name}", "QGIS-Plugin erfolgreich neugestartet")
 
@@ -172,6 +337,34 @@ class EasyRightAngleDraw(Plugin):
 
     def unload(self, self_unload: bool = False):
         """ Auto-call when plugin will be unloaded from QGIS plugin manager. """
+        if self.triangle_tool is not None:
+            self.triangle_tool.unload()
+            self.triangle_tool = None
+
+        if self.snap_warm_up is not None:
+            self.snap_warm_up.unload()
+            self.snap_warm_up = None
+
+        self.snap_index_cache.cancel()
+
+        for task in self.angle_checks:
+            try:
+                task.checked.disconnect()
+            except (RuntimeError, TypeError):
+                ...
+            task.cancel()
+        self.angle_checks.clear()
+
+        self.unsaved_journals.clear()
+        # no crash: journals of this process are not needed anymore
+        own_journals = [path for path in find_journals(self.journal_dir, exclude_running=False)
+                        if journal_pid(path) == os.getpid()]
+        for path in own_journals:
+            try:
+                os.remove(path)
+            except OSError:
+                ...
+
         super().unload()
 
         QApplication.restoreOverrideCursor()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import os
+import sys
+
+# the geometry core imports without QGIS, this plugin's package is not loaded
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "submodules"))
+
+from right_angle.cli import from_sys_args  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(0 if from_sys_args() >= 0 else 1)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import gc
+import sys
+import types
+import weakref
+
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class LifecycleTracker:
+    """ Counts live instances of tracked objects and finds objects, which survive their unload.
+
+        Objects are only referenced weakly. After `release`, an object is expected to be garbage collected.
+        `survivors` returns released objects, which are still alive, and `reference_chains`
+        shows what keeps them alive.
+
+        .. code-block:: python
+
+            tracker = LifecycleTracker()
+            tracker.track(tool, "tool")
+            ...
+            tracker.release(tool)
+            print(tracker.report())
+
+        :param max_depth: maximum length of a reference chain
+        :param max_chains: maximum count of chains per survivor
+    """
+
+    def __init__(self, max_depth: int = 8, max_chains: int = 3):
+        self.max_depth = max_depth
+        self.max_chains = max_chains
+        # id: (weak reference, class name, group, tracked at, released at)
+        self._objects: Dict[int, List[Any]] = {}
+
+    @staticmethod
+    def _class_name(obj) -> str:
+        return type(obj).__name__
+
+    def track(self, obj, group: str = ""):
+        """ tracks a new object, objects without weak reference support are ignored
+
+            :param obj: object to track
+            :param group: free group name for the report, e.g. "tool" or "scene item"
+        """
+        key = id(obj)
+        try:
+            ref = weakref.ref(obj, lambda _, k=key: self._objects.pop(k, None))
+        except TypeError:
+            return
+
+        self._objects[key] = [ref, self._class_name(obj), group, datetime.now(), None]
+
+    def release(self, *objects):
+        """ marks objects as unloaded, they should be garbage collected from now on """
+        for obj in objects:
+            entry = self._objects.get(id(obj))
+            if entry is not None and entry[0]() is obj and entry[4] is None:
+                entry[4] = datetime.now()
+
+    def counts(self) -> Counter:
+        """ count of live instances per class name """
+        return Counter(entry[1] for entry in self._objects.values() if entry[0]() is not None)
+
+    def survivors(self) -> List[Tuple[Any, str, datetime]]:
+        """ released objects, which are still alive after a garbage collection
+
+            :return: list of (object, group, released at)
+        """
+        gc.collect()
+        result = []
+        for ref, _, group, _, released in list(self._objects.values()):
+            obj = ref()
+            if obj is not None and released is not None:
+                result.append((obj, group, released))
+
+        return result
+
+    @staticmethod
+    def _describe(referrer, target) -> str:
+        if isinstance(referrer, types.ModuleType):
+            return f"module {referrer.__name__}"
+
+        if isinstance(referrer, dict):
+            for key, value in referrer.items():
+                if value is target:
+                    return f"dict[{key!r}]"
+            return "dict"
+
+        if isinstance(referrer, (list, tuple, set, deque)):
+            return f"{type(referrer).__name__}(len={len(referrer)})"
+
+        if isinstance(referrer, types.MethodType):
+            return f"bound method {referrer.__func__.__qualname__}"
+
+        if isinstance(referrer, types.FunctionType):
+            return f"function {referrer.__qualname__}"
+
+        if isinstance(referrer, types.CellType):
+            return "closure cell"
+
+        return type(referrer).__name__
+
+    def reference_chains(self, obj, ignore: Iterable[Any] = ()) -> List[List[str]]:
+        """ Searches the referrers of `obj` breadth first up to a module (global variable)
+            or an object without referrers in Python, e.g. held by a Qt signal connection or C++.
+
+            :param obj: object to search for
+            :param ignore: containers of the caller, which reference `obj` only temporary
+            :return: chains, each one from `obj` to the root
+        """
+        frame = sys._getframe()
+        parents: Dict[int, Tuple[Optional[int], str]] = {id(obj): (None, self._describe(obj, None))}
+        objects: Dict[int, Any] = {id(obj): obj}
+        queue = deque([obj])
+        internal = {id(parents), id(objects), id(queue), id(self._objects)}
+        internal.update(id(x) for x in ignore)
+        chains = []
+
+        def chain(key: int, root: str) -> List[str]:
+            # walks from the referrer back to `obj`
+            result = []
+            while key is not None:
+                parent, text = parents[key]
+                result.append(text)
+                key = parent
+            result.reverse()
+            result.append(root)
+            return result
+
+        while queue and len(chains) < self.max_chains:
+            current = queue.popleft()
+            depth = len(chain(id(current), "")) - 1
+
+            referrers = [r for r in gc.get_referrers(current)
+                         if id(r) not in internal and not isinstance(r, types.FrameType) and r is not frame]
+
+            if not referrers:
+                chains.append(chain(id(current), "<no python referrer: Qt connection or C++ owner>"))
+                continue
+
+            for referrer in referrers:
+                if isinstance(referrer, (types.ModuleType, type)):
+                    chains.append(chain(id(current), self._describe(referrer, current)))
+                    continue
+
+                # module globals are roots
+                if isinstance(referrer, dict) and "__name__" in referrer and "__builtins__" in referrer:
+                    text = self._describe(referrer, current).replace("dict", f"globals of {referrer['__name__']}", 1)
+                    chains.append(chain(id(current), text))
+                    continue
+
+                if id(referrer) in parents or depth >= self.max_depth:
+                    continue
+
+                parents[id(referrer)] = (id(current), self._describe(referrer, current))
+                objects[id(referrer)] = referrer
+                queue.append(referrer)
+
+        del frame, objects, queue
+        return chains[:self.max_chains]
+
+    def report(self) -> str:
+        """ readable report with live instances and survivors including their reference chains """
+        lines = [f"=== live instances ({datetime.now():%Y-%m-%d %H:%M:%S}) ==="]
+        for class_name, count in sorted(self.counts().items()):
+            lines.append(f"{class_name}: {count}")
+
+        survivors = self.survivors()
+        lines.append("")
+        lines.append(f"=== survivors after unload: {len(survivors)} ===")
+        for survivor in survivors:
+            obj, group, released = survivor
+            lines.append(f"{self._class_name(obj)} ({group or '-'}), released {released:%H:%M:%S}")
+            for chain in self.reference_chains(obj, ignore=(survivors, survivor)):
+                lines.append("    " + " <- ".join(chain))
+
+        return "\n".join(lines)
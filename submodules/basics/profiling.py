@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+class SessionProfiler:
+    """ Profiles a session with `cProfile` and records memory allocations with `tracemalloc`.
+
+        .. code-block:: python
+
+            profiler = SessionProfiler()
+            profiler.start()
+            ...
+            profiler.stop()
+            profile_file, summary_file = profiler.write("path/to/logs", "plugin_name")
+
+        :param top: count of entries in the summary
+        :param frames: stored frames per memory allocation
+    """
+
+    def __init__(self, top: int = 30, frames: int = 5):
+        self.top = top
+        self.frames = frames
+        self._profile: Optional[cProfile.Profile] = None
+        self._start_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._end_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._stop_tracing = False
+        self._started: Optional[datetime] = None
+        self._stopped: Optional[datetime] = None
+
+    @property
+    def active(self) -> bool:
+        return self._profile is not None and self._stopped is None
+
+    def start(self):
+        """ starts profiling and memory tracing """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            # do not stop tracing, when someone else started it
+            self._stop_tracing = True
+
+        self._start_snapshot = tracemalloc.take_snapshot()
+        self._started = datetime.now()
+        self._stopped = None
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self):
+        """ stops profiling and memory tracing """
+        if not self.active:
+            return
+
+        self._profile.disable()
+        self._end_snapshot = tracemalloc.take_snapshot()
+        self._stopped = datetime.now()
+
+        if self._stop_tracing:
+            tracemalloc.stop()
+            self._stop_tracing = False
+
+    def summary(self) -> str:
+        """ readable top N summary of cpu time and memory allocations """
+        if self._profile is None:
+            return ""
+
+        stream = io.StringIO()
+        stream.write(f"session: {self._started:%Y-%m-%d %H:%M:%S} - {self._stopped:%Y-%m-%d %H:%M:%S}\n\n")
+
+        stream.write(f"=== top {self.top} functions (cumulative time) ===\n")
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        stream.write(f"\n=== top {self.top} functions (own time) ===\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+
+        stream.write(f"\n=== top {self.top} memory allocations (growth during session) ===\n")
+        if self._start_snapshot is not None and self._end_snapshot is not None:
+            differences = self._end_snapshot.compare_to(self._start_snapshot, "lineno")
+            for difference in differences[:self.top]:
+                stream.write(f"{difference}\n")
+
+            current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+            total = sum(stat.size for stat in self._end_snapshot.statistics("filename"))
+            stream.write(f"\ntraced memory at end: {total / 1024:.1f} KiB")
+            if peak:
+                stream.write(f", current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB")
+            stream.write("\n")
+
+        return stream.getvalue()
+
+    def write(self, folder: str, file_name: str) -> Tuple[str, str]:
+        """ Writes profile (pstats format) and top N summary into folder.
+            Stops profiling, if still active.
+
+            :param folder: destination folder, will be created if missing
+            :param file_name: file name prefix, a time stamp will be added
+            :return: profile file path, summary file path
+        """
+        self.stop()
+        os.makedirs(folder, exist_ok=True)
+
+        base = os.path.join(folder, f"{file_name}_profile_{self._started:%Y%m%d_%H%M%S}")
+        profile_file = base + ".prof"
+        summary_file = base + ".txt"
+
+        self._profile.dump_stats(profile_file)
+        with open(summary_file, "w", encoding="utf-8") as file:
+            file.write(self.summary())
+
+        return profile_file, summary_file
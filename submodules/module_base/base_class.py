@@ -106,6 +106,11 @@ class ModuleBase:
         self._plugin: Plugin = kwargs['plugin']
         self.module_name: str = kwargs["name"]
 
+        # optional lifecycle tracker of the plugin (development mode)
+        tracker = getattr(self._plugin, "lifecycle_tracker", None)
+        if tracker is not None:
+            tracker.track(self, "module")
+
         self._translators: List[QTranslator] = []
         self._menu_bar: Optional[QMenu] = None
         self._menu_bar_action: Optional[QAction] = None
@@ -464,6 +469,10 @@ class ModuleBase:
 
         self.unloaded = True
 
+        tracker = getattr(self._plugin, "lifecycle_tracker", None)
+        if tracker is not None:
+            tracker.release(self)
+
     def __setattr__(self, key, value):
         # some validity checks
         try:
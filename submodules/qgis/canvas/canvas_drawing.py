@@ -23,6 +23,8 @@ from qgis.PyQt.QtCore import Qt, QPointF
 
 from typing import Optional, Union, List
 
+from ..geometry.transform import CoordinateConverter
+
 
 class DrawTool:
     """ Zur Erstellung einfacher Grafiken und Markierungen auf der Karte.
@@ -47,9 +49,12 @@ class DrawTool:
         :param size: size, defaults to 10
         :param width: width, defaults to 7
         :param drawings: optional vertex marker list to add marker to the list
+        :param tracker: optional lifecycle tracker (`track`/`release`) for created scene items
+        :param converter: optional `CoordinateConverter` shared with other tools, a new one is used if None
     """
 
-    def __init__(self, canvas, color: QColor = QColor(0, 250, 0, 100), size: int = 10, width: int = 7, drawings: Optional[List] = None):
+    def __init__(self, canvas, color: QColor = QColor(0, 250, 0, 100), size: int = 10, width: int = 7, drawings: Optional[List] = None,
+                 tracker=None, converter: Optional[CoordinateConverter] = None):
 
         self.canvas = canvas
         self.QgsMapTool = QgsMapTool(self.canvas)
@@ -62,6 +67,31 @@ class DrawTool:
 
         self.drawings = drawings
         self.drawn_objekts = []
+        self._tracker = tracker
+        self._own_converter = converter is None
+        self.converter = CoordinateConverter(self.canvas) if converter is None else converter
+
+    def _add_item(self, item, drawn: bool = True):
+        """ registers a new scene item """
+        if drawn:
+            self.drawn_objekts.append(item)
+        self.drawings.append(item)
+
+        if self._tracker is not None:
+            self._tracker.track(item, "scene item")
+
+    def _remove_items(self, items: list):
+        """ removes items from scene and all item lists """
+        removed = {id(item) for item in items}
+        for item in items:
+            self.canvas.scene().removeItem(item)
+
+        self.drawn_objekts = [x for x in self.drawn_objekts if id(x) not in removed]
+        # keep the shared list object
+        self.drawings[:] = [x for x in self.drawings if id(x) not in removed]
+
+        if self._tracker is not None:
+            self._tracker.release(*items)
 
     def add_text(self, text: str, point: Union[QPointF, QgsVertexMarker], font: Optional[QFont] = None):
         """ Adds text to current canvas scene at given point.
@@ -85,8 +115,7 @@ class DrawTool:
 
         item = self.canvas.scene().addText(text, font)
         item.setPos(point)
-        self.drawn_objekts.append(item)
-        self.drawings.append(item)
+        self._add_item(item)
 
     def set_color(self, red: int, green: int, blue: int, transparency: int):
         """ Ändere die Farbe des Zeichentools
@@ -147,8 +176,7 @@ class DrawTool:
 
         if isinstance(point, list):
             v_points = []
-            for geo in point:
-                qpointxy_map = self.QgsMapTool.toMapCoordinates(source_layer, geo)
+            for qpointxy_map in self.converter.to_map_points(source_layer, point):
                 v_point = QgsVertexMarker(self.canvas)
                 v_point.setCenter(qpointxy_map)
                 v_point.setColor(color)
@@ -157,17 +185,13 @@ class DrawTool:
                 v_point.setPenWidth(width)
                 if fill_color:
                     v_point.setFillColor(fill_color)
-                self.drawn_objekts.append(v_point)
                 v_points.append(v_point)
-                self.drawings.append(v_point)
+                self._add_item(v_point)
             return v_points
 
         elif isinstance(point, QgsPointXY):
             v_point = QgsVertexMarker(self.canvas)
-            qpointxy_map = self.QgsMapTool.toMapCoordinates(source_layer, point)
-            # qpoint = self.QgsMapTool.toCanvasCoordinates(qpointxy_map)
-            # print(qpoint)
-            # point = self.QgsMapTool.toMapCoordinates(qpoint)
+            qpointxy_map = self.converter.to_map(source_layer, point)
             v_point.setCenter(qpointxy_map)
             v_point.setColor(color)
             v_point.setIconSize(size)
@@ -175,14 +199,13 @@ class DrawTool:
             v_point.setPenWidth(width)
             if fill_color:
                 v_point.setFillColor(fill_color)
-            self.drawn_objekts.append(v_point)
-            self.drawings.append(v_point)
+            self._add_item(v_point)
             return v_point
 
         elif isinstance(point, QgsGeometry):
             qpointxy = point.asPoint()
             v_point = QgsVertexMarker(self.canvas)
-            qpointxy_map = self.QgsMapTool.toMapCoordinates(source_layer, qpointxy)
+            qpointxy_map = self.converter.to_map(source_layer, qpointxy)
             v_point.setCenter(qpointxy_map)
             v_point.setColor(color)
             v_point.setIconSize(size)
@@ -190,8 +213,7 @@ class DrawTool:
             v_point.setPenWidth(width)
             if fill_color:
                 v_point.setFillColor(fill_color)
-            self.drawn_objekts.append(v_point)
-            self.drawings.append(v_point)
+            self._add_item(v_point)
             return v_point
 
         else:
@@ -215,40 +237,25 @@ class DrawTool:
         if width is None:
             width = self.width
 
-        if isinstance(geometry, list):
-            qpointsxy = []
-            for point in geometry:
-                qpointsxy.append(self.QgsMapTool.toMapCoordinates(source_layer, point))
-            geometry = QgsGeometry.fromPolylineXY(qpointsxy)
-
-        else:
-            qpointsxy = []
-            points = geometry.asPolyline()
-            for point in points:
-                qpointsxy.append(self.QgsMapTool.toMapCoordinates(source_layer, point))
-            geometry = QgsGeometry.fromPolylineXY(qpointsxy)
+        if not isinstance(geometry, list):
+            geometry = geometry.asPolyline()
+        geometry = QgsGeometry.fromPolylineXY(self.converter.to_map_points(source_layer, geometry))
 
         rubber_band = QgsRubberBand(self.canvas, False)
         rubber_band.setToGeometry(geometry, None)
         rubber_band.setColor(color)
         rubber_band.setWidth(width)
         rubber_band.setLineStyle(line_type)
-        if not drawn:
-            self.drawn_objekts.append(rubber_band)
-        self.drawings.append(rubber_band)
+        self._add_item(rubber_band, drawn=not drawn)
         return rubber_band
 
     def remove_class_drawings(self):
         """ entfernt alle Zeichnungen dieser Klasse """
-        for drawing in self.drawn_objekts:
-            self.canvas.scene().removeItem(drawing)
-        self.drawn_objekts = []
+        self._remove_items(list(self.drawn_objekts))
 
     def remove_all_drawings(self):
         """ entfernt alle Zeichnungen """
-        for drawing in self.drawings:
-            self.canvas.scene().removeItem(drawing)
-        self.drawings = []
+        self._remove_items(list(self.drawings))
 
     def remove_last_drawings(self, quantity: int = 1):
         """ entfernt die letzten `quantity` Zeichnungen
@@ -256,9 +263,12 @@ class DrawTool:
             :param quantity: Anzahl der zu entfernenden letzten Zeichnungen
             :type quantity: int
         """
-        for i in range(quantity):
-            try:
-                self.canvas.scene().removeItem(self.drawings[-1])
-                self.drawings.pop(-1)
-            except IndexError:
-                pass
+        if quantity > 0:
+            self._remove_items(self.drawings[-quantity:])
+
+    def close(self):
+        """ removes all drawings and deletes the helper map tool """
+        self.remove_all_drawings()
+        self.QgsMapTool.deleteLater()
+        if self._own_converter:
+            self.converter.unload()
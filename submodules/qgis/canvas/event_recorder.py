@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import json
+import os
+
+from time import perf_counter
+
+from qgis.core import QgsProject, QgsRectangle, QgsVectorLayer, QgsWkbTypes
+from qgis.gui import QgsMapCanvas
+
+from typing import Any, Dict, Iterator, Optional
+
+TRACE_VERSION = 2
+# versions read by `read_trace`, version 1 has no tool options
+TRACE_VERSIONS = (1, 2)
+
+
+def rectangle_to_list(rectangle: QgsRectangle) -> list:
+    """ converts a rectangle into [xmin, ymin, xmax, ymax] """
+    return [rectangle.xMinimum(), rectangle.yMinimum(),
+            rectangle.xMaximum(), rectangle.yMaximum()]
+
+
+class CanvasEventRecorder:
+    """ Records the stream of canvas events, which reaches a map tool, into a trace file (JSON lines).
+
+        The first line is a header with canvas size, crs, extent, scale, the target layer
+        and the options of the drawing tool (keyword arguments of `RightAngleTool`, JSON values only).
+        Each following line is one event:
+
+            * `move`, `release`: canvas pixel position, button, buttons and modifiers
+            * `key`: key code and modifiers
+            * `extent`: canvas extent and scale changed (panning, zooming)
+
+        Every event has a `t` value with seconds since recording started.
+
+        .. code-block:: python
+
+            recorder = CanvasEventRecorder(iface.mapCanvas(), "path/to/trace.jsonl", layer, {"two_click": True})
+            tool = MapToolQgisSnap(iface, layer, recorder=recorder)
+            ...
+            recorder.stop()
+
+        :param canvas: map canvas to record
+        :param path: trace file path
+        :param layer: target layer of the map tool
+        :param options: tool options, replayed with the same options
+    """
+
+    def __init__(self, canvas: QgsMapCanvas, path: str, layer: Optional[QgsVectorLayer] = None,
+                 options: Optional[Dict[str, Any]] = None):
+        self.canvas = canvas
+        self.path = path
+        self._start = perf_counter()
+        self._events = 0
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._file = open(path, "w", encoding="utf-8")
+        self._write(self._header(layer, options or {}))
+
+        self.canvas.extentsChanged.connect(self.record_extent)
+
+    @property
+    def events(self) -> int:
+        """ count of recorded events """
+        return self._events
+
+    @property
+    def active(self) -> bool:
+        return self._file is not None
+
+    def _header(self, layer: Optional[QgsVectorLayer], options: Dict[str, Any]) -> Dict[str, Any]:
+        settings = self.canvas.mapSettings()
+        header = {
+            "type": "header",
+            "version": TRACE_VERSION,
+            "project": QgsProject.instance().fileName(),
+            "crs": settings.destinationCrs().authid(),
+            "size": [self.canvas.width(), self.canvas.height()],
+            "extent": rectangle_to_list(self.canvas.extent()),
+            "scale": self.canvas.scale(),
+            "layer": None,
+            "options": options,
+        }
+
+        if layer is not None:
+            header["layer"] = {
+                "id": layer.id(),
+                "name": layer.name(),
+                "source": layer.source(),
+                "provider": layer.providerType(),
+                "crs": layer.crs().authid(),
+                "wkb_type": QgsWkbTypes.displayString(layer.wkbType()),
+                "editable": layer.isEditable(),
+            }
+
+        return header
+
+    def _write(self, entry: Dict[str, Any]):
+        if self._file is None:
+            return
+
+        self._file.write(json.dumps(entry) + "\n")
+
+    def _time(self) -> float:
+        return perf_counter() - self._start
+
+    def record_mouse(self, kind: str, event):
+        """ records a mouse event
+
+            :param kind: "move" or "release"
+            :param event: QgsMapMouseEvent/QMouseEvent
+        """
+        pos = event.pos()
+        self._write({
+            "type": kind,
+            "t": self._time(),
+            "x": pos.x(),
+            "y": pos.y(),
+            "button": int(event.button()),
+            "buttons": int(event.buttons()),
+            "modifiers": int(event.modifiers()),
+        })
+        self._events += 1
+
+    def record_key(self, event):
+        """ records a key event
+
+            :param event: QKeyEvent
+        """
+        self._write({
+            "type": "key",
+            "t": self._time(),
+            "key": int(event.key()),
+            "modifiers": int(event.modifiers()),
+        })
+        self._events += 1
+
+    def record_extent(self):
+        """ records current canvas extent and scale """
+        self._write({
+            "type": "extent",
+            "t": self._time(),
+            "extent": rectangle_to_list(self.canvas.extent()),
+            "scale": self.canvas.scale(),
+        })
+
+    def stop(self):
+        """ stops recording and closes the trace file """
+        if self._file is None:
+            return
+
+        try:
+            self.canvas.extentsChanged.disconnect(self.record_extent)
+        except (RuntimeError, TypeError):
+            ...
+
+        self._file.close()
+        self._file = None
+
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    """ Reads a trace file written by `CanvasEventRecorder`.
+        The first yielded entry is always the header.
+
+        :param path: trace file path
+        :raises ValueError: file has no valid header
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        header = json.loads(file.readline() or "{}")
+        if header.get("type") != "header":
+            raise ValueError(f"file '{path}' is not a canvas trace file")
+
+        if header.get("version") not in TRACE_VERSIONS:
+            raise ValueError(f"trace version {header.get('version')} not supported")
+
+        yield header
+
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
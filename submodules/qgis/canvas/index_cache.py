@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import hashlib
+import os
+
+from qgis.PyQt.QtCore import pyqtSignal
+
+from qgis.core import (QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsFeatureRequest,
+                       QgsProject, QgsProviderRegistry, QgsTask, QgsApplication, QgsVectorLayer,
+                       QgsVectorLayerFeatureSource)
+
+from typing import Dict, Optional
+
+from ..geometry.packed_index import PackedIndexWriter, PackedSegmentIndex
+from ..geometry.lines import geometry_lines
+
+# grid cells along the longer side of the layer extent
+GRID_CELLS = 2048
+
+
+def layer_file(layer: QgsVectorLayer) -> Optional[str]:
+    """ data file of a file based layer, None for databases, services and memory layers """
+    parts = QgsProviderRegistry.instance().decodeUri(layer.providerType(), layer.source())
+    path = parts.get("path") or layer.source().split("|")[0]
+    return path if path and os.path.isfile(path) else None
+
+
+def _hash(text: str, length: int) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:length]
+
+
+class BuildIndexTask(QgsTask):
+    """ Builds the segment index of a layer in background and writes it into the cache.
+        Segments are streamed into the index file, the layer is never indexed in memory.
+
+        :param layer: layer to index, features are read from a copy of its feature source
+        :param crs: crs of the indexed coordinates
+        :param path: index file path
+    """
+    built = pyqtSignal(str, str, name="built")
+
+    def __init__(self, layer: QgsVectorLayer, crs: QgsCoordinateReferenceSystem, path: str):
+        super().__init__(f"Fangindex für '{layer.name()}' erstellen", QgsTask.CanCancel)
+        self.layer_id = layer.id()
+        self.path = path
+        self._source = QgsVectorLayerFeatureSource(layer)
+        self._features = max(layer.featureCount(), 1)
+
+        self._transform = None
+        extent = layer.extent()
+        if layer.crs() != crs:
+            self._transform = QgsCoordinateTransform(layer.crs(), crs, QgsProject.instance())
+            extent = self._transform.transformBoundingBox(extent)
+
+        self._cell_size = max(extent.width(), extent.height()) / GRID_CELLS or 1.0
+        self.error = None
+
+    def run(self) -> bool:
+        try:
+            writer = PackedIndexWriter(self.path, self._cell_size)
+        except OSError as e:
+            self.error = str(e)
+            return False
+
+        try:
+            request = QgsFeatureRequest().setNoAttributes()
+            for number, feature in enumerate(self._source.getFeatures(request)):
+                if self.isCanceled():
+                    writer.abort()
+                    return False
+
+                geometry = feature.geometry()
+                if self._transform is not None:
+                    geometry.transform(self._transform)
+
+                for line in geometry_lines(geometry):
+                    writer.add_line([(point.x(), point.y()) for point in line])
+
+                if number % 1000 == 0:
+                    self.setProgress(number * 100 / self._features)
+
+            writer.close()
+        except OSError as e:
+            writer.abort()
+            self.error = str(e)
+            return False
+
+        return True
+
+    def finished(self, result: bool):
+        if result:
+            self.built.emit(self.layer_id, self.path)
+
+
+class SnapIndexCache:
+    """ On-disk cache of segment indexes, see `PackedSegmentIndex`.
+
+        An index file belongs to the layer source, the subset string and the crs of the coordinates.
+        The modification stamp (time and size) of the data file is part of the file name,
+        a changed data file never matches an old index. Only file based layers are cached.
+
+        .. code-block:: python
+
+            cache = SnapIndexCache(folder)
+            index = cache.load(layer, canvas.mapSettings().destinationCrs())
+            if index is None:
+                cache.build(layer, canvas.mapSettings().destinationCrs())
+
+        :param folder: cache folder
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._tasks: Dict[str, BuildIndexTask] = {}
+
+    @staticmethod
+    def _prefix(layer: QgsVectorLayer, crs: QgsCoordinateReferenceSystem) -> str:
+        return _hash(f"{layer.source()}|{layer.subsetString()}|{crs.toWkt()}", 20)
+
+    def cache_path(self, layer: QgsVectorLayer, crs: QgsCoordinateReferenceSystem) -> Optional[str]:
+        """ index file path of the current layer state, None if the layer can not be cached """
+        if not layer.isValid() or layer.isEditable():
+            # edit buffer is not part of the data file
+            return None
+
+        path = layer_file(layer)
+        if path is None:
+            return None
+
+        stamps = []
+        for file in (path, f"{path}-wal"):
+            if os.path.exists(file):
+                stat = os.stat(file)
+                stamps.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+
+        return os.path.join(self.folder, f"{self._prefix(layer, crs)}_{_hash('|'.join(stamps), 12)}.idx")
+
+    def load(self, layer: QgsVectorLayer, crs: QgsCoordinateReferenceSystem) -> Optional[PackedSegmentIndex]:
+        """ maps the cached index of a layer, None if there is no valid index file """
+        path = self.cache_path(layer, crs)
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            return PackedSegmentIndex(path)
+        except (OSError, ValueError):
+            self._remove(path)
+            return None
+
+    def build(self, layer: QgsVectorLayer, crs: QgsCoordinateReferenceSystem) -> Optional[BuildIndexTask]:
+        """ starts building the index file of a layer in background,
+            connect to `BuildIndexTask.built` to be notified
+
+            :return: running task, None if the layer can not be cached
+        """
+        path = self.cache_path(layer, crs)
+        if path is None:
+            return None
+
+        task = self._tasks.get(path)
+        if task is not None:
+            return task
+
+        os.makedirs(self.folder, exist_ok=True)
+        task = BuildIndexTask(layer, crs, path)
+        task.built.connect(lambda _, file, prefix=self._prefix(layer, crs): self._remove_stale(prefix, file))
+        task.taskCompleted.connect(lambda file=path: self._tasks.pop(file, None))
+        task.taskTerminated.connect(lambda file=path: self._tasks.pop(file, None))
+        self._tasks[path] = task
+        QgsApplication.taskManager().addTask(task)
+        return task
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            # still mapped by another session
+            ...
+
+    def _remove_stale(self, prefix: str, keep: str):
+        """ removes index files of older states of the same layer """
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name.startswith(f"{prefix}_") and path != keep:
+                self._remove(path)
+
+    def cancel(self):
+        """ cancels all running builds """
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+
+    def clear(self):
+        """ removes all index files """
+        self.cancel()
+        if not os.path.isdir(self.folder):
+            return
+
+        for name in os.listdir(self.folder):
+            if name.endswith(".idx"):
+                self._remove(os.path.join(self.folder, name))
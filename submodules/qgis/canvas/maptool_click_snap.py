@@ -15,11 +15,18 @@
  ***************************************************************************/
 """
 
+from qgis.PyQt import sip
 from qgis.PyQt.QtCore import pyqtSignal, Qt, QPoint
-from qgis.core import (QgsVectorLayer, QgsPointXY, Qgis, QgsPointLocator)
+from qgis.core import QgsVectorLayer, QgsPointXY, Qgis, QgsPointLocator
 from qgis.gui import (QgsMapTool, QgisInterface, QgsSnapIndicator)
 
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+
+from .event_recorder import CanvasEventRecorder
+from .snap_warmup import SnapIndexWarmUp, layer_snapping, snapping_layers
+from .tiled_index import TiledSnapIndex
+from ..geometry.transform import CoordinateConverter
+from ..geometry.segment_index import SessionIndex
 
 
 class MapToolQgisSnap(QgsMapTool):
@@ -58,17 +65,27 @@ class MapToolQgisSnap(QgsMapTool):
                              then a default filter will be generated from `LayerMatchFilter`.
         :param force_snap: force only use snapped points for poly line. Each point for poly line must be snapped.
         :param min_segment_length: minimum new segment length, defaults to 0.1. Set to -1 to disable it
+        :param recorder: optional `CanvasEventRecorder` to record all incoming canvas events
+        :param warm_up: optional `SnapIndexWarmUp`, builds snapping indexes in background when the tool is armed
+        :param windowed: optional keyword arguments for `TiledSnapIndex`. When set, only the visible extent
+                         plus margin of the snapping layers is indexed, QGIS' snapping index is not used.
+        :param converter: optional `CoordinateConverter` shared with other tools, a new one is used if None
 
     """
     aborted = pyqtSignal(name="aborted")
     clicked = pyqtSignal(QgsPointXY, name="clicked")
     moved = pyqtSignal(QgsPointXY, name="moved")
+    unloaded = pyqtSignal(name="unloaded")
 
     def __init__(self, iface: QgisInterface,
                  layer: QgsVectorLayer,
                  snap_on_layers: Optional[List[QgsVectorLayer]] = None,
                  match_filter: Optional[QgsPointLocator.MatchFilter] = None,
-                 force_snap: bool = False):
+                 force_snap: bool = False,
+                 recorder: Optional[CanvasEventRecorder] = None,
+                 warm_up: Optional[SnapIndexWarmUp] = None,
+                 windowed: Optional[Dict[str, Any]] = None,
+                 converter: Optional[CoordinateConverter] = None):
 
         self.canvas = iface.mapCanvas()
         QgsMapTool.__init__(self, self.canvas)
@@ -76,6 +93,15 @@ class MapToolQgisSnap(QgsMapTool):
         self.iface = iface
         self.force_snap = force_snap
         self.previous_tool = self.canvas.mapTool()
+        if isinstance(self.previous_tool, MapToolQgisSnap):
+            # never go back to an other snap tool, it will be unloaded by its owner
+            self.previous_tool = self.previous_tool.previous_tool
+        self._recorder = recorder
+
+        # canvas <-> layer conversion without looking up the transformation for each event
+        self._last_match: Optional[QgsPointLocator.Match] = None
+        self._own_converter = converter is None
+        self.converter = CoordinateConverter(self.canvas) if converter is None else converter
 
         self._utils = self.canvas.snappingUtils()
         self._indicator = QgsSnapIndicator(self.canvas)
@@ -96,18 +122,115 @@ class MapToolQgisSnap(QgsMapTool):
         # layer with same build method
         self.layer = layer
 
+        # geometry created while this tool is active (layer crs, indexed in canvas crs),
+        # snappable without rebuilding QGIS' index
+        self._session_index = SessionIndex(self._to_map_line)
+        self.canvas.destinationCrsChanged.connect(self._crs_changed)
+
+        layers = snapping_layers(self.canvas, self.layer)
+        layers += [l for l in self._snap_on_layers if l not in layers]
+
+        # very large layers: index only what is visible
+        self._tiled_index: Optional[TiledSnapIndex] = None
+        if windowed is not None:
+            self._tiled_index = TiledSnapIndex(self.canvas, layers, **windowed)
+            warm_up = None
+
+        # first snap should not wait for QGIS building its indexes
+        self._warm_up = warm_up
+        self._warm_up_layers: List[QgsVectorLayer] = layers
+        if self._warm_up is not None:
+            self._warm_up.start(self._warm_up_layers)
+
         # activate self as Maptool
         self.canvas.setMapTool(self)
 
+    def _to_map_line(self, line: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        points = self.converter.to_map_points(self.layer, [QgsPointXY(x, y) for x, y in line])
+        return [(point.x(), point.y()) for point in points]
+
+    def _crs_changed(self):
+        # the shared converter may get the signal later
+        self.converter.invalidate()
+        self._session_index.rebuild()
+
+    def add_session_geometry(self, points: List[QgsPointXY]):
+        """ Adds a new created line (layer crs) to the session index.
+            It is snappable immediately, QGIS' snapping index must not be rebuilt for it.
+        """
+        self._session_index.add_line([(point.x(), point.y()) for point in points])
+
+    def remove_session_geometry(self, points: List[QgsPointXY]):
+        """ removes a line added with `add_session_geometry`, e.g. of an undone corner """
+        self._session_index.remove_line([(point.x(), point.y()) for point in points])
+
+    def _tolerance(self) -> float:
+        """ snapping tolerance of the drawing layer in canvas units """
+        return layer_snapping(self._utils.config(), self.layer, self.canvas.mapSettings())[0]
+
+    def _get_session_match(self, coord: QgsPointXY) -> QgsPointLocator.Match:
+        """ snaps on geometry of the session index, vertices before segments """
+        if not len(self._session_index) or not self._utils.config().enabled():
+            return QgsPointLocator.Match()
+
+        # session geometry is in the drawing layer, its snapping settings apply
+        tolerance, vertices, segments = layer_snapping(self._utils.config(), self.layer, self.canvas.mapSettings())
+        vertex = self._session_index.nearest_vertex(coord.x(), coord.y(), tolerance) if vertices else None
+        if vertex is not None:
+            distance, point = vertex
+            return QgsPointLocator.Match(QgsPointLocator.Vertex, self.layer, -1, distance, QgsPointXY(*point))
+
+        segment = self._session_index.nearest_segment(coord.x(), coord.y(), tolerance) if segments else None
+        if segment is not None:
+            distance, point, _, _ = segment
+            return QgsPointLocator.Match(QgsPointLocator.Edge, self.layer, -1, distance, QgsPointXY(*point))
+
+        return QgsPointLocator.Match()
+
+    @staticmethod
+    def _is_better_match(match: QgsPointLocator.Match, other: QgsPointLocator.Match) -> bool:
+        """ vertices before edges (like QgsSnappingUtils), then the shorter distance """
+        if not match.isValid():
+            return False
+
+        if not other.isValid():
+            return True
+
+        if match.hasVertex() != other.hasVertex():
+            return match.hasVertex()
+
+        return match.distance() < other.distance()
+
     def _get_snapped_match(self, pos):
         """ Returns snapped point. Point's crs is in projects/canvas crs. """
         coord = self.toMapCoordinates(pos)
 
-        # test for default snapping
-        return self._utils.snapToMap(coord, filter=self._match_filter)
+        config = self._utils.config()
+        if self._tiled_index is not None:
+            match = QgsPointLocator.Match()
+            if config.enabled():
+                settings = self.canvas.mapSettings()
+                match = self._tiled_index.snap(coord, self._tolerance(), layer_settings={
+                    layer.id(): layer_snapping(config, layer, settings) for layer in self._tiled_index.layers})
+
+        elif self._warm_up is not None and not self._warm_up.ready:
+            # indexes are still building, snap only on finished ones
+            match = self._warm_up.snap(coord, self._warm_up_layers, self._match_filter)
+        else:
+            # test for default snapping
+            match = self._utils.snapToMap(coord, filter=self._match_filter)
+
+        # geometry of this session is snappable before QGIS' snapping index knows it
+        session_match = self._get_session_match(coord)
+        if self._is_better_match(session_match, match):
+            return session_match
+
+        return match
 
     def canvasReleaseEvent(self, event):
         """user releases mouse button after clicking"""
+        if self._recorder is not None:
+            self._recorder.record_mouse("release", event)
 
         if self._disabled:
             self.unload_tool()
@@ -142,6 +265,8 @@ class MapToolQgisSnap(QgsMapTool):
 
     def keyReleaseEvent(self, event):
         """user presses button"""
+        if self._recorder is not None:
+            self._recorder.record_key(event)
 
         if self._disabled:
             self.unload_tool()
@@ -154,8 +279,35 @@ class MapToolQgisSnap(QgsMapTool):
             # inform User
             self.aborted.emit()
 
+    def snapped_edge(self) -> Optional[Tuple[QgsPointXY, QgsPointXY]]:
+        """ Segment (start, end in layer crs) of the last snapped point, e.g. the point of the last click.
+            None, if the point is not snapped onto a segment.
+        """
+        match = self._last_match
+        if match is None or not match.hasEdge():
+            return None
+
+        p1, p2 = match.edgePoints()
+        if p1 == p2:
+            # matches of the session index, the windowed index and cached indexes have no edge points
+            point = match.point()
+            tolerance = max(self._tolerance() * 1e-6, 1e-9)
+            segment = self._session_index.nearest_segment(point.x(), point.y(), tolerance)
+            if segment is None and self._tiled_index is not None:
+                segment = self._tiled_index.nearest_segment(point, tolerance)
+            if segment is None and self._warm_up is not None:
+                segment = self._warm_up.nearest_segment(point, tolerance)
+            if segment is None:
+                return None
+
+            p1, p2 = QgsPointXY(*segment[2]), QgsPointXY(*segment[3])
+
+        p1, p2 = self.converter.to_layer_points(self.layer, [p1, p2])
+        return p1, p2
+
     def _get_point(self, pos: QPoint):
         match = self._get_snapped_match(pos)
+        self._last_match = match
         valid = match.isValid()
         point = match.point()
 
@@ -165,18 +317,20 @@ class MapToolQgisSnap(QgsMapTool):
                 point = None
             else:
                 self._show_indicator(match)
-                point = self.toLayerCoordinates(self.layer, point)
+                point = self.converter.to_layer(self.layer, point)
 
         else:
             self._hide_indicator()
             if not valid:
                 coord = self.toMapCoordinates(pos)
-                point = self.toLayerCoordinates(self.layer, coord)
+                point = self.converter.to_layer(self.layer, coord)
 
         return point
 
     def canvasMoveEvent(self, event):
         """mouse move event on canvas"""
+        if self._recorder is not None:
+            self._recorder.record_mouse("move", event)
 
         if self._disabled:
             self.unload_tool()
@@ -201,7 +355,8 @@ class MapToolQgisSnap(QgsMapTool):
     def unload_tool(self):
         self._hide_indicator()
         self.canvas.unsetMapTool(self)
-        if not self._disabled:
+        first_unload = not self._disabled
+        if first_unload and self.previous_tool is not None and not sip.isdeleted(self.previous_tool):
             self.canvas.setMapTool(self.previous_tool)
 
         self._disabled = True
@@ -210,6 +365,23 @@ class MapToolQgisSnap(QgsMapTool):
             self._utils.removeExtraSnapLayer(extra_layer)
         self._remove_layers_later.clear()
 
+        if self._recorder is not None:
+            self._recorder.stop()
+
+        try:
+            self.canvas.destinationCrsChanged.disconnect(self._crs_changed)
+        except (RuntimeError, TypeError):
+            ...
+
+        if self._tiled_index is not None:
+            self._tiled_index.unload()
+
+        if self._own_converter:
+            self.converter.unload()
+
+        if first_unload:
+            self.unloaded.emit()
+
 
 class LayerMatchFilter(QgsPointLocator.MatchFilter):
 
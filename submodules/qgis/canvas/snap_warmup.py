@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from time import monotonic
+
+from qgis.PyQt.QtCore import QObject, pyqtSignal
+
+from qgis.core import (QgsMapLayer, QgsMapSettings, QgsPointLocator, QgsPointXY, QgsProject,
+                       QgsSnappingConfig, QgsSnappingUtils, QgsTolerance, QgsVectorLayer)
+from qgis.gui import QgsMapCanvas
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .index_cache import SnapIndexCache
+from ..geometry.packed_index import PackedSegmentIndex
+
+# QGIS' default feature limit of a full index in the hybrid indexing strategy
+HYBRID_FEATURE_LIMIT = 50_000
+# seconds after which a pending index is given up, its locator may have been destroyed without a signal
+STALE_SECONDS = 600
+
+
+def snapping_layers(canvas: QgsMapCanvas, active_layer: Optional[QgsMapLayer] = None) -> List[QgsVectorLayer]:
+    """ vector layers, which are used by the snapping configuration of the canvas
+
+        :param canvas: map canvas with snapping utils
+        :param active_layer: layer to use, when only the active layer is snapped
+    """
+    config = canvas.snappingUtils().config()
+    if not config.enabled():
+        return []
+
+    if config.mode() == QgsSnappingConfig.ActiveLayer:
+        layers = [active_layer]
+    elif config.mode() == QgsSnappingConfig.AllLayers:
+        layers = canvas.layers()
+    else:
+        layers = [layer for layer, settings in config.individualLayerSettings().items() if settings.enabled()]
+
+    return [layer for layer in layers if isinstance(layer, QgsVectorLayer) and layer.isValid() and layer.isSpatial()]
+
+
+def layer_snapping(config: QgsSnappingConfig, layer: QgsVectorLayer,
+                   map_settings: QgsMapSettings) -> Tuple[float, bool, bool]:
+    """ Snapping of one layer: the individual layer settings in advanced configuration, else the global ones.
+
+        :return: tolerance in canvas units, snap on vertices, snap on segments
+    """
+    tolerance, units, flags = config.tolerance(), config.units(), config.typeFlag()
+    if config.mode() == QgsSnappingConfig.AdvancedConfiguration:
+        settings = config.individualLayerSettings(layer)
+        if settings.valid():
+            tolerance, units, flags = settings.tolerance(), settings.units(), settings.typeFlag()
+
+    return (QgsTolerance.toleranceInProjectUnits(tolerance, layer, map_settings, units),
+            bool(flags & QgsSnappingConfig.VertexFlag), bool(flags & QgsSnappingConfig.SegmentFlag))
+
+
+class SnapIndexWarmUp(QObject):
+    """ Builds QGIS' snapping indexes (`QgsPointLocator`) in background tasks,
+        before the first `snapToMap` call needs them.
+
+        While indexing is running, `snap` can be used as fallback,
+        it only searches layers with a finished index and never blocks.
+        With a `SnapIndexCache`, layers still indexing are searched in their cached index file,
+        missing index files are built for the next session.
+
+        Only full indexes are built in advance, as the indexing strategy of the snapping utils
+        would build them: always, or in the hybrid strategy for layers up to `HYBRID_FEATURE_LIMIT` features.
+        QGIS destroys locators on crs changes and removed layers without `initFinished`,
+        their pending entries are dropped then (and after `STALE_SECONDS` in any case).
+
+        .. code-block:: python
+
+            warm_up = SnapIndexWarmUp(iface.mapCanvas(), iface.statusBarIface().showMessage)
+            warm_up.start(warm_up.snapping_layers(iface.activeLayer()))
+
+        :param canvas: map canvas with snapping utils
+        :param show_message: optional callable for progress messages, e.g. `QgsStatusBar.showMessage`
+        :param cache: optional on-disk cache of whole layer indexes
+    """
+    progressChanged = pyqtSignal(int, int, name="progressChanged")
+    finished = pyqtSignal(name="finished")
+
+    # milliseconds to show the last progress message
+    MESSAGE_TIMEOUT = 3000
+
+    def __init__(self, canvas: QgsMapCanvas, show_message: Optional[Callable[[str, int], None]] = None,
+                 cache: Optional[SnapIndexCache] = None):
+        super().__init__()
+        self.canvas = canvas
+        self._show_message = show_message
+        # layer id: (locator, connected slot, start time), only pending ones
+        self._pending: Dict[str, Tuple[QgsPointLocator, Callable, float]] = {}
+        self._total = 0
+        self.cache = cache
+        # cached indexes of pending layers (canvas crs)
+        self._packed: Dict[str, PackedSegmentIndex] = {}
+
+        QgsProject.instance().layersWillBeRemoved.connect(self._layers_removed)
+        self.canvas.destinationCrsChanged.connect(self.cancel)
+
+    @property
+    def utils(self):
+        return self.canvas.snappingUtils()
+
+    @property
+    def ready(self) -> bool:
+        """ all requested indexes are built """
+        self._drop_stale()
+        return not self._pending
+
+    def is_ready(self, layer: QgsVectorLayer) -> bool:
+        self._drop_stale()
+        return layer.id() not in self._pending
+
+    def _drop_stale(self):
+        now = monotonic()
+        for layer_id in [layer_id for layer_id, entry in self._pending.items() if now - entry[2] > STALE_SECONDS]:
+            self._finished(layer_id)
+
+    def _layers_removed(self, layer_ids: List[str]):
+        for layer_id in layer_ids:
+            self._finished(layer_id)
+
+    def _full_index(self, layer: QgsVectorLayer) -> bool:
+        """ the indexing strategy builds a full index of the layer """
+        strategy = self.utils.indexingStrategy()
+        if strategy == QgsSnappingUtils.IndexAlwaysFull:
+            return True
+
+        return strategy == QgsSnappingUtils.IndexHybrid and 0 <= layer.featureCount() <= HYBRID_FEATURE_LIMIT
+
+    def snapping_layers(self, active_layer: Optional[QgsMapLayer] = None) -> List[QgsVectorLayer]:
+        """ vector layers, which are used by the current snapping configuration """
+        return snapping_layers(self.canvas, active_layer)
+
+    def start(self, layers: List[QgsVectorLayer]):
+        """ starts building the indexes of layers in background, layers with index are skipped """
+        for layer in layers:
+            if layer.id() in self._pending or not self._full_index(layer):
+                continue
+
+            locator = self.utils.locatorForLayer(layer)
+            if locator.hasIndex():
+                continue
+
+            slot = lambda ok, layer_id=layer.id(): self._finished(layer_id)
+            self._pending[layer.id()] = (locator, slot, monotonic())
+            self._total += 1
+            locator.initFinished.connect(slot)
+
+            # relaxed: runs as QgsTask, does not block the gui
+            if not locator.init(-1, True) and not locator.isIndexing():
+                self._finished(layer.id())
+            else:
+                self._open_cached(layer)
+
+        self._progress()
+
+    def _open_cached(self, layer: QgsVectorLayer):
+        """ maps the cached index of a pending layer, starts building a missing one """
+        if self.cache is None:
+            return
+
+        crs = self.canvas.mapSettings().destinationCrs()
+        index = self.cache.load(layer, crs)
+        if index is not None:
+            self._packed[layer.id()] = index
+            return
+
+        task = self.cache.build(layer, crs)
+        if task is not None:
+            task.built.connect(self._cache_built)
+
+    def _cache_built(self, layer_id: str, path: str):
+        if self.cache is None or layer_id not in self._pending or layer_id in self._packed:
+            return
+
+        try:
+            self._packed[layer_id] = PackedSegmentIndex(path)
+        except (OSError, ValueError):
+            ...
+
+    def _finished(self, layer_id: str):
+        entry = self._pending.pop(layer_id, None)
+        if entry is None:
+            return
+
+        locator, slot, _ = entry
+        try:
+            locator.initFinished.disconnect(slot)
+        except (RuntimeError, TypeError):
+            ...
+
+        index = self._packed.pop(layer_id, None)
+        if index is not None:
+            index.close()
+
+        self._progress()
+        if self.ready:
+            self._total = 0
+            self.finished.emit()
+
+    def _progress(self):
+        done = self._total - len(self._pending)
+        self.progressChanged.emit(done, self._total)
+
+        if self._show_message is None or not self._total:
+            return
+
+        if self.ready:
+            self._show_message(f"Fang-Index bereit ({self._total} Layer)", self.MESSAGE_TIMEOUT)
+        else:
+            self._show_message(f"Fang-Index wird aufgebaut: {done}/{self._total} Layer bereit", 0)
+
+    def _snap_cached(self, index: PackedSegmentIndex, layer: QgsVectorLayer, point: QgsPointXY,
+                     tolerance: float, vertices: bool, segments: bool) -> List[QgsPointLocator.Match]:
+        """ matches of a cached index, they have no feature id and no edge points """
+        matches = []
+        if vertices:
+            vertex = index.nearest_vertex(point.x(), point.y(), tolerance)
+            if vertex is not None:
+                matches.append(QgsPointLocator.Match(QgsPointLocator.Vertex, layer, -1, vertex[0],
+                                                     QgsPointXY(*vertex[1])))
+        if segments:
+            segment = index.nearest_segment(point.x(), point.y(), tolerance)
+            if segment is not None:
+                matches.append(QgsPointLocator.Match(QgsPointLocator.Edge, layer, -1, segment[0],
+                                                     QgsPointXY(*segment[1])))
+
+        return matches
+
+    def nearest_segment(self, point: QgsPointXY, tolerance: float) -> Optional[Tuple[float, Tuple, Tuple, Tuple]]:
+        """ nearest segment of the cached indexes, see `PackedSegmentIndex.nearest_segment`
+
+            :param point: point in canvas crs
+            :param tolerance: tolerance in canvas units
+        """
+        best = None
+        for index in self._packed.values():
+            segment = index.nearest_segment(point.x(), point.y(), tolerance)
+            if segment is not None and (best is None or segment[0] < best[0]):
+                best = segment
+
+        return best
+
+    def snap(self, point: QgsPointXY, layers: List[QgsVectorLayer],
+             match_filter: Optional[QgsPointLocator.MatchFilter] = None) -> QgsPointLocator.Match:
+        """ Fallback while indexing: snaps on layers with a finished index or a cached index.
+            Tolerance and snapping type of each layer are taken from `layer_snapping`.
+
+            :param point: point in canvas crs
+            :param layers: layers to snap on, see `snapping_layers`
+            :param match_filter: optional match filter
+        """
+        config = self.utils.config()
+        best = QgsPointLocator.Match()
+        if not config.enabled():
+            return best
+
+        settings = self.canvas.mapSettings()
+
+        for layer in layers:
+            tolerance, vertices, segments = layer_snapping(config, layer, settings)
+            matches = []
+            if not self.is_ready(layer):
+                index = self._packed.get(layer.id())
+                if index is None:
+                    continue
+
+                matches = self._snap_cached(index, layer, point, tolerance, vertices, segments)
+            else:
+                locator = self.utils.locatorForLayer(layer)
+                if not locator.hasIndex():
+                    continue
+
+                if vertices:
+                    matches.append(locator.nearestVertex(point, tolerance, match_filter, True))
+                if segments:
+                    matches.append(locator.nearestEdge(point, tolerance, match_filter, True))
+
+            for match in matches:
+                if not match.isValid() or (match_filter is not None and not match_filter.acceptMatch(match)):
+                    continue
+                # vertices before edges, then the shorter distance
+                if (not best.isValid() or (match.hasVertex() and not best.hasVertex())
+                        or (match.hasVertex() == best.hasVertex() and match.distance() < best.distance())):
+                    best = match
+
+        return best
+
+    def cancel(self):
+        """ stops listening, running tasks of QGIS will finish """
+        for layer_id in list(self._pending):
+            self._finished(layer_id)
+
+    def unload(self):
+        """ cancels and disconnects from project and canvas """
+        self.cancel()
+        # builds finishing later are ignored
+        self.cache = None
+        for signal, slot in ((QgsProject.instance().layersWillBeRemoved, self._layers_removed),
+                             (self.canvas.destinationCrsChanged, self.cancel)):
+            try:
+                signal.disconnect(slot)
+            except (RuntimeError, TypeError):
+                ...
@@ -0,0 +1,487 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from collections import Counter, OrderedDict
+from functools import partial
+from math import ceil, floor, log2
+
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
+
+from qgis.core import (QgsApplication, QgsCoordinateTransform, QgsFeatureRequest, QgsPointLocator,
+                       QgsPointXY, QgsProject, QgsRectangle, QgsTask, QgsVectorLayer, QgsVectorLayerFeatureSource)
+from qgis.gui import QgsMapCanvas
+
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from ..geometry.lines import geometry_lines
+from ..geometry.packed_index import PackedSegmentIndex
+from ..geometry.segment_index import SegmentIndex, Point
+from .index_cache import SnapIndexCache
+
+# layer id, pyramid level, tile x, tile y
+TileKey = Tuple[str, int, int, int]
+
+# tiles along the longer side of the visible extent
+TILES_ACROSS = 4
+# edits are collected before their tiles are loaded again (milliseconds)
+RELOAD_DELAY_MS = 300
+
+
+def tile_level(extent_size: float, min_tile_size: Optional[float] = None) -> int:
+    """ pyramid level of an extent: tiles have a size of 2 ** level canvas units,
+        about `TILES_ACROSS` tiles along the extent
+    """
+    return ceil(log2(max(extent_size / TILES_ACROSS, min_tile_size or 0.0, 1e-12)))
+
+
+def tile_rectangle(level: int, tx: int, ty: int) -> QgsRectangle:
+    size = 2.0 ** level
+    return QgsRectangle(tx * size, ty * size, (tx + 1) * size, (ty + 1) * size)
+
+
+def tile_range(level: int, rectangle: QgsRectangle) -> Iterator[Tuple[int, int]]:
+    size = 2.0 ** level
+    for tx in range(floor(rectangle.xMinimum() / size), floor(rectangle.xMaximum() / size) + 1):
+        for ty in range(floor(rectangle.yMinimum() / size), floor(rectangle.yMaximum() / size) + 1):
+            yield tx, ty
+
+
+def load_tile(source: QgsVectorLayerFeatureSource, transform: Optional[QgsCoordinateTransform],
+              level: int, tx: int, ty: int) -> SegmentIndex:
+    """ index of all segments touching a tile (canvas crs) """
+    rectangle = tile_rectangle(level, tx, ty)
+
+    request_rectangle = rectangle
+    if transform is not None:
+        request_rectangle = transform.transformBoundingBox(rectangle, QgsCoordinateTransform.ReverseTransform)
+
+    request = QgsFeatureRequest().setFilterRect(request_rectangle).setNoAttributes()
+    index = SegmentIndex(cell_size=2.0 ** level / 16)
+
+    for feature in source.getFeatures(request):
+        geometry = feature.geometry()
+        if transform is not None:
+            geometry.transform(transform)
+
+        for line in geometry_lines(geometry):
+            for p1, p2 in zip(line, line[1:]):
+                # only segments touching this tile, neighbours index the rest
+                if not rectangle.intersects(QgsRectangle(p1, p2)):
+                    continue
+                index.add_segment(p1.x(), p1.y(), p2.x(), p2.y())
+
+    return index
+
+
+class LoadTilesTask(QgsTask):
+    """ Loads tiles in background from copies of the layers' feature sources.
+
+        :param layers: layers and their layer to canvas transformation (None for equal crs)
+        :param keys: tiles to load
+    """
+    loaded = pyqtSignal(object, name="loaded")
+
+    def __init__(self, layers: Dict[str, Tuple[QgsVectorLayer, Optional[QgsCoordinateTransform]]],
+                 keys: List[TileKey]):
+        super().__init__("Fangkacheln laden", QgsTask.CanCancel)
+        self.keys = keys
+        self._sources = {layer_id: (QgsVectorLayerFeatureSource(layer),
+                                    QgsCoordinateTransform(transform) if transform is not None else None)
+                         for layer_id, (layer, transform) in layers.items()}
+        self._result: Dict[TileKey, SegmentIndex] = {}
+
+    def run(self) -> bool:
+        for number, key in enumerate(self.keys):
+            if self.isCanceled():
+                return False
+
+            source, transform = self._sources[key[0]]
+            self._result[key] = load_tile(source, transform, *key[1:])
+            self.setProgress(number * 100 / len(self.keys))
+
+        return True
+
+    def finished(self, result: bool):
+        if result:
+            self.loaded.emit(self._result)
+
+
+class TiledSnapIndex(QObject):
+    """ Snapping index, which only covers the visible canvas extent plus a margin.
+
+        The map is split into square tiles of a pyramid: the tile size is a power of 2 in canvas units,
+        which fits the current extent (see `tile_level`), zooming selects another level.
+        Missing tiles around the visible extent are loaded in a background task on panning/zooming,
+        loaded tiles of all levels are used meanwhile. The least recently used tiles are evicted,
+        when more than `max_vertices` are indexed. Edits of a layer load its tiles again.
+        Costs depend on the visible data, not on the layer size.
+
+        With a `SnapIndexCache`, file based layers are not tiled: their whole index is mapped
+        from the cache folder. A missing index is built in background, the layer is tiled meanwhile.
+
+        :param canvas: map canvas
+        :param layers: layers to snap on
+        :param margin: indexed margin around the extent, relative to the extent size
+        :param tile_size: smallest tile size in canvas units, defaults to no limit
+        :param max_vertices: memory cap, count of indexed vertices
+        :param max_tiles: tiles of the window, a coarser level is used for more
+        :param cache: optional on-disk cache of whole layer indexes
+    """
+    windowChanged = pyqtSignal(int, int, name="windowChanged")
+
+    def __init__(self, canvas: QgsMapCanvas, layers: List[QgsVectorLayer], margin: float = 0.5,
+                 tile_size: Optional[float] = None, max_vertices: int = 2_000_000, max_tiles: int = 256,
+                 cache: Optional[SnapIndexCache] = None):
+        super().__init__()
+        self.canvas = canvas
+        self.layers = [layer for layer in layers if isinstance(layer, QgsVectorLayer) and layer.isValid()]
+        self.margin = margin
+        self.min_tile_size = tile_size
+        self.max_vertices = max_vertices
+        self.max_tiles = max(max_tiles, 1)
+
+        self._tiles: "OrderedDict[TileKey, SegmentIndex]" = OrderedDict()
+        self._levels: Counter = Counter()
+        self._vertices = 0
+        self._level: Optional[int] = None
+        self._window: List[Tuple[int, int]] = []
+        self._transforms: Dict[str, Optional[QgsCoordinateTransform]] = {}
+        self._task: Optional[LoadTilesTask] = None
+        # tiles of edited layers, which are loaded again
+        self._stale: Set[TileKey] = set()
+        self._edited: Set[str] = set()
+
+        self.cache = cache
+        self._packed: Dict[str, PackedSegmentIndex] = {}
+
+        self._reload_timer = QTimer()
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(RELOAD_DELAY_MS)
+        self._reload_timer.timeout.connect(self._reload_edited)
+
+        self._edit_slots = {}
+        for layer in self.layers:
+            slot = self._edit_slots[layer.id()] = partial(self._layer_edited, layer.id())
+            for signal in (layer.featureAdded, layer.featureDeleted, layer.geometryChanged):
+                signal.connect(slot)
+
+        self.canvas.extentsChanged.connect(self.update_window)
+        self.canvas.destinationCrsChanged.connect(self._crs_changed)
+        self._open_cached()
+        self.update_window()
+
+    @property
+    def vertices(self) -> int:
+        """ count of indexed vertices """
+        return self._vertices
+
+    @property
+    def tiles(self) -> int:
+        return len(self._tiles)
+
+    @property
+    def tile_size(self) -> Optional[float]:
+        """ tile size of the current window in canvas units """
+        return None if self._level is None else 2.0 ** self._level
+
+    @property
+    def loading(self) -> bool:
+        return self._task is not None
+
+    @property
+    def cached_layers(self) -> List[str]:
+        """ ids of layers, which are snapped on a cached index """
+        return list(self._packed)
+
+    def _add(self, key: TileKey, index: SegmentIndex):
+        self._pop(key)
+        self._tiles[key] = index
+        self._levels[key[1]] += 1
+        self._vertices += len(index) * 2
+
+    def _pop(self, key: TileKey):
+        index = self._tiles.pop(key, None)
+        if index is not None:
+            self._levels[key[1]] -= 1
+            if not self._levels[key[1]]:
+                del self._levels[key[1]]
+            self._vertices -= len(index) * 2
+
+    def _cancel_task(self):
+        if self._task is not None:
+            try:
+                self._task.loaded.disconnect(self._tiles_loaded)
+            except (RuntimeError, TypeError):
+                ...
+            self._task.cancel()
+            self._task = None
+
+    def clear(self):
+        self._cancel_task()
+        self._tiles.clear()
+        self._levels.clear()
+        self._stale.clear()
+        self._transforms.clear()
+        self._vertices = 0
+
+    def _close_cached(self):
+        for index in self._packed.values():
+            index.close()
+        self._packed.clear()
+
+    def _crs_changed(self):
+        # cached indexes and tiles belong to one crs, a smallest tile size is in the units of the old crs
+        self.min_tile_size = None
+        self._close_cached()
+        self.clear()
+        self._open_cached()
+        self.update_window()
+
+    def _open_cached(self):
+        """ maps cached indexes, starts building missing ones """
+        if self.cache is None:
+            return
+
+        crs = self.canvas.mapSettings().destinationCrs()
+        for layer in self.layers:
+            index = self.cache.load(layer, crs)
+            if index is not None:
+                self._packed[layer.id()] = index
+                continue
+
+            task = self.cache.build(layer, crs)
+            if task is not None:
+                task.built.connect(self._cache_built)
+
+    def _cache_built(self, layer_id: str, path: str):
+        """ switches a tiled layer to its new cached index """
+        if self.cache is None or layer_id in self._packed:
+            return
+
+        layer = next((layer for layer in self.layers if layer.id() == layer_id), None)
+        if layer is None or self.cache.cache_path(layer, self.canvas.mapSettings().destinationCrs()) != path:
+            # layer was edited or crs changed meanwhile
+            return
+
+        try:
+            self._packed[layer_id] = PackedSegmentIndex(path)
+        except (OSError, ValueError):
+            return
+
+        for key in [key for key in self._tiles if key[0] == layer_id]:
+            self._pop(key)
+
+    def _transform(self, layer: QgsVectorLayer) -> Optional[QgsCoordinateTransform]:
+        """ layer to canvas transformation, None if both crs are equal """
+        if layer.id() not in self._transforms:
+            destination = self.canvas.mapSettings().destinationCrs()
+            transform = None
+            if layer.crs() != destination:
+                transform = QgsCoordinateTransform(layer.crs(), destination, QgsProject.instance())
+            self._transforms[layer.id()] = transform
+
+        return self._transforms[layer.id()]
+
+    def _layer_edited(self, layer_id: str, *_):
+        self._edited.add(layer_id)
+        self._reload_timer.start()
+
+    def _reload_edited(self):
+        """ edited layers: cached index does not match anymore, tiles are loaded again """
+        edited, self._edited = self._edited, set()
+        for layer_id in edited:
+            packed = self._packed.pop(layer_id, None)
+            if packed is not None:
+                packed.close()
+
+            for key in [key for key in self._tiles if key[0] == layer_id]:
+                if key[1] == self._level and key[2:] in self._window:
+                    # used until the new tile is loaded
+                    self._stale.add(key)
+                else:
+                    self._pop(key)
+
+        self.update_window()
+
+    def update_window(self):
+        """ loads all tiles of visible extent plus margin in background, evicts distant tiles """
+        extent = QgsRectangle(self.canvas.extent())
+        extent.grow(max(extent.width(), extent.height()) * self.margin)
+
+        level = tile_level(max(extent.width(), extent.height()), self.min_tile_size)
+        window = list(tile_range(level, extent))
+        while len(window) > self.max_tiles:
+            level += 1
+            window = list(tile_range(level, extent))
+
+        self._level = level
+        self._window = window
+
+        missing = []
+        for layer in self.layers:
+            if layer.id() in self._packed:
+                continue
+
+            for tx, ty in window:
+                key = (layer.id(), level, tx, ty)
+                if key in self._tiles:
+                    self._tiles.move_to_end(key)
+                    if key not in self._stale:
+                        continue
+                missing.append(key)
+
+        self._load(missing)
+        self._evict()
+        self.windowChanged.emit(len(window), self._vertices)
+
+    def _load(self, keys: List[TileKey]):
+        """ starts loading tiles, a running task for an older window is cancelled """
+        if self._task is not None and self._task.keys == keys:
+            return
+
+        self._cancel_task()
+        if not keys:
+            return
+
+        layers = {layer.id(): (layer, self._transform(layer)) for layer in self.layers
+                  if any(key[0] == layer.id() for key in keys)}
+        task = LoadTilesTask(layers, keys)
+        task.loaded.connect(self._tiles_loaded)
+        task.taskCompleted.connect(lambda t=task: self._task_finished(t))
+        task.taskTerminated.connect(lambda t=task: self._task_finished(t))
+        self._task = task
+        QgsApplication.taskManager().addTask(task)
+
+    def _task_finished(self, task: LoadTilesTask):
+        if self._task is task:
+            self._task = None
+
+    def _tiles_loaded(self, tiles: Dict[TileKey, SegmentIndex]):
+        for key, index in tiles.items():
+            if key[0] in self._packed or key[0] in self._edited:
+                continue
+
+            self._add(key, index)
+            self._stale.discard(key)
+
+        self._evict()
+        self.windowChanged.emit(len(self._window), self._vertices)
+
+    def _evict(self):
+        """ removes least recently used tiles outside of the window until memory cap is reached """
+        window = set(self._window)
+        for key in list(self._tiles):
+            if self._vertices <= self.max_vertices:
+                break
+
+            if key[1] == self._level and key[2:] in window:
+                continue
+
+            self._pop(key)
+            self._stale.discard(key)
+
+    def _indexes(self, point: QgsPointXY,
+                 tolerance: float) -> Iterator[Tuple[QgsVectorLayer, Union[SegmentIndex, PackedSegmentIndex]]]:
+        """ indexes of all layers around a point, tiles of the current level first """
+        area = QgsRectangle(point.x() - tolerance, point.y() - tolerance,
+                            point.x() + tolerance, point.y() + tolerance)
+        levels = sorted(self._levels, key=lambda level: level != self._level)
+        tiles = [(level, list(tile_range(level, area))) for level in levels]
+
+        for layer in self.layers:
+            packed = self._packed.get(layer.id())
+            if packed is not None:
+                yield layer, packed
+                continue
+
+            for level, ranges in tiles:
+                for tx, ty in ranges:
+                    index = self._tiles.get((layer.id(), level, tx, ty))
+                    if index is not None:
+                        yield layer, index
+
+    def nearest_segment(self, point: QgsPointXY,
+                        tolerance: float) -> Optional[Tuple[float, Point, Point, Point]]:
+        """ nearest segment of all layers within tolerance
+
+            :return: None or (distance, point on segment, segment start, segment end)
+        """
+        best = None
+        for _, index in self._indexes(point, tolerance):
+            segment = index.nearest_segment(point.x(), point.y(), tolerance)
+            if segment is not None and (best is None or segment[0] < best[0]):
+                best = segment
+
+        return best
+
+    def snap(self, point: QgsPointXY, tolerance: float, vertices: bool = True, segments: bool = True,
+             layer_settings: Optional[Dict[str, Tuple[float, bool, bool]]] = None) -> QgsPointLocator.Match:
+        """ nearest vertex or segment in tolerance (vertices before segments)
+
+            :param point: point in canvas crs
+            :param tolerance: tolerance in canvas units
+            :param vertices: snap on vertices
+            :param segments: snap on segments
+            :param layer_settings: tolerance, vertices and segments by layer id, e.g. of individual layer settings,
+                they replace the arguments above for their layers
+        """
+        layer_settings = layer_settings or {}
+        area = max([tolerance] + [settings[0] for settings in layer_settings.values()])
+
+        best_vertex = best_segment = None
+        for layer, index in self._indexes(point, area):
+            layer_tolerance, layer_vertices, layer_segments = layer_settings.get(layer.id(),
+                                                                                 (tolerance, vertices, segments))
+            if layer_vertices:
+                vertex = index.nearest_vertex(point.x(), point.y(), layer_tolerance)
+                if vertex is not None and (best_vertex is None or vertex[0] < best_vertex[0]):
+                    best_vertex = vertex + (layer,)
+
+            if layer_segments and best_vertex is None:
+                segment = index.nearest_segment(point.x(), point.y(), layer_tolerance)
+                if segment is not None and (best_segment is None or segment[0] < best_segment[0]):
+                    best_segment = segment + (layer,)
+
+        if best_vertex is not None:
+            distance, vertex, layer = best_vertex
+            return QgsPointLocator.Match(QgsPointLocator.Vertex, layer, -1, distance, QgsPointXY(*vertex))
+
+        if best_segment is not None:
+            distance, nearest, _, _, layer = best_segment
+            return QgsPointLocator.Match(QgsPointLocator.Edge, layer, -1, distance, QgsPointXY(*nearest))
+
+        return QgsPointLocator.Match()
+
+    def unload(self):
+        for signal, slot in ((self.canvas.extentsChanged, self.update_window),
+                             (self.canvas.destinationCrsChanged, self._crs_changed)):
+            try:
+                signal.disconnect(slot)
+            except (RuntimeError, TypeError):
+                ...
+
+        for layer in self.layers:
+            for signal in ("featureAdded", "featureDeleted", "geometryChanged"):
+                try:
+                    getattr(layer, signal).disconnect(self._edit_slots[layer.id()])
+                except (RuntimeError, TypeError):
+                    ...
+
+        self._reload_timer.stop()
+        self.clear()
+        self._close_cached()
+        # builds finishing later are ignored
+        self.cache = None
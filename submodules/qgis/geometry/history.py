@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+from .segment_index import Point
+
+# feature id of shapes without a recorded id, `FID_NULL` of QGIS
+UNKNOWN_FID = -2 ** 63
+
+
+class CornerHistory:
+    """ Compact undo history of created corners (lines or rectangles), newest last.
+
+        All corners share flat arrays of absolute vertex coordinates and of the feature ids
+        reported by the writer, one per shape. Popping the last corner only shortens the arrays.
+
+        .. code-block:: python
+
+            history = CornerHistory()
+            history.push([[(0, 0), (10, 0)], [(10, 0), (10, 10)]], [4, 5])
+            history.pop()  # ([[(0.0, 0.0), (10.0, 0.0)], [(10.0, 0.0), (10.0, 10.0)]], [4, 5])
+
+        :param max_corners: oldest corners are dropped above this count, -1 keeps all
+    """
+
+    def __init__(self, max_corners: int = 10_000):
+        self.max_corners = max_corners
+        # x, y values of all vertices
+        self._coordinates = array("d")
+        # vertex count of each shape
+        self._shape_sizes = array("I")
+        # feature id of each shape, `UNKNOWN_FID` if the writer did not report it
+        self._shape_fids = array("q")
+        # shape count of each corner
+        self._corner_shapes = array("B")
+
+    def __len__(self) -> int:
+        """ count of corners """
+        return len(self._corner_shapes)
+
+    def clear(self):
+        self._coordinates = array("d")
+        self._shape_sizes = array("I")
+        self._shape_fids = array("q")
+        self._corner_shapes = array("B")
+
+    def push(self, shapes: Sequence[Sequence[Point]], fids: Optional[Sequence[int]] = None):
+        """ records the shapes of one corner
+
+            :param shapes: vertices of each shape
+            :param fids: feature id of each shape, unknown ids if missing or not one per shape
+        """
+        if fids is None or len(fids) != len(shapes):
+            fids = [UNKNOWN_FID] * len(shapes)
+
+        shapes = [(shape, fid) for shape, fid in zip(shapes, fids) if shape]
+        if not shapes:
+            return
+
+        for shape, fid in shapes:
+            for x, y in shape:
+                self._coordinates.extend((x, y))
+            self._shape_sizes.append(len(shape))
+            self._shape_fids.append(fid)
+
+        self._corner_shapes.append(len(shapes))
+
+        if -1 < self.max_corners < len(self):
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        shapes = self._corner_shapes[0]
+        vertices = sum(self._shape_sizes[:shapes])
+        del self._coordinates[:vertices * 2]
+        del self._shape_sizes[:shapes]
+        del self._shape_fids[:shapes]
+        del self._corner_shapes[0]
+
+    def last(self) -> Tuple[List[List[Point]], List[int]]:
+        """ shapes and feature ids of the last corner, it is kept
+
+            :raises IndexError: history is empty
+        """
+        if not self._corner_shapes:
+            raise IndexError("no corner to undo")
+
+        shape_count = self._corner_shapes[-1]
+        sizes = self._shape_sizes[-shape_count:]
+        values = self._coordinates[-sum(sizes) * 2:]
+
+        shapes = []
+        offset = 0
+        for size in sizes:
+            shapes.append([(values[i], values[i + 1]) for i in range(offset, offset + size * 2, 2)])
+            offset += size * 2
+
+        return shapes, list(self._shape_fids[-shape_count:])
+
+    def pop(self) -> Tuple[List[List[Point]], List[int]]:
+        """ removes the last corner
+
+            :return: shapes and feature ids of the corner
+            :raises IndexError: history is empty
+        """
+        result = self.last()
+        shape_count = self._corner_shapes.pop()
+        vertices = sum(self._shape_sizes[-shape_count:])
+        del self._shape_sizes[-shape_count:]
+        del self._shape_fids[-shape_count:]
+        del self._coordinates[-vertices * 2:]
+        return result
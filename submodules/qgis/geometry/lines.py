@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from qgis.core import QgsGeometry, QgsPointXY, QgsWkbTypes
+
+from typing import Iterator, Sequence
+
+
+def geometry_lines(geometry: QgsGeometry) -> Iterator[Sequence[QgsPointXY]]:
+    """ all polylines of a geometry: line parts, polygon rings or single points """
+    if geometry.isNull():
+        return
+
+    geometry_type = geometry.type()
+    multi = geometry.isMultipart()
+
+    if geometry_type == QgsWkbTypes.LineGeometry:
+        yield from (geometry.asMultiPolyline() if multi else [geometry.asPolyline()])
+
+    elif geometry_type == QgsWkbTypes.PolygonGeometry:
+        for polygon in (geometry.asMultiPolygon() if multi else [geometry.asPolygon()]):
+            yield from polygon
+
+    elif geometry_type == QgsWkbTypes.PointGeometry:
+        for point in (geometry.asMultiPoint() if multi else [geometry.asPoint()]):
+            yield [point, point]
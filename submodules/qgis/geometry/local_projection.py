@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from functools import partial
+
+from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsProject
+
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from .local_tiles import TILE_DEGREES, Point, apply_local, local_proj, tile
+from .transform import transform_coordinates
+
+
+class LocalProjections:
+    """ Cached local conformal projections (transverse mercator) of a geographic crs.
+
+        Right angles in degrees are skewed away from the equator. Constructions run in a transverse mercator
+        projection centred on the tile of the start point a, which keeps angles and the datum of the layer,
+        the results are transformed back. Transforms are created once per tile and kept for the whole session.
+        The given points are returned unchanged, only new points (corners) are transformed back.
+
+        .. code-block:: python
+
+            projections = LocalProjections(layer.crs())
+            shapes = projections.apply(corner_lines, [xa, a, b])
+
+        :param crs: geographic crs of the layer
+        :param tile_degrees: tile size in degrees
+    """
+
+    def __init__(self, crs: QgsCoordinateReferenceSystem, tile_degrees: float = TILE_DEGREES):
+        self.crs = crs
+        self.tile_degrees = tile_degrees
+        self._proj = crs.toProj()
+        self._transforms: Dict[Tuple[int, int], Tuple[QgsCoordinateTransform, QgsCoordinateTransform]] = {}
+
+    def __len__(self) -> int:
+        return len(self._transforms)
+
+    def tile(self, point: Point) -> Tuple[int, int]:
+        return tile(point, self.tile_degrees)
+
+    def transforms(self, point: Point) -> Tuple[QgsCoordinateTransform, QgsCoordinateTransform]:
+        """ (layer -> local, local -> layer) transforms of the tile of `point` """
+        key = self.tile(point)
+        transforms = self._transforms.get(key)
+        if transforms is None:
+            local = QgsCoordinateReferenceSystem.fromProj(local_proj(self._proj, key, self.tile_degrees))
+            project = QgsProject.instance()
+            transforms = (QgsCoordinateTransform(self.crs, local, project),
+                          QgsCoordinateTransform(local, self.crs, project))
+            self._transforms[key] = transforms
+
+        return transforms
+
+    def apply(self, construction: Callable[..., List[List[Point]]],
+              points: Sequence[Point]) -> List[List[Point]]:
+        """ Runs a construction of shapes (e.g. `right_angle.corner_lines`) in the local projection,
+            see `apply_local`.
+
+            :param construction: gets the local points, returns shapes of local points
+            :param points: points in layer coordinates, the second one selects the tile
+            :raises QgsCsException: transformation failed
+        """
+        forward, inverse = self.transforms(points[1])
+        return apply_local(construction, points, partial(transform_coordinates, forward),
+                           partial(transform_coordinates, inverse))
+
+    def clear(self):
+        self._transforms.clear()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from math import floor
+
+from typing import Callable, List, Sequence, Tuple
+
+Point = Tuple[float, float]
+# transformation of many coordinates: (xs, ys) -> (xs, ys)
+Transform = Callable[[Sequence[float], Sequence[float]], Tuple[Sequence[float], Sequence[float]]]
+
+# size of the area tiles in degrees, one local projection per tile
+TILE_DEGREES = 1.0
+# parameters of the geographic crs, which are replaced by the local projection
+_REPLACED = ("+proj=", "+type=", "+units=", "+lat_0=", "+lon_0=", "+k=", "+x_0=", "+y_0=", "+no_defs")
+
+
+def tile(point: Point, tile_degrees: float = TILE_DEGREES) -> Tuple[int, int]:
+    """ area tile of a geographic point """
+    return floor(point[0] / tile_degrees), floor(point[1] / tile_degrees)
+
+
+def local_proj(proj: str, key: Tuple[int, int], tile_degrees: float = TILE_DEGREES) -> str:
+    """ Proj string of the transverse mercator projection centred on a tile.
+        Datum and ellipsoid of the geographic crs are kept.
+
+        :param proj: proj string of the geographic crs
+        :param key: tile, see `tile`
+    """
+    parameters = " ".join(part for part in proj.split() if not part.startswith(_REPLACED)) or "+ellps=WGS84"
+    longitude = (key[0] + 0.5) * tile_degrees
+    latitude = min(90.0, max(-90.0, (key[1] + 0.5) * tile_degrees))
+    return f"+proj=tmerc +lat_0={latitude} +lon_0={longitude} +k=1 +x_0=0 +y_0=0 {parameters} +units=m +no_defs"
+
+
+def apply_local(construction: Callable[..., List[List[Point]]], points: Sequence[Point],
+                forward: Transform, inverse: Transform) -> List[List[Point]]:
+    """ Runs a construction of shapes in a local projection. Both directions are transformed in one call each.
+        The given points are returned unchanged, only new points (corners) are transformed back.
+
+        :param construction: gets the local points, returns shapes of local points
+        :param points: points in layer coordinates
+        :param forward: layer -> local
+        :param inverse: local -> layer
+    """
+    local = list(zip(*forward([x for x, _ in points], [y for _, y in points])))
+
+    # given points are not transformed back, they stay bit identical (snapping, welding)
+    originals = dict(zip(local, ((x, y) for x, y in points)))
+    shapes = construction(*local)
+    new = list({point: None for shape in shapes for point in shape if point not in originals})
+    if new:
+        originals.update(zip(new, zip(*inverse([x for x, _ in new], [y for _, y in new]))))
+
+    return [[originals[point] for point in shape] for shape in shapes]
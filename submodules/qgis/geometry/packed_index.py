@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import sys
+
+from array import array
+from bisect import bisect_left
+from math import floor, hypot
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .segment_index import SegmentIndex, Point, closest_point_on_segment
+
+MAGIC = b"ERADIDX\0"
+VERSION = 1
+
+# magic, version, byte order, cell size, segments, cells, cell references, large segments
+_HEADER = struct.Struct("=8sIIdQQQQ")
+_BYTE_ORDER = 1 if sys.byteorder == "little" else 2
+
+# cell coordinates are combined into one sortable 64 bit key
+_CELL_SHIFT = 1 << 32
+_CELL_OFFSET = 1 << 31
+
+# cell references sorted in memory at once by `PackedIndexWriter`, more are merged from sorted runs on disk
+RUN_REFERENCES = 1 << 18
+# values per buffered write or read of temporary files
+_BLOCK = 1 << 16
+
+
+def cell_key(cx: int, cy: int) -> int:
+    """ sortable key of grid cell (cx, cy), cells are sorted by x, then y """
+    return cx * _CELL_SHIFT + (cy + _CELL_OFFSET)
+
+
+def _padded(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def write_index(index: SegmentIndex, path: str):
+    """ Writes a `SegmentIndex` into a memory-mappable file, see `PackedSegmentIndex`.
+        The file is written next to `path` first and replaced afterwards,
+        a reader never sees half written files.
+
+        :param index: index to write
+        :param path: file path
+    """
+    keys = sorted(index._cells, key=lambda cell: cell_key(*cell))
+    cell_keys = array("q", (cell_key(cx, cy) for cx, cy in keys))
+    offsets = array("Q", [0])
+    references = array("I")
+    for cell in keys:
+        references.extend(index._cells[cell])
+        offsets.append(len(references))
+    large = array("I", index._large)
+
+    header = _HEADER.pack(MAGIC, VERSION, _BYTE_ORDER, index.cell_size, len(index),
+                          len(cell_keys), len(references), len(large))
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(header)
+        for values in (index._segments, cell_keys, offsets, references, large):
+            data = values.tobytes()
+            file.write(data)
+            file.write(b"\0" * (_padded(len(data)) - len(data)))
+
+    os.replace(temp_path, path)
+
+
+class PackedIndexWriter:
+    """ Streams segments into a memory-mappable file, see `PackedSegmentIndex`.
+
+        Same file as `write_index`, but no `SegmentIndex` is built in memory: segments are written
+        into a temporary file right away, cell references are sorted in runs of `run_references`
+        and merged on `close`. Memory use depends on the run size and the count of used cells,
+        not on the count of segments.
+
+        .. code-block:: python
+
+            with PackedIndexWriter("roads.idx", cell_size=50) as writer:
+                writer.add_line([(0, 0), (100, 0), (100, 100)])
+
+        :param path: file path, written on `close`
+        :param cell_size: grid cell size in crs units
+        :param run_references: cell references per sorted run
+    """
+
+    def __init__(self, path: str, cell_size: float, run_references: int = RUN_REFERENCES):
+        self.path = path
+        self.run_references = max(run_references, 1)
+        # cell assignment of `SegmentIndex`, stays empty
+        self._grid = SegmentIndex(cell_size=cell_size)
+        self._temp_prefix = f"{path}.{os.getpid()}"
+        self._segments_file = open(f"{self._temp_prefix}.segments.tmp", "wb")
+        self._segments = array("d")
+        self._count = 0
+        # key << 32 | segment number, see `_flush_run`
+        self._run: List[int] = []
+        self._runs: List[str] = []
+        self._large = array("I")
+
+    @property
+    def cell_size(self) -> float:
+        return self._grid.cell_size
+
+    def __len__(self) -> int:
+        """ count of segments """
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, *args):
+        if exception_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add_segment(self, x1: float, y1: float, x2: float, y2: float):
+        index = self._count
+        self._count += 1
+        self._segments.extend((x1, y1, x2, y2))
+        if len(self._segments) >= _BLOCK:
+            self._flush_segments()
+
+        cells = self._grid._segment_cells(x1, y1, x2, y2)
+        if cells is None:
+            self._large.append(index)
+            return
+
+        self._run.extend(cell_key(cx, cy) * _CELL_SHIFT + index for cx, cy in cells)
+        if len(self._run) >= self.run_references:
+            self._flush_run()
+
+    def add_line(self, points: Sequence[Point]):
+        """ adds all segments of a polyline """
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            self.add_segment(x1, y1, x2, y2)
+
+    def _flush_segments(self):
+        self._segments.tofile(self._segments_file)
+        self._segments = array("d")
+
+    def _flush_run(self):
+        """ writes the sorted references as (key, segment number) pairs """
+        if not self._run:
+            return
+
+        self._run.sort()
+        path = f"{self._temp_prefix}.run{len(self._runs)}.tmp"
+        self._runs.append(path)
+        with open(path, "wb") as file:
+            for start in range(0, len(self._run), _BLOCK):
+                pairs = array("q")
+                for value in self._run[start:start + _BLOCK]:
+                    pairs.extend(divmod(value, _CELL_SHIFT))
+                pairs.tofile(file)
+        self._run = []
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[int]:
+        with open(path, "rb") as file:
+            while True:
+                pairs = array("q")
+                pairs.frombytes(file.read(_BLOCK * 16))
+                if not pairs:
+                    return
+
+                for position in range(0, len(pairs), 2):
+                    yield pairs[position] * _CELL_SHIFT + pairs[position + 1]
+
+    def _temp_files(self) -> List[str]:
+        return [f"{self._temp_prefix}.segments.tmp", f"{self._temp_prefix}.references.tmp"] + self._runs
+
+    def close(self):
+        """ merges the runs and writes the index file """
+        if self._segments_file is None:
+            return
+
+        try:
+            self._flush_segments()
+            self._segments_file.close()
+            self._flush_run()
+
+            # references are merged into their own file, keys and offsets of used cells stay in memory
+            cell_keys = array("q")
+            offsets = array("Q", [0])
+            references = 0
+            with open(f"{self._temp_prefix}.references.tmp", "wb") as file:
+                block = array("I")
+                for value in heapq.merge(*(self._read_run(path) for path in self._runs)):
+                    key, index = divmod(value, _CELL_SHIFT)
+                    if not cell_keys or cell_keys[-1] != key:
+                        if cell_keys:
+                            offsets.append(references)
+                        cell_keys.append(key)
+
+                    block.append(index)
+                    references += 1
+                    if len(block) >= _BLOCK:
+                        block.tofile(file)
+                        block = array("I")
+                block.tofile(file)
+
+            if cell_keys:
+                offsets.append(references)
+
+            header = _HEADER.pack(MAGIC, VERSION, _BYTE_ORDER, self.cell_size, self._count,
+                                  len(cell_keys), references, len(self._large))
+
+            temp_path = f"{self._temp_prefix}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(header)
+                for values in (f"{self._temp_prefix}.segments.tmp", cell_keys, offsets,
+                               f"{self._temp_prefix}.references.tmp", self._large):
+                    if isinstance(values, str):
+                        size = os.path.getsize(values)
+                        with open(values, "rb") as source:
+                            shutil.copyfileobj(source, file)
+                    else:
+                        data = values.tobytes()
+                        size = len(data)
+                        file.write(data)
+                    file.write(b"\0" * (_padded(size) - size))
+
+            os.replace(temp_path, self.path)
+        finally:
+            self.abort()
+
+    def abort(self):
+        """ removes the temporary files, the index file is not written """
+        if self._segments_file is not None:
+            self._segments_file.close()
+            self._segments_file = None
+
+        for path in self._temp_files() + [f"{self._temp_prefix}.tmp"]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                ...
+
+        self._run = []
+        self._runs = []
+
+
+class PackedSegmentIndex:
+    """ Read only segment index, mapped from a file written by `write_index`.
+
+        Same queries as `SegmentIndex`, but nothing is loaded on opening:
+        the operating system pages in only the cells, which are searched.
+
+        Layout (native byte order, each array padded to 8 bytes):
+
+            * header: magic, version, byte order, cell size and array lengths
+            * segments: x1, y1, x2, y2 as double
+            * cell keys: sorted int64, see `cell_key`
+            * cell offsets: uint64, start of each cell in cell references, plus end
+            * cell references: uint32 segment numbers
+            * large segments: uint32 segment numbers, always searched
+
+        .. code-block:: python
+
+            write_index(index, "roads.idx")
+            with PackedSegmentIndex("roads.idx") as packed:
+                packed.nearest_vertex(99, 2, tolerance=5)
+
+        :param path: index file path
+        :raises ValueError: file is no valid index file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file can not be mapped
+            self._file.close()
+            raise ValueError(f"file '{path}' is no index file")
+
+        try:
+            self._read()
+        except ValueError:
+            self.close()
+            raise
+
+    def _read(self):
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"file '{self.path}' is no index file")
+
+        magic, version, byte_order, cell_size, segments, cells, references, large = \
+            _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or byte_order != _BYTE_ORDER:
+            raise ValueError(f"file '{self.path}' is no index file of version {VERSION}")
+
+        self.cell_size = cell_size
+        view = memoryview(self._map)
+        offset = _HEADER.size
+        arrays = []
+        for code, item_size, count in (("d", 8, segments * 4), ("q", 8, cells), ("Q", 8, cells + 1),
+                                       ("I", 4, references), ("I", 4, large)):
+            size = item_size * count
+            if offset + size > len(self._map):
+                view.release()
+                raise ValueError(f"file '{self.path}' is truncated")
+
+            arrays.append(view[offset:offset + size].cast(code))
+            offset += _padded(size)
+
+        view.release()
+        self._segments, self._keys, self._offsets, self._references, self._large = arrays
+
+    def __len__(self) -> int:
+        """ count of segments """
+        return len(self._segments) // 4 if self._segments is not None else 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._map is None
+
+    def close(self):
+        """ releases the mapping, queries are not possible afterwards """
+        if self._map is None:
+            return
+
+        for view in (getattr(self, name, None) for name in ("_segments", "_keys", "_offsets",
+                                                             "_references", "_large")):
+            if view is not None:
+                view.release()
+
+        self._segments = self._keys = self._offsets = self._references = self._large = None
+        self._map.close()
+        self._map = None
+        self._file.close()
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def _cell_references(self, cx: int, cy: int) -> Iterable[int]:
+        key = cell_key(cx, cy)
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return ()
+
+        return self._references[self._offsets[position]:self._offsets[position + 1]]
+
+    def _candidates(self, x: float, y: float, tolerance: float) -> Iterable[int]:
+        cx1, cy1 = self._cell(x - tolerance, y - tolerance)
+        cx2, cy2 = self._cell(x + tolerance, y + tolerance)
+        seen = set(self._large)
+        yield from seen
+
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                for index in self._cell_references(cx, cy):
+                    if index not in seen:
+                        seen.add(index)
+                        yield index
+
+    def segment(self, index: int) -> Tuple[Point, Point]:
+        x1, y1, x2, y2 = self._segments[index * 4:index * 4 + 4]
+        return (x1, y1), (x2, y2)
+
+    def nearest_vertex(self, x: float, y: float, tolerance: float) -> Optional[Tuple[float, Point]]:
+        """ nearest segment end point within tolerance
+
+            :return: None or (distance, vertex)
+        """
+        best = None
+        segments = self._segments
+        for index in self._candidates(x, y, tolerance):
+            offset = index * 4
+            for vx, vy in ((segments[offset], segments[offset + 1]), (segments[offset + 2], segments[offset + 3])):
+                distance = hypot(x - vx, y - vy)
+                if distance <= tolerance and (best is None or distance < best[0]):
+                    best = (distance, (vx, vy))
+
+        return best
+
+    def nearest_segment(self, x: float, y: float,
+                        tolerance: float) -> Optional[Tuple[float, Point, Point, Point]]:
+        """ nearest point on a segment within tolerance
+
+            :return: None or (distance, point on segment, segment start, segment end)
+        """
+        best = None
+        segments = self._segments
+        for index in self._candidates(x, y, tolerance):
+            x1, y1, x2, y2 = segments[index * 4:index * 4 + 4]
+            px, py, distance = closest_point_on_segment(x, y, x1, y1, x2, y2)
+            if distance <= tolerance and (best is None or distance < best[0]):
+                best = (distance, (px, py), (x1, y1), (x2, y2))
+
+        return best
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from array import array
+from math import floor, hypot, nan
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Point = Tuple[float, float]
+
+
+def closest_point_on_segment(x: float, y: float, x1: float, y1: float,
+                             x2: float, y2: float) -> Tuple[float, float, float]:
+    """ closest point on segment (x1, y1) - (x2, y2) to point (x, y)
+
+        :return: x, y, distance
+    """
+    dx = x2 - x1
+    dy = y2 - y1
+    length = dx * dx + dy * dy
+    if length == 0:
+        return x1, y1, hypot(x - x1, y - y1)
+
+    t = ((x - x1) * dx + (y - y1) * dy) / length
+    t = min(1.0, max(0.0, t))
+    px = x1 + t * dx
+    py = y1 + t * dy
+    return px, py, hypot(x - px, y - py)
+
+
+class SegmentIndex:
+    """ Incremental in memory index (uniform grid) of line segments and their vertices.
+
+        New lines can be added at any time without rebuilding the index,
+        coordinates have to be in one crs.
+
+        .. code-block:: python
+
+            index = SegmentIndex(cell_size=50)
+            index.add_line([(0, 0), (100, 0), (100, 100)])
+            index.nearest_vertex(99, 2, tolerance=5)   # (2.236..., (100.0, 0.0))
+            index.nearest_segment(50, 2, tolerance=5)  # (2.0, (50.0, 0.0), (0.0, 0.0), (100.0, 0.0))
+
+        :param cell_size: grid cell size in crs units
+    """
+
+    # segments covering more cells are stored in a list, which is always searched
+    MAX_CELLS_PER_SEGMENT = 64
+
+    def __init__(self, cell_size: float = 50.0):
+        if cell_size <= 0:
+            raise ValueError("cell size must be greater than 0")
+
+        self.cell_size = cell_size
+        # x1, y1, x2, y2 for each segment
+        self._segments = array("d")
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._large: List[int] = []
+        self._removed = 0
+
+    def __len__(self) -> int:
+        """ count of segments """
+        return len(self._segments) // 4 - self._removed
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def clear(self):
+        self._segments = array("d")
+        self._cells.clear()
+        self._large.clear()
+        self._removed = 0
+
+    def _segment_cells(self, x1: float, y1: float, x2: float, y2: float) -> Optional[List[Tuple[int, int]]]:
+        """ cells of a segment, None for large segments """
+        cx1, cy1 = self._cell(min(x1, x2), min(y1, y2))
+        cx2, cy2 = self._cell(max(x1, x2), max(y1, y2))
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self.MAX_CELLS_PER_SEGMENT:
+            return None
+
+        return [(cx, cy) for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1)]
+
+    def add_segment(self, x1: float, y1: float, x2: float, y2: float):
+        index = len(self._segments) // 4
+        self._segments.extend((x1, y1, x2, y2))
+
+        cells = self._segment_cells(x1, y1, x2, y2)
+        if cells is None:
+            self._large.append(index)
+            return
+
+        for cell in cells:
+            self._cells.setdefault(cell, []).append(index)
+
+    def remove_segment(self, x1: float, y1: float, x2: float, y2: float) -> bool:
+        """ removes one segment with exactly these end points (either direction)
+
+            :return: a segment was removed
+        """
+        cells = self._segment_cells(x1, y1, x2, y2)
+        candidates = self._large if cells is None else self._cells.get(cells[0], [])
+        for index in candidates:
+            segment = self.segment(index)
+            if segment in (((x1, y1), (x2, y2)), ((x2, y2), (x1, y1))):
+                break
+        else:
+            return False
+
+        if cells is None:
+            self._large.remove(index)
+        else:
+            for cell in cells:
+                self._cells[cell].remove(index)
+
+        # removed segments are never found again, their slot is kept
+        self._segments[index * 4:index * 4 + 4] = array("d", (nan, nan, nan, nan))
+        self._removed += 1
+        return True
+
+    def add_line(self, points: Sequence[Point]):
+        """ adds all segments of a polyline """
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            self.add_segment(x1, y1, x2, y2)
+
+    def remove_line(self, points: Sequence[Point]):
+        """ removes all segments of a polyline added with `add_line` """
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            self.remove_segment(x1, y1, x2, y2)
+
+    def add_lines(self, lines: Iterable[Sequence[Point]]):
+        for line in lines:
+            self.add_line(line)
+
+    def _candidates(self, x: float, y: float, tolerance: float) -> Iterable[int]:
+        cx1, cy1 = self._cell(x - tolerance, y - tolerance)
+        cx2, cy2 = self._cell(x + tolerance, y + tolerance)
+        seen = set(self._large)
+        yield from self._large
+
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                for index in self._cells.get((cx, cy), ()):
+                    if index not in seen:
+                        seen.add(index)
+                        yield index
+
+    def segment(self, index: int) -> Tuple[Point, Point]:
+        x1, y1, x2, y2 = self._segments[index * 4:index * 4 + 4]
+        return (x1, y1), (x2, y2)
+
+    def nearest_vertex(self, x: float, y: float, tolerance: float) -> Optional[Tuple[float, Point]]:
+        """ nearest segment end point within tolerance
+
+            :return: None or (distance, vertex)
+        """
+        best = None
+        segments = self._segments
+        for index in self._candidates(x, y, tolerance):
+            offset = index * 4
+            for vx, vy in ((segments[offset], segments[offset + 1]), (segments[offset + 2], segments[offset + 3])):
+                distance = hypot(x - vx, y - vy)
+                if distance <= tolerance and (best is None or distance < best[0]):
+                    best = (distance, (vx, vy))
+
+        return best
+
+    def nearest_segment(self, x: float, y: float,
+                        tolerance: float) -> Optional[Tuple[float, Point, Point, Point]]:
+        """ nearest point on a segment within tolerance
+
+            :return: None or (distance, point on segment, segment start, segment end)
+        """
+        best = None
+        segments = self._segments
+        for index in self._candidates(x, y, tolerance):
+            x1, y1, x2, y2 = segments[index * 4:index * 4 + 4]
+            px, py, distance = closest_point_on_segment(x, y, x1, y1, x2, y2)
+            if distance <= tolerance and (best is None or distance < best[0]):
+                best = (distance, (px, py), (x1, y1), (x2, y2))
+
+        return best
+
+
+class SessionIndex:
+    """ Lines created in a session, kept in layer crs, and their `SegmentIndex` in map crs.
+
+        The map crs changes with the project crs, `rebuild` indexes all lines again afterwards.
+
+        .. code-block:: python
+
+            session = SessionIndex(lambda line: [(x + 1000, y) for x, y in line])
+            session.add_line([(0, 0), (100, 0)])
+            session.nearest_vertex(1099, 2, tolerance=5)  # (2.236..., (1100, 0))
+            session.rebuild()  # after the map crs changed
+
+        :param to_map: converts a line in layer coordinates into map coordinates
+        :param cell_size: grid cell size in map units
+    """
+
+    def __init__(self, to_map: Callable[[List[Point]], List[Point]], cell_size: float = 50.0):
+        self._to_map = to_map
+        self._lines: List[List[Point]] = []
+        self.index = SegmentIndex(cell_size=cell_size)
+
+    def __len__(self) -> int:
+        """ count of indexed segments """
+        return len(self.index)
+
+    @property
+    def lines(self) -> List[List[Point]]:
+        """ lines in layer crs """
+        return self._lines
+
+    def add_line(self, points: Sequence[Point]):
+        line = [(x, y) for x, y in points]
+        self._lines.append(line)
+        self.index.add_line(self._to_map(line))
+
+    def remove_line(self, points: Sequence[Point]):
+        """ removes a line added with `add_line` """
+        line = [(x, y) for x, y in points]
+        if line in self._lines:
+            self._lines.remove(line)
+            self.index.remove_line(self._to_map(line))
+
+    def rebuild(self):
+        """ indexes all lines again, e.g. with the conversion into a new map crs """
+        self.index.clear()
+        for line in self._lines:
+            self.index.add_line(self._to_map(line))
+
+    def nearest_vertex(self, x: float, y: float, tolerance: float) -> Optional[Tuple[float, Point]]:
+        """ see `SegmentIndex.nearest_vertex`, map coordinates """
+        return self.index.nearest_vertex(x, y, tolerance)
+
+    def nearest_segment(self, x: float, y: float,
+                        tolerance: float) -> Optional[Tuple[float, Point, Point, Point]]:
+        """ see `SegmentIndex.nearest_segment`, map coordinates """
+        return self.index.nearest_segment(x, y, tolerance)
@@ -15,8 +15,13 @@
  ***************************************************************************/
 """
 
+from array import array
+
 from qgis.core import (QgsCoordinateReferenceSystem, QgsCoordinateTransform,
-                       QgsGeometry, QgsProject)
+                       QgsGeometry, QgsLineString, QgsMapLayer, QgsPointXY, QgsProject)
+from qgis.gui import QgsMapCanvas
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 
 def get_transform(src_coordinate_system: QgsCoordinateReferenceSystem,
@@ -54,3 +59,155 @@ def transform_geometry(geometry: QgsGeometry, src_coordinate_system: QgsCoordina
     copy_geometry.transform(transform_params)
 
     return copy_geometry
+
+
+def transform_coordinates(transform: QgsCoordinateTransform, xs: Sequence[float], ys: Sequence[float],
+                          direction=QgsCoordinateTransform.ForwardTransform) -> Tuple[List[float], List[float]]:
+    """ Transforms many coordinates in one call.
+        The coordinates are packed into one line string, which is transformed at once in C++.
+
+        :param transform: transform object
+        :param xs: x coordinates
+        :param ys: y coordinates
+        :param direction: transform direction
+        :return: transformed x and y coordinates
+        :raises QgsCsException: transformation failed
+    """
+    if not xs:
+        return [], []
+
+    line = QgsLineString(list(xs), list(ys))
+    line.transform(transform, direction)
+    return line.xVector(), line.yVector()
+
+
+class CoordinateConverter:
+    """ Cached conversion of coordinates between layer crs and canvas crs.
+
+        Replaces `QgsMapTool.toMapCoordinates`/`toLayerCoordinates`, which look up the transformation on each call.
+        Equal crs are not transformed at all, other transformations are created once per layer.
+        Cached transformations are dropped, when the canvas crs, the crs of a layer or
+        the project's transform context changes.
+
+        .. code-block:: python
+
+            converter = CoordinateConverter(iface.mapCanvas())
+            map_point = converter.to_map(layer, QgsPointXY(10, 20))
+            map_xy = converter.to_map_array(layer, array("d", [10, 20, 11, 21]))
+            converter.unload()
+
+        :param canvas: map canvas, its destination crs is the map crs
+    """
+
+    def __init__(self, canvas: QgsMapCanvas):
+        self.canvas = canvas
+        # layer id -> layer to canvas transformation, None for equal crs
+        self._transforms: Dict[str, Optional[QgsCoordinateTransform]] = {}
+        self._layers: Dict[str, QgsMapLayer] = {}
+
+        self.canvas.destinationCrsChanged.connect(self.invalidate)
+        QgsProject.instance().transformContextChanged.connect(self.invalidate)
+
+    def _transform(self, layer: QgsMapLayer) -> Optional[QgsCoordinateTransform]:
+        layer_id = layer.id()
+        if layer_id in self._transforms:
+            return self._transforms[layer_id]
+
+        if layer_id not in self._layers:
+            self._layers[layer_id] = layer
+            layer.crsChanged.connect(self.invalidate)
+
+        destination = self.canvas.mapSettings().destinationCrs()
+        transform = None
+        if layer.crs() != destination:
+            transform = get_transform(layer.crs(), destination)
+
+        self._transforms[layer_id] = transform
+        return transform
+
+    def is_identity(self, layer: QgsMapLayer) -> bool:
+        """ layer and canvas have the same crs """
+        return self._transform(layer) is None
+
+    def to_map(self, layer: QgsMapLayer, point: QgsPointXY) -> QgsPointXY:
+        """ converts a point from layer crs to canvas crs """
+        transform = self._transform(layer)
+        if transform is None:
+            return QgsPointXY(point)
+
+        return transform.transform(QgsPointXY(point))
+
+    def to_layer(self, layer: QgsMapLayer, point: QgsPointXY) -> QgsPointXY:
+        """ converts a point from canvas crs to layer crs """
+        transform = self._transform(layer)
+        if transform is None:
+            return QgsPointXY(point)
+
+        return transform.transform(QgsPointXY(point), QgsCoordinateTransform.ReverseTransform)
+
+    def _convert_points(self, layer: QgsMapLayer, points: Iterable[QgsPointXY],
+                        direction: QgsCoordinateTransform.TransformDirection) -> List[QgsPointXY]:
+        transform = self._transform(layer)
+        points = [QgsPointXY(point) for point in points]
+        if transform is None:
+            return points
+
+        xs, ys = transform_coordinates(transform, [point.x() for point in points],
+                                       [point.y() for point in points], direction)
+        return [QgsPointXY(x, y) for x, y in zip(xs, ys)]
+
+    def to_map_points(self, layer: QgsMapLayer, points: Iterable[QgsPointXY]) -> List[QgsPointXY]:
+        """ converts points from layer crs to canvas crs """
+        return self._convert_points(layer, points, QgsCoordinateTransform.ForwardTransform)
+
+    def to_layer_points(self, layer: QgsMapLayer, points: Iterable[QgsPointXY]) -> List[QgsPointXY]:
+        """ converts points from canvas crs to layer crs """
+        return self._convert_points(layer, points, QgsCoordinateTransform.ReverseTransform)
+
+    def _convert_array(self, layer: QgsMapLayer, coordinates: Sequence[float],
+                       direction: QgsCoordinateTransform.TransformDirection) -> array:
+        transform = self._transform(layer)
+        result = array("d", coordinates)
+        if transform is None:
+            return result
+
+        # an odd last value is kept like it is
+        count = len(result) // 2 * 2
+        xs, ys = transform_coordinates(transform, result[0:count:2], result[1:count:2], direction)
+        result[0:count:2] = array("d", xs)
+        result[1:count:2] = array("d", ys)
+        return result
+
+    def to_map_array(self, layer: QgsMapLayer, coordinates: Sequence[float]) -> array:
+        """ converts interleaved coordinates x1, y1, x2, y2, ... from layer crs to canvas crs
+
+            :return: new array("d")
+        """
+        return self._convert_array(layer, coordinates, QgsCoordinateTransform.ForwardTransform)
+
+    def to_layer_array(self, layer: QgsMapLayer, coordinates: Sequence[float]) -> array:
+        """ converts interleaved coordinates x1, y1, x2, y2, ... from canvas crs to layer crs
+
+            :return: new array("d")
+        """
+        return self._convert_array(layer, coordinates, QgsCoordinateTransform.ReverseTransform)
+
+    def invalidate(self):
+        """ drops all cached transformations """
+        self._transforms.clear()
+
+    def unload(self):
+        for sender in [self.canvas, QgsProject.instance()] + list(self._layers.values()):
+            try:
+                if sender is self.canvas:
+                    sender.destinationCrsChanged.disconnect(self.invalidate)
+                elif isinstance(sender, QgsProject):
+                    sender.transformContextChanged.disconnect(self.invalidate)
+                else:
+                    sender.crsChanged.disconnect(self.invalidate)
+            except (RuntimeError, TypeError):
+                # layer already deleted
+                ...
+
+        self._layers.clear()
+        self.invalidate()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from math import floor, hypot
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .segment_index import Point
+
+
+class VertexHash:
+    """ Spatial hash of vertices, cell size is the tolerance: a search touches 3 x 3 cells.
+
+        :param tolerance: search distance in crs units
+    """
+
+    def __init__(self, tolerance: float):
+        if tolerance <= 0:
+            raise ValueError("tolerance must be greater than 0")
+
+        self.tolerance = tolerance
+        self._cells: Dict[Tuple[int, int], List[Point]] = {}
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return floor(x / self.tolerance), floor(y / self.tolerance)
+
+    def add(self, x: float, y: float):
+        self._cells.setdefault(self._cell(x, y), []).append((x, y))
+
+    def remove(self, x: float, y: float):
+        """ removes all occurrences of the vertex """
+        cell = self._cell(x, y)
+        vertices = self._cells.get(cell)
+        if vertices:
+            self._cells[cell] = [vertex for vertex in vertices if vertex != (x, y)]
+
+    def candidates(self, x: float, y: float) -> Iterable[Point]:
+        """ vertices of the 3 x 3 cells around (x, y), a superset of all vertices within tolerance """
+        cx, cy = self._cell(x, y)
+        for nx in (cx - 1, cx, cx + 1):
+            for ny in (cy - 1, cy, cy + 1):
+                yield from self._cells.get((nx, ny), ())
+
+    def nearest(self, x: float, y: float) -> Optional[Point]:
+        """ nearest vertex within tolerance, None if there is none """
+        best = None
+        best_distance = self.tolerance
+        for vertex in self.candidates(x, y):
+            distance = hypot(x - vertex[0], y - vertex[1])
+            if distance <= best_distance:
+                best, best_distance = vertex, distance
+
+        return best
+
+
+class SegmentHash:
+    """ Spatial hash of segments by their mid points, finds segments with both ends within tolerance.
+
+        :param tolerance: search distance in crs units
+    """
+
+    def __init__(self, tolerance: float):
+        self.tolerance = tolerance
+        self._mid_points = VertexHash(tolerance)
+        self._segments: Dict[Point, List[Tuple[Point, Point]]] = {}
+
+    def add(self, p1: Point, p2: Point):
+        mid = ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)
+        self._mid_points.add(*mid)
+        self._segments.setdefault(mid, []).append((p1, p2))
+
+    def remove(self, p1: Point, p2: Point):
+        """ removes the segment (either direction) """
+        mid = ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)
+        segments = [segment for segment in self._segments.get(mid, ()) if segment not in ((p1, p2), (p2, p1))]
+        if segments:
+            self._segments[mid] = segments
+        elif mid in self._segments:
+            del self._segments[mid]
+            self._mid_points.remove(*mid)
+
+    def _close(self, p1: Point, p2: Point) -> bool:
+        return hypot(p1[0] - p2[0], p1[1] - p2[1]) <= self.tolerance
+
+    def contains(self, p1: Point, p2: Point) -> bool:
+        """ an equal segment (either direction) is stored """
+        for mid in set(self._mid_points.candidates((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)):
+            for s1, s2 in self._segments[mid]:
+                if (self._close(p1, s1) and self._close(p2, s2)) or (self._close(p1, s2) and self._close(p2, s1)):
+                    return True
+
+        return False
+
+
+class Welder:
+    """ Welds new vertices onto existing vertices within tolerance and drops duplicate lines.
+
+        Existing geometry is added with `add_existing`, new lines pass `weld` and are
+        existing geometry for all following calls.
+
+        .. code-block:: python
+
+            welder = Welder(0.03)
+            welder.add_existing([(0, 0), (10, 0)])
+            welder.weld([[(10.01, 0), (10.01, 10)], [(0, 0), (10, 0)]])
+            # [[(10, 0), (10.01, 10)]], welder.welded == 1, welder.dropped == 1
+
+        :param tolerance: weld distance in crs units
+    """
+
+    def __init__(self, tolerance: float):
+        self.tolerance = tolerance
+        self._vertices = VertexHash(tolerance)
+        self._segments = SegmentHash(tolerance)
+        self.welded = 0
+        self.dropped = 0
+
+    def add_existing(self, line: Sequence[Point]):
+        """ adds vertices and segments of existing geometry """
+        for vertex in line:
+            self._vertices.add(*vertex)
+        for p1, p2 in zip(line, line[1:]):
+            self._segments.add(p1, p2)
+
+    def remove(self, line: Sequence[Point]):
+        """ Removes vertices and segments of a line, e.g. of an undone corner.
+            Other lines sharing them have to be added again with `add_existing`.
+        """
+        line = [tuple(vertex) for vertex in line]
+        for vertex in line:
+            self._vertices.remove(*vertex)
+        for p1, p2 in zip(line, line[1:]):
+            self._segments.remove(p1, p2)
+
+    def _weld_vertex(self, vertex: Point) -> Point:
+        nearest = self._vertices.nearest(*vertex)
+        if nearest is None or nearest == tuple(vertex):
+            return tuple(vertex)
+
+        self.welded += 1
+        return nearest
+
+    def weld(self, lines: Iterable[Sequence[Point]]) -> List[List[Point]]:
+        """ welded lines without duplicates of existing or previous lines
+
+            :param lines: new lines
+            :return: lines to write
+        """
+        result = []
+        for line in lines:
+            welded = []
+            for vertex in map(self._weld_vertex, line):
+                # welding can join neighbouring vertices
+                if not welded or welded[-1] != vertex:
+                    welded.append(vertex)
+
+            segments = list(zip(welded, welded[1:]))
+            if not segments or all(self._segments.contains(p1, p2) for p1, p2 in segments):
+                self.dropped += 1
+                continue
+
+            self.add_existing(welded)
+            result.append(welded)
+
+        return result
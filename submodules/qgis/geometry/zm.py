@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from math import isnan
+
+from qgis.core import (QgsFeatureRequest, QgsGeometry, QgsLineString, QgsPointXY, QgsPolygon,
+                       QgsRectangle, QgsVectorLayer, QgsWkbTypes)
+
+from typing import List, Optional, Sequence, Tuple
+
+# z and m value of a vertex, None if unknown
+ZM = Tuple[Optional[float], Optional[float]]
+
+
+def _interpolate(value1: Optional[float], value2: Optional[float], ratio: float) -> Optional[float]:
+    if value1 is None or value2 is None:
+        return value1 if value2 is None else value2
+
+    return value1 + (value2 - value1) * ratio
+
+
+def _value(value: float) -> Optional[float]:
+    return None if value is None or isnan(value) else value
+
+
+def sample_zm(layer: QgsVectorLayer, point: QgsPointXY, radius: float) -> ZM:
+    """ z and m value of the layer geometry at `point`, interpolated on the nearest segment
+
+        :param layer: layer with z and/or m values
+        :param point: point in layer crs
+        :param radius: search radius in layer units
+        :return: (z, m), None for values not found or not available
+    """
+    if not QgsWkbTypes.hasZ(layer.wkbType()) and not QgsWkbTypes.hasM(layer.wkbType()):
+        return None, None
+
+    rectangle = QgsRectangle(point.x() - radius, point.y() - radius, point.x() + radius, point.y() + radius)
+    request = QgsFeatureRequest().setFilterRect(rectangle).setNoAttributes()
+
+    best = None
+    for feature in layer.getFeatures(request):
+        geometry = feature.geometry()
+        distance, _, next_vertex, _ = geometry.closestSegmentWithContext(point)
+        if next_vertex > 0 and (best is None or distance < best[0]):
+            best = (distance, geometry, next_vertex)
+
+    if best is None:
+        return None, None
+
+    _, geometry, next_vertex = best
+    start = geometry.vertexAt(next_vertex - 1)
+    end = geometry.vertexAt(next_vertex)
+
+    length = start.distance(end)
+    ratio = QgsPointXY(start).distance(point) / length if length > 0 else 0.0
+    ratio = min(1.0, max(0.0, ratio))
+
+    return (_interpolate(_value(start.z()), _value(end.z()), ratio),
+            _interpolate(_value(start.m()), _value(end.m()), ratio))
+
+
+def complete_zm(first: ZM, second: ZM) -> Tuple[ZM, ZM]:
+    """ fills unknown values from the other vertex, 0.0 if both are unknown """
+    values = []
+    for own, other in ((first, second), (second, first)):
+        values.append(tuple(o if o is not None else (t if t is not None else 0.0) for o, t in zip(own, other)))
+
+    return values[0], values[1]
+
+
+def corner_zm(a: QgsPointXY, c: QgsPointXY, b: QgsPointXY, value_a: ZM, value_b: ZM) -> ZM:
+    """ z and m of corner c, linear along the path a -> c -> b """
+    length_ac = a.distance(c)
+    length = length_ac + c.distance(b)
+    ratio = length_ac / length if length > 0 else 0.0
+    return (_interpolate(value_a[0], value_b[0], ratio),
+            _interpolate(value_a[1], value_b[1], ratio))
+
+
+def make_geometry(points: Sequence[QgsPointXY], values: Sequence[ZM], wkb_type: QgsWkbTypes.Type) -> QgsGeometry:
+    """ Creates a line or polygon (closed ring `points`) geometry of the layer type `wkb_type`.
+        Z and m values are only set, if the type has them, multi types get one part.
+
+        :param points: vertices
+        :param values: (z, m) for each vertex
+        :param wkb_type: wkb type of the target layer
+    """
+    z = [value[0] or 0.0 for value in values] if QgsWkbTypes.hasZ(wkb_type) else []
+    m = [value[1] or 0.0 for value in values] if QgsWkbTypes.hasM(wkb_type) else []
+    line = QgsLineString([point.x() for point in points], [point.y() for point in points], z, m)
+
+    if QgsWkbTypes.geometryType(wkb_type) == QgsWkbTypes.PolygonGeometry:
+        polygon = QgsPolygon()
+        polygon.setExteriorRing(line)
+        geometry = QgsGeometry(polygon)
+    else:
+        geometry = QgsGeometry(line)
+
+    if QgsWkbTypes.isMultiType(wkb_type):
+        geometry.convertToMultiType()
+
+    return geometry
+
+
+def shape_values(shapes: List[List[QgsPointXY]], known: List[Tuple[QgsPointXY, ZM]]) -> List[List[ZM]]:
+    """ values of all shape vertices, looked up by position in `known` (point, values) """
+    result = []
+    for shape in shapes:
+        values = []
+        for point in shape:
+            values.append(min(known, key=lambda item: item[0].sqrDist(point))[1])
+        result.append(values)
+
+    return result
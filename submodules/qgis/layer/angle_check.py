@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import json
+import os
+
+from array import array
+
+from qgis.PyQt.QtCore import pyqtSignal, QVariant
+
+from qgis.core import (QgsFeature, QgsFeatureRequest, QgsField, QgsFields, QgsGeometry, QgsPointXY, QgsTask,
+                       QgsVectorLayer, QgsVectorLayerFeatureSource)
+
+from typing import List, Optional, Tuple
+
+from ..geometry.lines import geometry_lines
+from ...right_angle.quality import AngleStatistics, angle_violations
+
+# vertices per vectorized chunk
+CHUNK_VERTICES = 1_000_000
+# more violations are counted but not written into the violations layer
+MAX_VIOLATIONS = 1_000_000
+
+
+class AngleCheckTask(QgsTask):
+    """ Checks all vertex angles of a line layer in background, read-only.
+
+        Features are streamed from a copy of the layer's feature source, the vertices are
+        collected into chunks of `chunk_vertices` and their angles computed vectorized
+        (see `right_angle.quality`). Curved geometries are checked by their segmentized lines.
+
+        After completion `violations_layer` is a memory point layer with all almost right angles
+        (fid, vertex, angle, deviation), `statistics` holds histogram and summary and, if a
+        `report_path` was given, the summary is written as JSON file.
+
+        :param layer: line layer to check
+        :param max_deviation: largest deviation from 90 degrees, which counts as a violation
+        :param tolerance: smaller deviations count as exact right angles
+        :param report_path: JSON file for summary and histogram
+        :param chunk_vertices: vertices per vectorized chunk
+    """
+    checked = pyqtSignal(name="checked")
+
+    def __init__(self, layer: QgsVectorLayer, max_deviation: float = 5.0, tolerance: float = 0.01,
+                 report_path: Optional[str] = None, chunk_vertices: int = CHUNK_VERTICES):
+        super().__init__(f"Rechte Winkel in '{layer.name()}' prüfen", QgsTask.CanCancel)
+        self.layer_name = layer.name()
+        self.crs = layer.crs()
+        self.report_path = report_path
+        self.statistics = AngleStatistics(max_deviation, tolerance)
+        self.violations: List[Tuple[int, int, float, float, float]] = []
+        self.violations_layer: Optional[QgsVectorLayer] = None
+        self.error = None
+
+        self._source = QgsVectorLayerFeatureSource(layer)
+        self._features = max(layer.featureCount(), 1)
+        self._chunk_vertices = chunk_vertices
+
+    def run(self) -> bool:
+        xs, ys, starts = array("d"), array("d"), array("q", [0])
+        fids, offsets = array("q"), array("q")
+
+        request = QgsFeatureRequest().setNoAttributes()
+        for number, feature in enumerate(self._source.getFeatures(request)):
+            if self.isCanceled():
+                return False
+
+            vertex = 0
+            for line in geometry_lines(feature.geometry()):
+                xs.extend(point.x() for point in line)
+                ys.extend(point.y() for point in line)
+                starts.append(len(xs))
+                fids.append(feature.id())
+                offsets.append(vertex)
+                vertex += len(line)
+
+            if len(xs) >= self._chunk_vertices:
+                self._check(xs, ys, starts, fids, offsets)
+                xs, ys, starts = array("d"), array("d"), array("q", [0])
+                fids, offsets = array("q"), array("q")
+                self.setProgress(number * 100 / self._features)
+
+        self._check(xs, ys, starts, fids, offsets)
+
+        if self.report_path is not None:
+            try:
+                self._write_report()
+            except OSError as e:
+                self.error = str(e)
+
+        return True
+
+    def _check(self, xs: array, ys: array, starts: array, fids: array, offsets: array):
+        """ checks one chunk of lines """
+        if not xs:
+            return
+
+        for part, vertex, angle in angle_violations(xs, ys, starts, self.statistics):
+            if len(self.violations) >= MAX_VIOLATIONS:
+                break
+
+            i = starts[part] + vertex
+            self.violations.append((fids[part], offsets[part] + vertex, xs[i], ys[i], angle))
+
+    def _write_report(self):
+        summary = self.statistics.summary()
+        summary["layer"] = self.layer_name
+        summary["written_violations"] = len(self.violations)
+
+        folder = os.path.dirname(self.report_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with open(self.report_path, "w", encoding="utf-8") as file:
+            # NaN is not valid JSON
+            json.dump({key: None if isinstance(value, float) and value != value else value
+                       for key, value in summary.items()}, file, indent=2)
+
+    def _create_layer(self) -> QgsVectorLayer:
+        """ memory point layer of the violations, created in the main thread """
+        layer = QgsVectorLayer("Point", f"Winkelfehler {self.layer_name}", "memory")
+        layer.setCrs(self.crs)
+
+        fields = QgsFields()
+        fields.append(QgsField("fid", QVariant.LongLong))
+        fields.append(QgsField("vertex", QVariant.Int))
+        fields.append(QgsField("angle", QVariant.Double))
+        fields.append(QgsField("deviation", QVariant.Double))
+        provider = layer.dataProvider()
+        provider.addAttributes(fields)
+        layer.updateFields()
+
+        features = []
+        for fid, vertex, x, y, angle in self.violations:
+            feature = QgsFeature(layer.fields())
+            feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+            feature.setAttributes([fid, vertex, angle, angle - 90])
+            features.append(feature)
+
+            if len(features) >= 10000:
+                provider.addFeatures(features)
+                features = []
+
+        provider.addFeatures(features)
+        layer.updateExtents()
+        return layer
+
+    def finished(self, result: bool):
+        if result:
+            self.violations_layer = self._create_layer()
+            self.violations = []
+            self.checked.emit()
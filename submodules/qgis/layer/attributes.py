@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import json
+
+from qgis.core import (QgsExpression, QgsExpressionContext, QgsExpressionContextScope,
+                       QgsExpressionContextUtils, QgsFeature, QgsFields, QgsVectorLayer)
+
+from typing import Dict, Iterable, List, Tuple
+
+# layer custom property with JSON {field name: expression}
+EXPRESSIONS_PROPERTY = "easy_right_angle_draw/field_expressions"
+
+
+def field_expressions(layer: QgsVectorLayer) -> Dict[str, str]:
+    """ configured expressions of a layer, {field name: expression} """
+    try:
+        expressions = json.loads(layer.customProperty(EXPRESSIONS_PROPERTY, "{}") or "{}")
+    except ValueError:
+        return {}
+
+    return expressions if isinstance(expressions, dict) else {}
+
+
+def set_field_expressions(layer: QgsVectorLayer, expressions: Dict[str, str]):
+    """ stores the expressions of a layer in the layer (saved with the project)
+
+        :param layer: target layer
+        :param expressions: {field name: expression}, empty expressions are removed
+    """
+    expressions = {name: expression for name, expression in expressions.items() if expression}
+    if expressions:
+        layer.setCustomProperty(EXPRESSIONS_PROPERTY, json.dumps(expressions))
+    else:
+        layer.removeCustomProperty(EXPRESSIONS_PROPERTY)
+
+
+class AttributeFiller:
+    """ Fills attributes of new features from expressions.
+
+        Expressions are the layer's default value expressions (attribute form configuration),
+        overridden by the configured expressions of `field_expressions`. All expressions and the
+        expression context (global, project and layer scope) are prepared once, `fill` only evaluates.
+
+        Additional variables:
+
+            * `right_angle_feature`: number of the feature in this session, starting with 1
+
+        .. code-block:: python
+
+            filler = AttributeFiller(layer, layer.dataProvider().fields())
+            filler.fill(features)  # e.g. "length" = $length, "created" = now(), "user" = @user_account_name
+
+        :param layer: target layer, source of expressions and context
+        :param fields: fields of the new features
+    """
+
+    def __init__(self, layer: QgsVectorLayer, fields: QgsFields):
+        self.layer = layer
+        self.errors: List[str] = []
+        self._count = 0
+
+        self._scope = QgsExpressionContextScope("Easy Right Angle Drawing")
+        self._context = QgsExpressionContext(QgsExpressionContextUtils.globalProjectLayerScopes(layer))
+        self._context.appendScope(self._scope)
+        self._context.setFields(fields)
+
+        configured = field_expressions(layer)
+        layer_fields = layer.fields()
+
+        self._expressions: List[Tuple[int, str, QgsExpression]] = []
+        for index, field in enumerate(fields):
+            text = configured.get(field.name())
+            if not text:
+                layer_index = layer_fields.indexOf(field.name())
+                if layer_index < 0:
+                    continue
+                text = layer_fields.at(layer_index).defaultValueDefinition().expression()
+
+            if not text:
+                continue
+
+            expression = QgsExpression(text)
+            if expression.hasParserError():
+                self._error(f"{field.name()}: {expression.parserErrorString()}")
+                continue
+
+            expression.prepare(self._context)
+            self._expressions.append((index, field.name(), expression))
+
+    def _error(self, message: str):
+        # same error of each feature is reported once
+        if message not in self.errors:
+            self.errors.append(message)
+
+    def __bool__(self) -> bool:
+        """ there is something to evaluate """
+        return bool(self._expressions)
+
+    def fill(self, features: Iterable[QgsFeature]):
+        """ evaluates all expressions for each feature, values are set in place.
+            Failed evaluations keep the attribute unchanged, see `errors`.
+        """
+        if not self._expressions:
+            return
+
+        context = self._context
+        for feature in features:
+            self._count += 1
+            self._scope.setVariable("right_angle_feature", self._count)
+            context.setFeature(feature)
+
+            for index, name, expression in self._expressions:
+                value = expression.evaluate(context)
+                if expression.hasEvalError():
+                    self._error(f"{name}: {expression.evalErrorString()}")
+                    continue
+
+                feature.setAttribute(index, value)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import json
+import os
+
+from datetime import datetime
+from functools import partial
+
+from qgis.core import QgsFeature, QgsGeometry, QgsProject, QgsVectorLayer
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .journal_format import (FEATURES_RECORD, HEADER_RECORD, MAGIC, SUFFIX, features_payload, find_journals,
+                             journal_pid, pack_record, read_journal)
+
+
+def _attribute(value: Any) -> Any:
+    """ json compatible attribute value, Qt types (dates, ...) as text """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if hasattr(value, "isNull") and value.isNull():
+        return None
+
+    if hasattr(value, "toString"):
+        try:
+            return value.toString(1)  # Qt.ISODate
+        except TypeError:
+            return value.toString()
+
+    return str(value)
+
+
+class SessionJournal:
+    """ Append only binary journal of the features of one drawing session.
+
+        Each `append` writes one record, which is flushed to the file immediately:
+        after a crash all complete records can be written into the layer with `replay_journal`.
+        A record is type, length and crc32, followed by the payload. Features are stored as WKB and
+        JSON attributes (see `journal_format`). A torn record at the end of the file is ignored on reading.
+
+        .. code-block:: python
+
+            journal = SessionJournal(folder, layer)
+            journal.append(features)   # before writing them into the layer
+            journal.truncate()         # all recorded features are saved, the session goes on
+            journal.discard()          # features are saved in the layer, session finished
+
+        :param folder: journal folder
+        :param layer: target layer
+    """
+
+    def __init__(self, folder: str, layer: QgsVectorLayer):
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f"session_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}_{id(self)}{SUFFIX}")
+        self.features = 0
+
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC)
+        self._write(HEADER_RECORD, json.dumps({
+            "layer_id": layer.id(),
+            "name": layer.name(),
+            "source": layer.source(),
+            "provider": layer.providerType(),
+            "project": QgsProject.instance().fileName(),
+            "pid": os.getpid(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+        }).encode("utf-8"))
+        self._header_size = self._file.tell()
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def _write(self, record_type: int, payload: bytes):
+        self._file.write(pack_record(record_type, payload))
+        self._file.flush()
+
+    def append(self, features: List[QgsFeature]):
+        """ records new features (geometry and attributes) """
+        if self._file is None:
+            return
+
+        self._write(FEATURES_RECORD, features_payload([
+            (bytes(feature.geometry().asWkb()),
+             {field.name(): _attribute(value) for field, value in zip(feature.fields(), feature.attributes())})
+            for feature in features]))
+        self.features += len(features)
+
+    def truncate(self):
+        """ removes all feature records, their features are saved in the layer """
+        if self._file is None or not self.features:
+            return
+
+        self._file.seek(self._header_size)
+        self._file.truncate()
+        self._file.flush()
+        self.features = 0
+
+    def close(self):
+        """ closes the file, the journal is kept for `replay_journal` """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """ closes and removes the journal, all features are saved """
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            ...
+
+
+class UnsavedJournals:
+    """ Journals of finished sessions, whose features are still in the edit buffer of their layer.
+
+        A journal is discarded, when the edits of its layer are saved or rolled back
+        (the layer is not modified anymore). The connections to the layer are removed afterwards
+        and on `clear`, e.g. when the plugin is unloaded.
+    """
+
+    def __init__(self):
+        self._layers: Dict[str, Tuple[QgsVectorLayer, List[SessionJournal], Callable]] = {}
+
+    def keep(self, journal: SessionJournal, layer: QgsVectorLayer):
+        """ discards the closed `journal`, when the edits of `layer` are saved or rolled back """
+        entry = self._layers.get(layer.id())
+        if entry is None:
+            slot = partial(self._edits_finished, layer.id())
+            entry = self._layers[layer.id()] = (layer, [], slot)
+            layer.afterCommitChanges.connect(slot)
+            layer.editingStopped.connect(slot)
+
+        entry[1].append(journal)
+
+    def _edits_finished(self, layer_id: str):
+        layer, journals, _ = self._layers[layer_id]
+        if layer.isModified():
+            # commit failed, the features are still in the edit buffer only
+            return
+
+        for journal in journals:
+            journal.discard()
+        self._release(layer_id)
+
+    def _release(self, layer_id: str):
+        layer, _, slot = self._layers.pop(layer_id)
+        for signal in ("afterCommitChanges", "editingStopped"):
+            try:
+                getattr(layer, signal).disconnect(slot)
+            except (RuntimeError, TypeError):
+                ...
+
+    def clear(self):
+        """ disconnects from all layers, the journals are kept """
+        for layer_id in list(self._layers):
+            self._release(layer_id)
+
+
+def journal_layer(header: Dict[str, Any]) -> Optional[QgsVectorLayer]:
+    """ target layer of a journal: from the current project, else opened from its source """
+    project = QgsProject.instance()
+    layer = project.mapLayer(header.get("layer_id", ""))
+    if isinstance(layer, QgsVectorLayer) and layer.source() == header.get("source"):
+        return layer
+
+    for layer in project.mapLayers().values():
+        if isinstance(layer, QgsVectorLayer) and layer.source() == header.get("source") and \
+                layer.providerType() == header.get("provider"):
+            return layer
+
+    layer = QgsVectorLayer(header.get("source", ""), header.get("name", ""), header.get("provider", "ogr"))
+    return layer if layer.isValid() else None
+
+
+def replay_journal(path: str, layer: Optional[QgsVectorLayer] = None) -> int:
+    """ Writes all features of a journal with one `addFeatures` into its layer.
+        Editable layers get the features into their edit buffer. The caller removes the journal afterwards.
+
+        :param path: journal file
+        :param layer: target layer, defaults to `journal_layer`
+        :return: count of written features
+        :raises ValueError: journal is invalid, layer not found or features could not be written
+    """
+    header, records = read_journal(path)
+    if layer is None:
+        layer = journal_layer(header)
+    if layer is None:
+        raise ValueError(f"Layer '{header.get('name')}' ({header.get('source')}) nicht gefunden")
+
+    fields = layer.fields() if layer.isEditable() else layer.dataProvider().fields()
+    features = []
+    for wkb, attributes in records:
+        feature = QgsFeature(fields)
+        geometry = QgsGeometry()
+        geometry.fromWkb(wkb)
+        feature.setGeometry(geometry)
+        for name, value in attributes.items():
+            index = fields.indexOf(name)
+            if index >= 0 and value is not None:
+                feature.setAttribute(index, value)
+        features.append(feature)
+
+    if features:
+        if layer.isEditable():
+            ok = layer.addFeatures(features)
+        else:
+            ok, _ = layer.dataProvider().addFeatures(features)
+            layer.updateExtents()
+            layer.triggerRepaint()
+
+        if not ok:
+            raise ValueError(f"Features konnten nicht in '{layer.name()}' geschrieben werden")
+
+    return len(features)
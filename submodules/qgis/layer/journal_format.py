@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import glob
+import json
+import os
+import struct
+import zlib
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+MAGIC = b"ERAJRNL1"
+SUFFIX = ".jrnl"
+
+# record: type, payload length, crc32 of payload
+_RECORD = struct.Struct("<BII")
+HEADER_RECORD = 1
+FEATURES_RECORD = 2
+_LENGTH = struct.Struct("<I")
+
+
+def pack_record(record_type: int, payload: bytes) -> bytes:
+    """ record of a journal: type, length and crc32, followed by the payload """
+    return _RECORD.pack(record_type, len(payload), zlib.crc32(payload)) + payload
+
+
+def features_payload(features: Sequence[Tuple[bytes, Dict[str, Any]]]) -> bytes:
+    """ payload of a features record
+
+        :param features: [(wkb, attributes by field name)], attributes are json compatible
+    """
+    parts = [_LENGTH.pack(len(features))]
+    for wkb, attributes in features:
+        attributes = json.dumps(attributes).encode("utf-8")
+        parts.extend((_LENGTH.pack(len(wkb)), wkb, _LENGTH.pack(len(attributes)), attributes))
+
+    return b"".join(parts)
+
+
+def _records(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    offset = len(MAGIC)
+    while offset + _RECORD.size <= len(data):
+        record_type, length, crc = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        payload = data[offset:offset + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            # torn write of the crash
+            return
+        offset += length
+        yield record_type, payload
+
+
+def _features(payload: bytes) -> List[Tuple[bytes, Dict[str, Any]]]:
+    features = []
+    offset = _LENGTH.size
+    for _ in range(_LENGTH.unpack_from(payload, 0)[0]):
+        wkb_length = _LENGTH.unpack_from(payload, offset)[0]
+        offset += _LENGTH.size
+        wkb = payload[offset:offset + wkb_length]
+        offset += wkb_length
+
+        attributes_length = _LENGTH.unpack_from(payload, offset)[0]
+        offset += _LENGTH.size
+        attributes = json.loads(payload[offset:offset + attributes_length].decode("utf-8"))
+        offset += attributes_length
+        if len(wkb) < wkb_length or not isinstance(attributes, dict):
+            raise ValueError("invalid feature")
+        features.append((wkb, attributes))
+
+    return features
+
+
+def read_journal(path: str) -> Tuple[Dict[str, Any], List[Tuple[bytes, Dict[str, Any]]]]:
+    """ Reads all complete records of a journal, a torn record at the end and all following bytes are ignored.
+
+        :return: header, [(wkb, attributes by field name)]
+        :raises ValueError: file is no journal or a complete record is corrupt
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+
+    if not data.startswith(MAGIC):
+        raise ValueError(f"file '{path}' is no session journal")
+
+    header = None
+    features = []
+    for record_type, payload in _records(data):
+        try:
+            if record_type == HEADER_RECORD:
+                header = json.loads(payload.decode("utf-8"))
+            elif record_type == FEATURES_RECORD:
+                features.extend(_features(payload))
+        except (struct.error, ValueError) as e:
+            raise ValueError(f"journal '{path}' has a corrupt record: {e}")
+
+    if not isinstance(header, dict):
+        raise ValueError(f"journal '{path}' has no header")
+
+    return header, features
+
+
+def journal_pid(path: str) -> Optional[int]:
+    """ id of the process, which wrote a journal ("session_<date>_<time>_<pid>_<number>.jrnl"), None if unknown """
+    parts = os.path.basename(path)[:-len(SUFFIX)].split("_")
+    try:
+        return int(parts[3]) if len(parts) == 5 else None
+    except ValueError:
+        return None
+
+
+def process_running(pid: int) -> bool:
+    """ process `pid` exists, e.g. another QGIS instance with an open drawing session """
+    if pid <= 0:
+        return False
+
+    if pid == os.getpid():
+        return True
+
+    if os.name == "nt":
+        # os.kill terminates processes on windows
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED, the process exists
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+
+    return True
+
+
+def find_journals(folder: str, exclude_running: bool = True) -> List[str]:
+    """ journals left in a folder, e.g. after a crash
+
+        :param folder: journal folder
+        :param exclude_running: skips journals of running processes, this and other QGIS instances
+            have open sessions. Journals without a known process are returned.
+    """
+    journals = sorted(glob.glob(os.path.join(folder, f"*{SUFFIX}")))
+    if not exclude_running:
+        return journals
+
+    return [path for path in journals if not process_running(journal_pid(path) or 0)]
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import os
+import sqlite3
+
+from qgis.PyQt.QtCore import QTimer
+
+from qgis.core import QgsFeature, QgsTransaction, QgsVectorLayer
+
+from typing import List, Optional
+
+from ..canvas.index_cache import layer_file
+
+# an open undo command blocks QGIS' undo, it is closed after this idle time (milliseconds)
+COMMAND_TIMEOUT_MS = 1500
+
+
+class FeatureWriter:
+    """ Writes new features of a drawing session into the target layer.
+
+        `add` hands features over, `flush` makes sure they are written.
+        Use `create_writer` to get the writer for a layer.
+
+        :param layer: target layer
+    """
+    # written features are only visible after a repaint, see `RightAngleTool._refresh_layer`
+    deferred = False
+    # features are committed in batches, not on each repaint
+    session_batch = False
+
+    def __init__(self, layer: QgsVectorLayer):
+        self.layer = layer
+        self.error: Optional[str] = None
+        # problems, which did not lose features
+        self.warning: Optional[str] = None
+        self.written = 0
+        # feature ids of the last `add`
+        self.added_fids: List[int] = []
+
+    @property
+    def uncommitted(self) -> int:
+        """ count of features in the layer, which are not saved in the data source yet """
+        return 0
+
+    def add(self, features: List[QgsFeature]) -> bool:
+        raise NotImplementedError
+
+    def flush(self) -> bool:
+        return self.error is None
+
+    def close(self) -> bool:
+        """ writes remaining features, the writer is not used afterwards """
+        return self.flush()
+
+
+class EditBufferWriter(FeatureWriter):
+    """ Editable layers: features go into the edit buffer, the user saves them.
+
+        Corners are grouped into undo commands: one entry on the layer's undo stack
+        for up to `corners_per_command` corners instead of one per feature.
+        While a command is open, QGIS can not undo. It is closed after `COMMAND_TIMEOUT_MS`
+        without a new corner, before the layer commits or rolls back its edits and on `close`.
+
+        :param layer: editable layer
+        :param corners_per_command: corners (`add` calls) of one undo command
+    """
+
+    def __init__(self, layer: QgsVectorLayer, corners_per_command: int = 1):
+        super().__init__(layer)
+        self.corners_per_command = max(1, corners_per_command)
+        self._corners = 0
+
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(COMMAND_TIMEOUT_MS)
+        self._timer.timeout.connect(self.flush)
+        self.layer.beforeCommitChanges.connect(self._edits_finishing)
+        self.layer.beforeRollBack.connect(self._edits_finishing)
+        self.layer.editingStopped.connect(self._edits_finishing)
+
+    def _edits_finishing(self, *_):
+        self.flush()
+
+    @property
+    def command_open(self) -> bool:
+        return self._corners > 0
+
+    def add(self, features: List[QgsFeature]) -> bool:
+        if not self.command_open:
+            self.layer.beginEditCommand("Easy Right Angle Drawing")
+
+        # one by one: the ids of the edit buffer are set in the features
+        self.added_fids = []
+        for feature in features:
+            if not self.layer.addFeature(feature):
+                self._timer.stop()
+                self.layer.destroyEditCommand()
+                self._corners = 0
+                self.added_fids = []
+                self.error = "Features konnten nicht hinzugefügt werden"
+                return False
+            self.added_fids.append(feature.id())
+
+        self.written += len(features)
+        self._corners += 1
+        if self._corners >= self.corners_per_command:
+            self.flush()
+        else:
+            self._timer.start()
+
+        return True
+
+    def flush(self) -> bool:
+        self._timer.stop()
+        if self.command_open:
+            self.layer.endEditCommand()
+            self._corners = 0
+
+        return self.error is None
+
+    def close(self) -> bool:
+        result = self.flush()
+        for signal in ("beforeCommitChanges", "beforeRollBack", "editingStopped"):
+            try:
+                getattr(self.layer, signal).disconnect(self._edits_finishing)
+            except (RuntimeError, TypeError):
+                ...
+
+        return result
+
+
+class ProviderWriter(FeatureWriter):
+    """ Generic fallback: each call is written into the data provider immediately. """
+    deferred = True
+
+    def _write(self, features: List[QgsFeature]) -> bool:
+        ok, added = self.layer.dataProvider().addFeatures(features)
+        if not ok:
+            self.added_fids = []
+            self.error = "; ".join(self.layer.dataProvider().errors()[-3:]) or "Schreiben fehlgeschlagen"
+            return False
+
+        self.added_fids = [feature.id() for feature in added]
+        self.written += len(features)
+        return True
+
+    def add(self, features: List[QgsFeature]) -> bool:
+        return self._write(features)
+
+
+class GeoPackageWriter(ProviderWriter):
+    """ GeoPackage fast path.
+
+        The OGR provider writes each `addFeatures` call in its own SQLite transaction,
+        which is synced to disk together with its R-tree update of the spatial index.
+        This writer opens one transaction (`QgsTransaction`) and writes each corner into it:
+        the features are in the layer right away (rendering, snapping, undo), the file is committed
+        every `batch_size` features, on `flush` (undo) and on `close`. R-tree pages are written once per commit.
+        Features, which are not committed yet, are lost on a crash, the session journal keeps them.
+        Without a transaction (e.g. file locked), each corner is written on its own.
+        The transaction is committed, before the user starts editing the layer.
+
+        With `wal`, the file is switched to WAL journaling for the session, readers (rendering, snapping)
+        do not block the writes. The previous journal mode is restored on `close`.
+
+        :param layer: GeoPackage layer
+        :param batch_size: features of one commit
+        :param wal: use WAL journaling while writing
+    """
+    session_batch = True
+
+    def __init__(self, layer: QgsVectorLayer, batch_size: int = 1000, wal: bool = False):
+        super().__init__(layer)
+        self.batch_size = batch_size
+        self._transaction: Optional[QgsTransaction] = None
+        self._uncommitted = 0
+        self._previous_mode: Optional[str] = None
+        if wal:
+            self._previous_mode = set_journal_mode(layer_file(layer), "wal")
+        self.layer.beforeEditingStarted.connect(self._editing_starting)
+
+    def _editing_starting(self):
+        # a failed commit is reported by `close`, when the tool switches to the edit buffer
+        self.flush()
+
+    @property
+    def uncommitted(self) -> int:
+        return self._uncommitted
+
+    def _begin(self):
+        transaction = QgsTransaction.create({self.layer})
+        if transaction is None:
+            return
+
+        ok, _ = transaction.begin()
+        if ok:
+            self._transaction = transaction
+
+    def add(self, features: List[QgsFeature]) -> bool:
+        if self._transaction is None:
+            self._begin()
+
+        if not self._write(features):
+            return False
+
+        if self._transaction is None:
+            # written in its own transaction
+            return True
+
+        self._uncommitted += len(features)
+        if self._uncommitted >= self.batch_size:
+            return self.flush()
+
+        return True
+
+    def flush(self) -> bool:
+        if self._transaction is None:
+            return self.error is None
+
+        # deleted with the last reference, the provider is detached from the transaction
+        transaction, self._transaction = self._transaction, None
+        ok, error = transaction.commit()
+        if not ok:
+            transaction.rollback()
+            self.error = error or "Transaktion konnte nicht abgeschlossen werden"
+
+        self._uncommitted = 0
+        return ok and self.error is None
+
+    def close(self) -> bool:
+        result = self.flush()
+        try:
+            self.layer.beforeEditingStarted.disconnect(self._editing_starting)
+        except (RuntimeError, TypeError):
+            ...
+
+        if self._previous_mode is not None and self._previous_mode != "wal":
+            if set_journal_mode(layer_file(self.layer), self._previous_mode) is None:
+                self.warning = (f"Journalmodus '{self._previous_mode}' der GeoPackage-Datei konnte nicht "
+                                f"wiederhergestellt werden, sie bleibt im WAL-Modus")
+            self._previous_mode = None
+
+        return result
+
+
+def set_journal_mode(path: Optional[str], mode: str) -> Optional[str]:
+    """ switches the journal mode of a SQLite/GeoPackage file (WAL is stored in the file)
+
+        :return: previous journal mode, None if the file could not be switched (e.g. locked)
+    """
+    if not path or not os.path.isfile(path):
+        return None
+
+    try:
+        connection = sqlite3.connect(path, timeout=1)
+        try:
+            previous = str(connection.execute("PRAGMA journal_mode").fetchone()[0]).lower()
+            current = str(connection.execute(f"PRAGMA journal_mode={mode}").fetchone()[0]).lower()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+
+    return previous if current == mode.lower() else None
+
+
+def is_geopackage(layer: QgsVectorLayer) -> bool:
+    path = layer_file(layer)
+    return layer.providerType() == "ogr" and path is not None and path.lower().endswith(".gpkg")
+
+
+def create_writer(layer: QgsVectorLayer, batch_size: int = 1000, corners_per_command: int = 1,
+                  wal: bool = False) -> FeatureWriter:
+    """ writer for a layer: edit buffer, GeoPackage fast path or the generic provider writer
+
+        :param layer: target layer
+        :param batch_size: see `GeoPackageWriter`
+        :param corners_per_command: see `EditBufferWriter`
+        :param wal: see `GeoPackageWriter`
+    """
+    if layer.isEditable():
+        return EditBufferWriter(layer, corners_per_command)
+
+    if is_geopackage(layer):
+        return GeoPackageWriter(layer, batch_size, wal)
+
+    return ProviderWriter(layer)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from array import array
+from math import nan
+from typing import Any, Optional, Tuple
+
+from .construction import corner
+from .predicates import DegenerateInputError, ERROR_BOUND, MIN_LENGTH_SQUARED
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# arrays with less points are computed in pure python, numpy does not pay off
+NUMPY_MIN_POINTS = 64
+
+
+def as_doubles(buffer: Any) -> memoryview:
+    """ Read only double view of any buffer-protocol object (array, bytes, numpy array, Arrow buffer),
+        the data is not copied.
+
+        :raises ValueError: buffer is not contiguous or its size is no multiple of 8 bytes
+    """
+    view = memoryview(buffer)
+    if view.format == "d" and view.ndim == 1:
+        return view
+
+    if not view.c_contiguous:
+        raise ValueError("coordinate buffer must be contiguous")
+
+    view = view.cast("B")
+    if len(view) % 8:
+        raise ValueError("coordinate buffer size is no multiple of 8 bytes")
+
+    return view.cast("d")
+
+
+def _check_lengths(*views: memoryview):
+    if len({len(view) for view in views}) != 1:
+        raise ValueError("coordinate buffers have different lengths")
+
+
+def _corners_python(xa_x, xa_y, a_x, a_y, b_x, b_y, out_x: array, out_y: array):
+    for i in range(len(a_x)):
+        try:
+            c_x, c_y = corner((xa_x[i], xa_y[i]), (a_x[i], a_y[i]), (b_x[i], b_y[i]))
+        except DegenerateInputError:
+            c_x = c_y = nan
+
+        out_x.append(c_x)
+        out_y.append(c_y)
+
+
+def _corners_numpy(xa_x, xa_y, a_x, a_y, b_x, b_y) -> Tuple[Any, Any]:
+    # same floating point path as `predicates.project` and `predicates.orientation`,
+    # rows outside of the error bounds are computed again by `corner`
+    d_x = a_x - xa_x
+    d_y = a_y - xa_y
+    v_x = b_x - a_x
+    v_y = b_y - a_y
+    dot_x = d_x * v_x
+    dot_y = d_y * v_y
+    dot = dot_x + dot_y
+    left = d_x * v_y
+    right = d_y * v_x
+    length_squared = d_x * d_x + d_y * d_y
+
+    with numpy.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        t = dot / length_squared
+        c_x = a_x + d_x * t
+        c_y = a_y + d_y * t
+        uncertain = ~((numpy.abs(dot) > ERROR_BOUND * (numpy.abs(dot_x) + numpy.abs(dot_y)))
+                      & (numpy.abs(left - right) > ERROR_BOUND * (numpy.abs(left) + numpy.abs(right)))
+                      & (length_squared > MIN_LENGTH_SQUARED) & (length_squared < numpy.inf))
+
+    for i in numpy.nonzero(uncertain)[0]:
+        try:
+            c_x[i], c_y[i] = corner((xa_x[i], xa_y[i]), (a_x[i], a_y[i]), (b_x[i], b_y[i]))
+        except DegenerateInputError:
+            c_x[i] = c_y[i] = numpy.nan
+
+    return c_x, c_y
+
+
+def corners_separated(xa_x: Any, xa_y: Any, a_x: Any, a_y: Any, b_x: Any, b_y: Any) -> Tuple[Any, Any]:
+    """ Corners c of many right angles from separated coordinate buffers (GeoArrow "separated"/struct).
+        Degenerate rows (no direction, see `corner`) get NaN.
+
+        :param xa_x: x of the direction points, any buffer-protocol object of doubles, same for all others
+        :return: (c_x, c_y) as array("d") or numpy arrays, both support the buffer protocol
+    """
+    views = [as_doubles(buffer) for buffer in (xa_x, xa_y, a_x, a_y, b_x, b_y)]
+    _check_lengths(*views)
+
+    if numpy is not None and len(views[0]) >= NUMPY_MIN_POINTS:
+        return _corners_numpy(*(numpy.asarray(view) for view in views))
+
+    out_x = array("d")
+    out_y = array("d")
+    _corners_python(*views, out_x, out_y)
+    return out_x, out_y
+
+
+def corners_interleaved(xa: Any, a: Any, b: Any) -> Any:
+    """ Corners c of many right angles from interleaved coordinate buffers x0, y0, x1, y1, ...
+        (GeoArrow "interleaved" point, fixed size list of 2 doubles). Degenerate rows get NaN.
+
+        .. code-block:: python
+
+            c = corners_interleaved(array("d", [0, 0]), array("d", [10, 0]), array("d", [13, 5]))
+            # array('d', [13.0, 0.0])
+
+        :return: interleaved corners as array("d") or numpy array
+    """
+    views = [as_doubles(buffer) for buffer in (xa, a, b)]
+    _check_lengths(*views)
+    if len(views[0]) % 2:
+        raise ValueError("interleaved coordinates need an even count of values")
+
+    if numpy is not None and len(views[0]) // 2 >= NUMPY_MIN_POINTS:
+        xa, a, b = (numpy.asarray(view).reshape(-1, 2) for view in views)
+        c_x, c_y = _corners_numpy(xa[:, 0], xa[:, 1], a[:, 0], a[:, 1], b[:, 0], b[:, 1])
+        return numpy.column_stack((c_x, c_y)).ravel()
+
+    out_x = array("d")
+    out_y = array("d")
+    xa, a, b = views
+    # strided views: x values start at 0, y values at 1
+    _corners_python(xa[0::2], xa[1::2], a[0::2], a[1::2], b[0::2], b[1::2], out_x, out_y)
+    result = array("d", bytes(len(out_x) * 16))
+    result[0::2] = out_x
+    result[1::2] = out_y
+    return result
+
+
+def corners_rows(rows: Any) -> Any:
+    """ Corners c from row-major coordinates, each row xa_x, xa_y, a_x, a_y, b_x, b_y
+        (e.g. a binary file or a table with 6 double columns).
+
+        :return: interleaved corners as array("d") or numpy array
+    """
+    view = as_doubles(rows)
+    if len(view) % 6:
+        raise ValueError("rows need 6 values: xa_x, xa_y, a_x, a_y, b_x, b_y")
+
+    if numpy is not None and len(view) // 6 >= NUMPY_MIN_POINTS:
+        values = numpy.asarray(view).reshape(-1, 6)
+        c_x, c_y = _corners_numpy(*(values[:, column] for column in range(6)))
+        return numpy.column_stack((c_x, c_y)).ravel()
+
+    out_x = array("d")
+    out_y = array("d")
+    _corners_python(*(view[column::6] for column in range(6)), out_x, out_y)
+    result = array("d", bytes(len(out_x) * 16))
+    result[0::2] = out_x
+    result[1::2] = out_y
+    return result
+
+
+def opposite_corners(a: Any, b: Any, c: Any) -> Any:
+    """ fourth corners d = a + b - c of the rectangles, interleaved or separated buffers of one axis """
+    views = [as_doubles(buffer) for buffer in (a, b, c)]
+    _check_lengths(*views)
+
+    if numpy is not None and len(views[0]) >= NUMPY_MIN_POINTS:
+        a, b, c = (numpy.asarray(view) for view in views)
+        return a + b - c
+
+    return array("d", (va + vb - vc for va, vb, vc in zip(*views)))
+
+
+def to_arrow_points(coordinates: Any, name: str = "geometry") -> Tuple[Any, Any]:
+    """ Wraps interleaved coordinates without copying into a GeoArrow point column
+        (fixed size list of 2 doubles with extension name "geoarrow.point"), needs pyarrow.
+
+        :return: (pyarrow field, pyarrow array), e.g. for `pyarrow.table` and parquet
+        :raises ImportError: pyarrow is not installed
+    """
+    import pyarrow
+
+    view = as_doubles(coordinates)
+    values = pyarrow.Array.from_buffers(pyarrow.float64(), len(view), [None, pyarrow.py_buffer(view)])
+    points = pyarrow.FixedSizeListArray.from_arrays(values, 2)
+    field = pyarrow.field(name, points.type, metadata={b"ARROW:extension:name": b"geoarrow.point",
+                                                        b"ARROW:extension:metadata": b"{}"})
+    return field, points
+
+
+def from_arrow_points(column: Any) -> Optional[memoryview]:
+    """ interleaved coordinates of a GeoArrow point column (pyarrow, fixed size list of 2 doubles)
+        without copying, None if the column has null points
+    """
+    if column.null_count:
+        return None
+
+    values = column.flatten() if hasattr(column, "flatten") else column.values
+    data = values.buffers()[1]
+    view = as_doubles(data)
+    return view[values.offset:values.offset + len(values)]
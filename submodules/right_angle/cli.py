@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import getopt
+import sys
+
+from contextlib import ExitStack
+
+from .formats import FORMATS, READERS, WRITERS, construct, format_from_path
+from .outofcore import DEFAULT_CHUNK_ROWS, process_file
+
+
+def run(argv) -> int:
+    """ Streams corners from an input file to an output file.
+
+        .. code-block::
+
+            python path/to/plugin/right_angle_cli.py -i corners.csv -o result.geojson
+            cat corners.geojsonl | python path/to/plugin/right_angle_cli.py -f geojsonseq -r > rectangles.geojsonl
+
+        Arguments:
+
+            * `-i` input file, defaults to stdin ("-")
+            * `-o` output file, defaults to stdout ("-")
+            * `-f` input format "csv", "geojson", "geojsonseq" or "f64", defaults to the input file extension
+            * `-c` rows per chunk for "f64", defaults to 1048576
+            * `-t` output format, defaults to the output file extension or the input format
+            * `-r` rectangles (polygons) instead of right angles
+
+        Input is csv with the columns xa_x, xa_y, a_x, a_y, b_x, b_y or GeoJSON LineStrings with
+        the three vertices xa, a, b. Other columns/properties are copied into the output.
+
+        "f64" are binary files of float64 rows (xa_x, xa_y, a_x, a_y, b_x, b_y -> c_x, c_y) of any size.
+        They are processed out-of-core in chunks, an interrupted job continues with the next run.
+
+        Degenerate rows (e.g. xa equals a) are skipped with a message on stderr.
+
+        :return: count of written corners
+    """
+    opts, args = getopt.getopt(argv, "i:o:f:t:c:rh", [])
+    map_ = dict(opts)
+    if "-h" in map_:
+        print(run.__doc__)
+        return 0
+
+    source = map_.get("-i", "-")
+    target = map_.get("-o", "-")
+    input_format = map_.get("-f") or format_from_path(source)
+    output_format = map_.get("-t") or (format_from_path(target) if target != "-" else input_format)
+    as_rectangle = "-r" in map_
+
+    if input_format == "f64":
+        if source == "-" or target == "-":
+            raise ValueError("f64 needs input and output files")
+        return process_file(source, target, int(map_.get("-c", DEFAULT_CHUNK_ROWS)))
+
+    for name in (input_format, output_format):
+        if name not in FORMATS:
+            raise ValueError(f"unknown format '{name}', use one of {', '.join(FORMATS)}")
+
+    count = 0
+    with ExitStack() as stack:
+        file_in = sys.stdin if source == "-" else stack.enter_context(open(source, "r", encoding="utf-8", newline=""))
+        file_out = sys.stdout if target == "-" else stack.enter_context(open(target, "w", encoding="utf-8", newline=""))
+
+        def counted(results):
+            nonlocal count
+            for result in results:
+                count += 1
+                yield result
+
+        def skipped(number: int, reason: str):
+            print(f"row {number} skipped: {reason}", file=sys.stderr)
+
+        results = construct(READERS[input_format](file_in), as_rectangle, skipped)
+        WRITERS[output_format](file_out, counted(results), as_rectangle)
+
+    return count
+
+
+def from_sys_args(argv=None) -> int:
+    try:
+        return run(sys.argv[1:] if argv is None else argv)
+    except (getopt.GetoptError, ValueError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return -1
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from typing import Iterable, Iterator, List, Tuple
+
+from .predicates import DegenerateInputError, Point, orientation, project
+
+
+def corner(xa: Point, a: Point, b: Point) -> Point:
+    """ Corner c of the right angle: a -> c continues the direction xa -> a, c -> b is perpendicular to it.
+
+        c = a + d * ((b - a) · d) / (d · d) with d = a - xa, see `predicates.project`.
+        If b is exactly on the direction line, c is b.
+
+        :param xa: point before a, gives the direction
+        :param a: start point of the right angle
+        :param b: end point of the right angle
+        :raises DegenerateInputError: xa and a are equal or coordinates are not finite
+    """
+    c = project(xa, a, b)
+    if orientation(xa, a, b) == 0:
+        return b[0], b[1]
+
+    return c
+
+
+def corner_lines(xa: Point, a: Point, b: Point) -> List[List[Point]]:
+    """ both lines of the right angle [[a, c], [c, b]], lines of zero length are left out
+
+        :raises DegenerateInputError: see `corner`, a and b are equal
+    """
+    c = corner(xa, a, b)
+    lines = [line for line in ([tuple(a), c], [c, tuple(b)]) if line[0] != line[1]]
+    if not lines:
+        raise DegenerateInputError("start and end point are equal")
+
+    return lines
+
+
+def rectangle(xa: Point, a: Point, b: Point) -> List[Point]:
+    """ closed ring [a, c, b, d, a] of the rectangle with the diagonal a - b, d = a + (b - c)
+
+        :raises DegenerateInputError: see `corner`, the rectangle has no area
+    """
+    cx, cy = corner(xa, a, b)
+    if (cx, cy) == (a[0], a[1]) or (cx, cy) == (b[0], b[1]):
+        raise DegenerateInputError("rectangle has no area")
+
+    d = (a[0] + b[0] - cx, a[1] + b[1] - cy)
+    return [tuple(a), (cx, cy), tuple(b), d, tuple(a)]
+
+
+def corners(rows: Iterable[Tuple[Point, Point, Point]]) -> Iterator[Point]:
+    """ corner c of each (xa, a, b), see `corner` """
+    for xa, a, b in rows:
+        yield corner(xa, a, b)
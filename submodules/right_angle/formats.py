@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import csv
+import json
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .construction import Point, corner, corner_lines, rectangle
+from .predicates import DegenerateInputError
+
+# csv input columns: direction point xa, start a, end b
+CSV_COLUMNS = ("xa_x", "xa_y", "a_x", "a_y", "b_x", "b_y")
+FORMATS = ("csv", "geojson", "geojsonseq")
+
+Row = Tuple[Tuple[Point, Point, Point], Dict[str, Any]]
+# corner c, lines or ring, properties
+Result = Tuple[Point, List[List[Point]], Dict[str, Any]]
+
+
+def format_from_path(path: str) -> str:
+    """ format name from file extension, csv for unknown extensions and stdin/stdout """
+    lower = path.lower()
+    if lower.endswith((".f64", ".bin")):
+        return "f64"
+    if lower.endswith((".geojsonl", ".geojsons", ".ndjson", ".jsonl")):
+        return "geojsonseq"
+    if lower.endswith((".geojson", ".json")):
+        return "geojson"
+    return "csv"
+
+
+def read_csv(file: TextIO) -> Iterator[Row]:
+    """ rows with the columns of `CSV_COLUMNS`, other columns are kept as properties """
+    for record in csv.DictReader(file):
+        try:
+            values = [float(record.pop(name)) for name in CSV_COLUMNS]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"csv column missing: {e}") from e
+
+        points = (values[0], values[1]), (values[2], values[3]), (values[4], values[5])
+        yield points, record
+
+
+def _feature_row(feature: Dict[str, Any]) -> Row:
+    """ line feature with three vertices xa, a, b """
+    coordinates = (feature.get("geometry") or {}).get("coordinates") or []
+    if len(coordinates) != 3:
+        raise ValueError("GeoJSON features need a LineString with three vertices xa, a, b")
+
+    xa, a, b = (tuple(position[:2]) for position in coordinates)
+    return (xa, a, b), feature.get("properties") or {}
+
+
+def read_geojson(file: TextIO) -> Iterator[Row]:
+    collection = json.load(file)
+    for feature in collection.get("features", []):
+        yield _feature_row(feature)
+
+
+def read_geojsonseq(file: TextIO) -> Iterator[Row]:
+    """ one feature per line (GeoJSON text sequence / newline delimited), read line by line """
+    for line in file:
+        line = line.strip().lstrip("\x1e")
+        if line:
+            yield _feature_row(json.loads(line))
+
+
+READERS = {
+    "csv": read_csv,
+    "geojson": read_geojson,
+    "geojsonseq": read_geojsonseq,
+}
+
+
+def construct(rows: Iterable[Row], as_rectangle: bool = False,
+              skipped: Optional[Callable[[int, str], None]] = None) -> Iterator[Result]:
+    """ corner c and the lines [[a, c], [c, b]] or the ring [[a, c, b, d, a]] of each row
+
+        :param skipped: called with row number (starting at 1) and reason of each degenerate row,
+                        see `DegenerateInputError`, these rows are left out
+    """
+    for number, ((xa, a, b), properties) in enumerate(rows, 1):
+        try:
+            c = corner(xa, a, b)
+            shapes = [rectangle(xa, a, b)] if as_rectangle else corner_lines(xa, a, b)
+        except DegenerateInputError as e:
+            if skipped is not None:
+                skipped(number, str(e))
+            continue
+
+        yield c, shapes, properties
+
+
+def _geometry(shapes: List[List[Point]], as_rectangle: bool) -> Dict[str, Any]:
+    if as_rectangle:
+        return {"type": "Polygon", "coordinates": [[list(point) for point in shapes[0]]]}
+
+    return {"type": "MultiLineString", "coordinates": [[list(point) for point in shape] for shape in shapes]}
+
+
+def write_csv(file: TextIO, results: Iterable[Result], as_rectangle: bool = False):
+    """ one row per corner: c_x, c_y (and d_x, d_y for rectangles) followed by the input properties """
+    writer = None
+    for c, shapes, properties in results:
+        row = {"c_x": c[0], "c_y": c[1]}
+        if as_rectangle:
+            row.update(d_x=shapes[0][3][0], d_y=shapes[0][3][1])
+        row.update(properties)
+
+        if writer is None:
+            writer = csv.DictWriter(file, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def write_geojson(file: TextIO, results: Iterable[Result], as_rectangle: bool = False):
+    """ FeatureCollection, written feature by feature """
+    file.write('{"type": "FeatureCollection", "features": [\n')
+    for number, (_, shapes, properties) in enumerate(results):
+        if number:
+            file.write(",\n")
+        file.write(json.dumps({"type": "Feature", "properties": properties,
+                               "geometry": _geometry(shapes, as_rectangle)}))
+    file.write("\n]}\n")
+
+
+def write_geojsonseq(file: TextIO, results: Iterable[Result], as_rectangle: bool = False):
+    for _, shapes, properties in results:
+        file.write(json.dumps({"type": "Feature", "properties": properties,
+                               "geometry": _geometry(shapes, as_rectangle)}) + "\n")
+
+
+WRITERS = {
+    "csv": write_csv,
+    "geojson": write_geojson,
+    "geojsonseq": write_geojsonseq,
+}
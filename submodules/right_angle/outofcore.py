@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import json
+import mmap
+import os
+
+from typing import Callable, Dict, Optional, Tuple
+
+from .batch import corners_rows
+
+# input row: xa_x, xa_y, a_x, a_y, b_x, b_y as float64; output row: c_x, c_y as float64
+INPUT_ROW_SIZE = 6 * 8
+OUTPUT_ROW_SIZE = 2 * 8
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+
+def _progress_path(output: str) -> str:
+    return f"{output}.progress"
+
+
+def _read_progress(output: str, state: Dict[str, int]) -> int:
+    """ rows done of an interrupted job with the same input, 0 otherwise """
+    try:
+        with open(_progress_path(output), "r", encoding="utf-8") as file:
+            progress = json.load(file)
+    except (OSError, ValueError):
+        return 0
+
+    if any(progress.get(key) != value for key, value in state.items()):
+        return 0
+
+    return int(progress.get("done_rows", 0))
+
+
+def _write_progress(output: str, state: Dict[str, int], done_rows: int):
+    """ atomic: an interruption leaves the old or the new progress """
+    path = _progress_path(output)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(dict(state, done_rows=done_rows), file)
+    os.replace(f"{path}.tmp", path)
+
+
+def _mapped(file, offset: int, length: int, access: int) -> Tuple[mmap.mmap, int]:
+    """ maps [offset, offset + length) of a file, the mapping starts at the allocation granularity before
+
+        :return: mapping, position of `offset` in the mapping
+    """
+    start = offset - offset % mmap.ALLOCATIONGRANULARITY
+    return mmap.mmap(file.fileno(), length + offset - start, access=access, offset=start), offset - start
+
+
+def process_file(source: str, target: str, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """ Out-of-core corner construction between binary coordinate files.
+
+        `source` holds rows of 6 native float64 (xa_x, xa_y, a_x, a_y, b_x, b_y), `target` gets rows of
+        2 float64 (c_x, c_y) at the same row number. Only one chunk of both files is mapped at a time,
+        memory does not depend on the file size. After each chunk the done rows are stored in
+        `<target>.progress`; a restarted job with the same input and chunk size continues there.
+        The progress file is removed, when the job is complete.
+
+        .. code-block:: python
+
+            process_file("triples.f64", "corners.f64", chunk_rows=1 << 20)
+
+        :param source: input file
+        :param target: output file, created with its final size
+        :param chunk_rows: rows per chunk
+        :param progress: optional callback(done rows, total rows) after each chunk
+        :return: count of rows
+        :raises ValueError: input size is no multiple of a row
+    """
+    size = os.path.getsize(source)
+    if size % INPUT_ROW_SIZE:
+        raise ValueError(f"size of '{source}' is no multiple of {INPUT_ROW_SIZE} bytes")
+
+    rows = size // INPUT_ROW_SIZE
+    state = {"input_size": size, "input_mtime_ns": os.stat(source).st_mtime_ns, "chunk_rows": chunk_rows}
+    done = _read_progress(target, state) if os.path.exists(target) else 0
+
+    mode = "r+b" if done and os.path.getsize(target) == rows * OUTPUT_ROW_SIZE else "w+b"
+    if mode == "w+b":
+        done = 0
+
+    with open(source, "rb") as file_in, open(target, mode) as file_out:
+        file_out.truncate(rows * OUTPUT_ROW_SIZE)
+
+        while done < rows:
+            count = min(chunk_rows, rows - done)
+            map_in, start_in = _mapped(file_in, done * INPUT_ROW_SIZE, count * INPUT_ROW_SIZE, mmap.ACCESS_READ)
+            map_out, start_out = _mapped(file_out, done * OUTPUT_ROW_SIZE, count * OUTPUT_ROW_SIZE,
+                                         mmap.ACCESS_WRITE)
+            with map_in, map_out:
+                view_in = memoryview(map_in)[start_in:start_in + count * INPUT_ROW_SIZE]
+                view_out = memoryview(map_out)[start_out:start_out + count * OUTPUT_ROW_SIZE]
+                try:
+                    view_out.cast("d")[:] = memoryview(corners_rows(view_in)).cast("B").cast("d")
+                finally:
+                    view_in.release()
+                    view_out.release()
+                map_out.flush()
+
+            done += count
+            _write_progress(target, state, done)
+            if progress is not None:
+                progress(done, rows)
+
+    try:
+        os.remove(_progress_path(target))
+    except FileNotFoundError:
+        # empty input, no chunk was written
+        ...
+
+    return rows
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from fractions import Fraction
+from math import isfinite
+from typing import Tuple
+
+Point = Tuple[float, float]
+
+# unit roundoff of doubles
+EPSILON = 2.0 ** -53
+# relative error bound of a 2x2 determinant or dot product of coordinate differences (Shewchuk, ccwerrboundA)
+ERROR_BOUND = (3.0 + 16.0 * EPSILON) * EPSILON
+# smaller squared lengths of the direction lose precision in the division
+MIN_LENGTH_SQUARED = 2.0 ** -900
+
+
+class DegenerateInputError(ValueError):
+    """ input points do not define a right angle, e.g. equal or non-finite points """
+
+
+def _check_finite(*points: Point):
+    for point in points:
+        if not (isfinite(point[0]) and isfinite(point[1])):
+            raise DegenerateInputError(f"coordinates must be finite: {tuple(point)}")
+
+
+def orientation(a: Point, b: Point, c: Point) -> int:
+    """ Side of c relative to the line a -> b: 1 left, -1 right, 0 exactly on the line.
+
+        The determinant is computed relative to a (local origin) in floating point, its sign is
+        only trusted outside of the error bound. Nearly collinear points are decided exactly.
+    """
+    bx, by = b[0] - a[0], b[1] - a[1]
+    cx, cy = c[0] - a[0], c[1] - a[1]
+    left = bx * cy
+    right = by * cx
+    determinant = left - right
+    if abs(determinant) > ERROR_BOUND * (abs(left) + abs(right)):
+        return 1 if determinant > 0 else -1
+
+    _check_finite(a, b, c)
+    ax, ay = Fraction(a[0]), Fraction(a[1])
+    exact = (Fraction(b[0]) - ax) * (Fraction(c[1]) - ay) - (Fraction(b[1]) - ay) * (Fraction(c[0]) - ax)
+    return (exact > 0) - (exact < 0)
+
+
+def project(xa: Point, a: Point, b: Point) -> Point:
+    """ Projection of b onto the line xa -> a: a + d * ((b - a) · d) / (d · d) with d = a - xa.
+
+        Differences are taken relative to a, so large coordinates (e.g. UTM northings) keep their precision.
+        The result is never farther from a than b is. If the sign of the dot product is within its
+        error bound or the direction is too short for the division, it is computed exactly.
+
+        :raises DegenerateInputError: xa and a are equal or coordinates are not finite
+    """
+    dx, dy = a[0] - xa[0], a[1] - xa[1]
+    bx, by = b[0] - a[0], b[1] - a[1]
+    dot_x = dx * bx
+    dot_y = dy * by
+    dot = dot_x + dot_y
+    length_squared = dx * dx + dy * dy
+
+    if abs(dot) > ERROR_BOUND * (abs(dot_x) + abs(dot_y)) and MIN_LENGTH_SQUARED < length_squared < float("inf"):
+        t = dot / length_squared
+        return a[0] + dx * t, a[1] + dy * t
+
+    _check_finite(xa, a, b)
+    ax, ay = Fraction(a[0]), Fraction(a[1])
+    dx, dy = ax - Fraction(xa[0]), ay - Fraction(xa[1])
+    if dx == 0 and dy == 0:
+        raise DegenerateInputError("direction points are equal")
+
+    t = (dx * (Fraction(b[0]) - ax) + dy * (Fraction(b[1]) - ay)) / (dx * dx + dy * dy)
+    return float(ax + dx * t), float(ay + dy * t)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from array import array
+from bisect import bisect_right
+from math import atan2, ceil, degrees, isnan, nan, sqrt
+from typing import Any, Dict, List, Tuple
+
+from .batch import as_doubles, numpy, NUMPY_MIN_POINTS
+from .construction import Point
+
+
+def vertex_angle(previous: Point, vertex: Point, following: Point) -> float:
+    """ angle in degrees (0 - 180) at `vertex` between both segments, NaN for zero length segments """
+    x1, y1 = previous[0] - vertex[0], previous[1] - vertex[1]
+    x2, y2 = following[0] - vertex[0], following[1] - vertex[1]
+    if (x1 == 0 and y1 == 0) or (x2 == 0 and y2 == 0):
+        return nan
+
+    return degrees(atan2(abs(x1 * y2 - y1 * x2), x1 * x2 + y1 * y2))
+
+
+def vertex_angles(xs: Any, ys: Any, starts: Any) -> Tuple[Any, Any]:
+    """ Angles at all interior vertices of many lines, which are stored one after the other.
+
+        :param xs: x values of all vertices, buffer of doubles
+        :param ys: y values of all vertices, buffer of doubles
+        :param starts: first vertex of each line plus the end (count of vertices), sequence of ints
+        :return: (angles in degrees, vertex numbers), array or numpy array, NaN for zero length segments
+    """
+    x_values, y_values = as_doubles(xs), as_doubles(ys)
+    if len(x_values) != len(y_values):
+        raise ValueError("coordinate buffers have different lengths")
+
+    if numpy is not None and len(x_values) >= NUMPY_MIN_POINTS:
+        x, y = numpy.asarray(x_values), numpy.asarray(y_values)
+        bounds = numpy.asarray(starts, dtype=numpy.int64)
+        interior = numpy.ones(len(x), dtype=bool)
+        interior[bounds[:-1][bounds[:-1] < len(x)]] = False
+        interior[bounds[1:] - 1] = False
+        index = numpy.nonzero(interior)[0]
+
+        x1, y1 = x[index - 1] - x[index], y[index - 1] - y[index]
+        x2, y2 = x[index + 1] - x[index], y[index + 1] - y[index]
+        angles = numpy.degrees(numpy.arctan2(numpy.abs(x1 * y2 - y1 * x2), x1 * x2 + y1 * y2))
+        angles[((x1 == 0) & (y1 == 0)) | ((x2 == 0) & (y2 == 0))] = numpy.nan
+        return angles, index
+
+    angles = array("d")
+    index = array("q")
+    for start, end in zip(starts, list(starts)[1:]):
+        for i in range(start + 1, end - 1):
+            angles.append(vertex_angle((x_values[i - 1], y_values[i - 1]), (x_values[i], y_values[i]),
+                                       (x_values[i + 1], y_values[i + 1])))
+            index.append(i)
+
+    return angles, index
+
+
+def angle_violations(xs: Any, ys: Any, starts: Any, statistics: "AngleStatistics") -> List[Tuple[int, int, float]]:
+    """ Adds the angles of many lines (see `vertex_angles`) to the statistics.
+
+        :param statistics: statistics, which decide about violations
+        :return: (line number, vertex number in its line, angle) of each violation
+    """
+    angles, index = vertex_angles(xs, ys, starts)
+    violations = []
+    for position in statistics.add(angles):
+        i = int(index[position])
+        line = bisect_right(starts, i) - 1
+        violations.append((line, i - starts[line], float(angles[position])))
+
+    return violations
+
+
+class AngleStatistics:
+    """ Streaming statistics of vertex angles: histogram, mean, deviation and near-right-angle violations.
+
+        A violation is an angle, which is almost but not exactly 90 degrees:
+        `tolerance` < |angle - 90| <= `max_deviation`.
+
+        .. code-block:: python
+
+            statistics = AngleStatistics(max_deviation=5, tolerance=0.01)
+            for xs, ys, starts in chunks:
+                angles, index = vertex_angles(xs, ys, starts)
+                violations = statistics.add(angles)   # positions in `angles`
+
+        :param max_deviation: largest deviation from 90 degrees, which counts as a violation
+        :param tolerance: smaller deviations count as exact right angles
+        :param bin_width: histogram bin width in degrees
+    """
+
+    def __init__(self, max_deviation: float = 5.0, tolerance: float = 0.01, bin_width: float = 1.0):
+        self.max_deviation = max_deviation
+        self.tolerance = tolerance
+        self.bin_width = bin_width
+        # bins start at multiples of `bin_width`, the last one may reach beyond 180 degrees
+        self.histogram = [0] * max(1, ceil(round(180 / bin_width, 9)))
+        self.count = 0
+        self.invalid = 0
+        self.right_angles = 0
+        self.violations = 0
+        self._sum = 0.0
+        self._squares = 0.0
+        self.minimum = nan
+        self.maximum = nan
+
+    def _bin(self, angle: float) -> int:
+        # floor division like the numpy path, both put an angle into the same bin
+        return min(len(self.histogram) - 1, max(0, int(angle // self.bin_width)))
+
+    def add(self, angles: Any) -> List[int]:
+        """ adds angles of one chunk
+
+            :return: positions of the violations in `angles`
+        """
+        if numpy is not None and len(angles) >= NUMPY_MIN_POINTS:
+            values = numpy.asarray(angles, dtype=numpy.float64)
+            valid = ~numpy.isnan(values)
+            self.invalid += int(len(values) - valid.sum())
+            values = values[valid]
+            if not len(values):
+                return []
+
+            bins = numpy.clip((values // self.bin_width).astype(numpy.int64), 0, len(self.histogram) - 1)
+            counts = numpy.bincount(bins, minlength=len(self.histogram))
+            self.histogram = [a + int(b) for a, b in zip(self.histogram, counts)]
+            self.count += len(values)
+            self._sum += float(values.sum())
+            self._squares += float((values * values).sum())
+            self.minimum = float(values.min()) if isnan(self.minimum) else min(self.minimum, float(values.min()))
+            self.maximum = float(values.max()) if isnan(self.maximum) else max(self.maximum, float(values.max()))
+
+            deviation = numpy.abs(numpy.asarray(angles, dtype=numpy.float64) - 90)
+            self.right_angles += int((deviation <= self.tolerance).sum())
+            violations = numpy.nonzero((deviation > self.tolerance) & (deviation <= self.max_deviation))[0]
+            self.violations += len(violations)
+            return violations.tolist()
+
+        violations = []
+        for position, angle in enumerate(angles):
+            if isnan(angle):
+                self.invalid += 1
+                continue
+
+            self.histogram[self._bin(angle)] += 1
+            self.count += 1
+            self._sum += angle
+            self._squares += angle * angle
+            self.minimum = angle if isnan(self.minimum) else min(self.minimum, angle)
+            self.maximum = angle if isnan(self.maximum) else max(self.maximum, angle)
+
+            deviation = abs(angle - 90)
+            if deviation <= self.tolerance:
+                self.right_angles += 1
+            elif deviation <= self.max_deviation:
+                self.violations += 1
+                violations.append(position)
+
+        return violations
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.count if self.count else nan
+
+    @property
+    def std(self) -> float:
+        if not self.count:
+            return nan
+        return sqrt(max(0.0, self._squares / self.count - self.mean ** 2))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "angles": self.count,
+            "invalid": self.invalid,
+            "right_angles": self.right_angles,
+            "violations": self.violations,
+            "max_deviation": self.max_deviation,
+            "tolerance": self.tolerance,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.minimum,
+            "max": self.maximum,
+            "histogram": {f"{i * self.bin_width:g}-{(i + 1) * self.bin_width:g}": count
+                          for i, count in enumerate(self.histogram) if count},
+        }
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import random
+from array import array
+from math import isnan
+
+import pytest
+
+from submodules.right_angle import batch
+from submodules.right_angle.batch import (as_doubles, corners_interleaved, corners_rows, corners_separated,
+                                          from_arrow_points, opposite_corners, to_arrow_points)
+
+XA = array("d", [0, 0, 0, 0, 5, 5])
+A = array("d", [10, 0, 0, 10, 5, 5])
+B = array("d", [15, 7, -3, 12, 9, 9])
+
+
+def test_as_doubles_does_not_copy():
+    values = array("d", [1, 2, 3])
+    view = as_doubles(values)
+    values[0] = 7
+    assert view[0] == 7
+    assert list(as_doubles(bytes(values))) == [7, 2, 3]
+    assert list(as_doubles(memoryview(bytes(values)).cast("B"))) == [7, 2, 3]
+
+
+def test_as_doubles_errors():
+    with pytest.raises(ValueError):
+        as_doubles(b"1234567")
+    with pytest.raises(ValueError):
+        as_doubles(memoryview(bytes(32)).cast("B")[::2])
+
+
+def test_corners_interleaved():
+    result = corners_interleaved(XA, A, B)
+    assert list(result[:4]) == [15.0, 0.0, 0.0, 12.0]
+    # equal points: no direction
+    assert isnan(result[4]) and isnan(result[5])
+
+
+def test_corners_separated_and_rows_agree():
+    c_x, c_y = corners_separated(XA[0::2], XA[1::2], A[0::2], A[1::2], B[0::2], B[1::2])
+    rows = array("d", [value for i in range(3) for value in (XA[2 * i], XA[2 * i + 1], A[2 * i], A[2 * i + 1],
+                                                             B[2 * i], B[2 * i + 1])])
+    interleaved = corners_rows(rows)
+    assert list(c_x[:2]) == list(interleaved[0:4:2])
+    assert list(c_y[:2]) == list(interleaved[1:4:2])
+    assert isnan(c_x[2]) and isnan(interleaved[4])
+
+
+def test_length_errors():
+    with pytest.raises(ValueError):
+        corners_interleaved(XA, A, B[:4])
+    with pytest.raises(ValueError):
+        corners_interleaved(XA[:3], A[:3], B[:3])
+    with pytest.raises(ValueError):
+        corners_rows(XA[:5])
+
+
+def test_opposite_corners():
+    assert list(opposite_corners(array("d", [0, 0]), array("d", [10, 10]), array("d", [10, 0]))) == [0.0, 10.0]
+
+
+def _random_points(count: int) -> array:
+    generator = random.Random(7)
+    values = array("d")
+    for _ in range(count):
+        values.extend((generator.uniform(-1e6, 1e6), generator.uniform(-1e6, 1e6)))
+    return values
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    numpy = pytest.importorskip("numpy")
+    count = batch.NUMPY_MIN_POINTS * 4
+    xa, a, b = _random_points(count), _random_points(count), _random_points(count)
+    # degenerate and nearly degenerate rows take the exact path of `corner`
+    a[0:2] = xa[0:2]
+    a[2:4] = array("d", [xa[2] + 1e-12, xa[3]])
+
+    fast = corners_interleaved(xa, a, b)
+    monkeypatch.setattr(batch, "numpy", None)
+    slow = corners_interleaved(xa, a, b)
+
+    assert isinstance(fast, numpy.ndarray) and isinstance(slow, array)
+    assert numpy.array_equal(fast, numpy.asarray(slow), equal_nan=True)
+
+
+def test_arrow_round_trip():
+    pytest.importorskip("pyarrow")
+    values = array("d", [1, 2, 3, 4])
+    field, points = to_arrow_points(values)
+    assert field.metadata[b"ARROW:extension:name"] == b"geoarrow.point"
+    assert list(from_arrow_points(points)) == [1, 2, 3, 4]
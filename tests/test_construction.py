@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import pytest
+
+from submodules.right_angle import corner, corner_lines, corners, rectangle
+
+
+def test_corner_continues_direction():
+    assert corner((0, 0), (10, 0), (15, 7)) == (15.0, 0.0)
+    assert corner((0, 0), (0, 10), (-3, 12)) == (0.0, 12.0)
+
+
+def test_corners():
+    rows = [((0, 0), (10, 0), (15, 7)), ((0, 0), (0, 10), (-3, 12))]
+    assert list(corners(rows)) == [(15.0, 0.0), (0.0, 12.0)]
+
+
+def test_corner_lines():
+    assert corner_lines((0, 0), (10, 0), (15, 7)) == [[(10, 0), (15.0, 0.0)], [(15.0, 0.0), (15, 7)]]
+
+
+def test_rectangle():
+    assert rectangle((0, 0), (10, 0), (15, 7)) == [(10, 0), (15.0, 0.0), (15, 7), (10.0, 7.0), (10, 0)]
+
+
+def test_equal_direction_points():
+    with pytest.raises(ValueError):
+        corner((1, 1), (1, 1), (5, 5))
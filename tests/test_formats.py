@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import io
+import json
+
+from submodules.right_angle.formats import (construct, format_from_path, read_csv, read_geojson, read_geojsonseq,
+                                            write_csv, write_geojson, write_geojsonseq)
+
+CSV = "xa_x,xa_y,a_x,a_y,b_x,b_y,name\n0,0,10,0,15,7,first\n0,0,10,0,10,0,equal\n0,0,0,10,-3,12,second\n"
+
+
+def _rows():
+    return list(read_csv(io.StringIO(CSV)))
+
+
+def test_format_from_path():
+    assert format_from_path("corners.GeoJSON") == "geojson"
+    assert format_from_path("corners.ndjson") == "geojsonseq"
+    assert format_from_path("corners.f64") == "f64"
+    assert format_from_path("-") == "csv"
+
+
+def test_read_csv_keeps_other_columns():
+    points, properties = _rows()[0]
+    assert points == ((0, 0), (10, 0), (15, 7))
+    assert properties == {"name": "first"}
+
+
+def test_construct_skips_degenerate_rows():
+    skipped = []
+    results = list(construct(_rows(), skipped=lambda number, reason: skipped.append(number)))
+    assert [properties["name"] for _, _, properties in results] == ["first", "second"]
+    assert skipped == [2]
+
+
+def test_write_csv_corner():
+    file = io.StringIO()
+    write_csv(file, construct(_rows()))
+    lines = file.getvalue().splitlines()
+    assert lines[0] == "c_x,c_y,name"
+    assert lines[1:] == ["15.0,0.0,first", "0.0,12.0,second"]
+
+
+def test_write_csv_rectangle():
+    file = io.StringIO()
+    write_csv(file, construct(_rows()[:1], as_rectangle=True), as_rectangle=True)
+    assert file.getvalue().splitlines() == ["c_x,c_y,d_x,d_y,name", "15.0,0.0,10.0,7.0,first"]
+
+
+def test_geojson_round_trip():
+    file = io.StringIO()
+    write_geojson(file, construct(_rows()))
+    collection = json.loads(file.getvalue())
+    assert [feature["properties"]["name"] for feature in collection["features"]] == ["first", "second"]
+    assert collection["features"][0]["geometry"] == {
+        "type": "MultiLineString", "coordinates": [[[10, 0], [15.0, 0.0]], [[15.0, 0.0], [15, 7]]]}
+
+    source = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"id": 1},
+         "geometry": {"type": "LineString", "coordinates": [[0, 0], [10, 0], [15, 7]]}}]}
+    assert list(read_geojson(io.StringIO(json.dumps(source)))) == [(((0, 0), (10, 0), (15, 7)), {"id": 1})]
+
+
+def test_geojsonseq_polygon():
+    file = io.StringIO()
+    write_geojsonseq(file, construct(_rows(), as_rectangle=True), as_rectangle=True)
+    features = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert len(features) == 2
+    assert features[0]["geometry"]["type"] == "Polygon"
+    assert features[0]["geometry"]["coordinates"][0][0] == features[0]["geometry"]["coordinates"][0][-1]
+
+    rows = list(read_geojsonseq(io.StringIO("\x1e" + json.dumps({
+        "type": "Feature", "geometry": {"type": "LineString", "coordinates": [[0, 0], [1, 0], [2, 2]]}}) + "\n\n")))
+    assert rows == [(((0, 0), (1, 0), (2, 2)), {})]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import pytest
+
+from submodules.qgis.geometry.history import UNKNOWN_FID, CornerHistory
+
+
+def test_history_push_pop():
+    history = CornerHistory()
+    first = [[(0.0, 0.0), (10.0, 0.0)], [(10.0, 0.0), (10.0, 10.0)]]
+    second = [[(500000.1, 5800000.3), (500010.7, 5800000.3), (500010.7, 5800004.9), (500000.1, 5800004.9),
+               (500000.1, 5800000.3)]]
+    history.push(first, [-1, -2])
+    history.push(second, [7])
+    assert len(history) == 2
+    assert history.last() == (second, [7])
+    assert len(history) == 2
+    # absolute coordinates, no rounding differences
+    assert history.pop() == (second, [7])
+    assert history.pop() == (first, [-1, -2])
+    assert len(history) == 0
+    with pytest.raises(IndexError):
+        history.pop()
+
+
+def test_history_unknown_fids():
+    history = CornerHistory()
+    history.push([[(0, 0), (1, 0)], [(1, 0), (1, 1)]])
+    history.push([[(0, 0), (1, 0)], [(1, 0), (1, 1)]], [3])
+    assert history.pop()[1] == [UNKNOWN_FID, UNKNOWN_FID]
+    assert history.pop()[1] == [UNKNOWN_FID, UNKNOWN_FID]
+
+
+def test_history_skips_empty_corners():
+    history = CornerHistory()
+    history.push([[], []])
+    assert len(history) == 0
+    history.push([[], [(0, 0), (1, 0)]], [4, 5])
+    assert history.pop() == ([[(0.0, 0.0), (1.0, 0.0)]], [5])
+
+
+def test_history_drops_oldest_corners():
+    history = CornerHistory(max_corners=2)
+    for i in range(3):
+        history.push([[(i, 0), (i, 1)]], [i])
+
+    assert len(history) == 2
+    assert history.pop() == ([[(2.0, 0.0), (2.0, 1.0)]], [2])
+    assert history.pop() == ([[(1.0, 0.0), (1.0, 1.0)]], [1])
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from submodules.qgis.layer.journal_format import (FEATURES_RECORD, HEADER_RECORD, MAGIC, SUFFIX, features_payload,
+                                                  find_journals, journal_pid, pack_record, process_running,
+                                                  read_journal)
+
+HEADER = {"layer_id": "lines_1", "name": "lines", "pid": 1}
+FIRST = [(b"\x01\x02\x00\x00\x00", {"id": 1, "name": "a"}), (b"\x01\x02", {"id": 2, "name": None})]
+SECOND = [(b"\x01\x05", {"id": 3})]
+
+
+def _journal(tmp_path, *records: bytes, name: str = "session_1") -> str:
+    path = str(tmp_path / f"{name}{SUFFIX}")
+    with open(path, "wb") as file:
+        file.write(MAGIC + pack_record(HEADER_RECORD, json.dumps(HEADER).encode("utf-8")) + b"".join(records))
+    return path
+
+
+def test_read_journal(tmp_path):
+    path = _journal(tmp_path, pack_record(FEATURES_RECORD, features_payload(FIRST)),
+                    pack_record(FEATURES_RECORD, features_payload(SECOND)))
+    assert read_journal(path) == (HEADER, FIRST + SECOND)
+
+
+def test_torn_record_is_ignored(tmp_path):
+    second = pack_record(FEATURES_RECORD, features_payload(SECOND))
+    for size in (3, len(second) - 1):
+        path = _journal(tmp_path, pack_record(FEATURES_RECORD, features_payload(FIRST)), second[:size])
+        assert read_journal(path) == (HEADER, FIRST)
+
+
+def test_crc_mismatch_stops_reading(tmp_path):
+    second = bytearray(pack_record(FEATURES_RECORD, features_payload(SECOND)))
+    second[-1] ^= 0xFF
+    path = _journal(tmp_path, pack_record(FEATURES_RECORD, features_payload(FIRST)), bytes(second),
+                    pack_record(FEATURES_RECORD, features_payload(SECOND)))
+    assert read_journal(path) == (HEADER, FIRST)
+
+
+def test_corrupt_complete_record(tmp_path):
+    # valid crc, but the feature count exceeds the payload
+    payload = bytearray(features_payload(FIRST))
+    payload[0] = 9
+    path = _journal(tmp_path, pack_record(FEATURES_RECORD, bytes(payload)))
+    with pytest.raises(ValueError, match="corrupt"):
+        read_journal(path)
+
+    path = _journal(tmp_path, pack_record(FEATURES_RECORD, b"\x01\x00\x00\x00\x02\x00\x00\x00\x01\x02"
+                                                           b"\x02\x00\x00\x00{]"))
+    with pytest.raises(ValueError, match="corrupt"):
+        read_journal(path)
+
+
+def test_no_journal(tmp_path):
+    path = tmp_path / f"other{SUFFIX}"
+    path.write_bytes(b"no journal")
+    with pytest.raises(ValueError, match="no session journal"):
+        read_journal(str(path))
+
+    path.write_bytes(MAGIC + pack_record(FEATURES_RECORD, features_payload(FIRST)))
+    with pytest.raises(ValueError, match="no header"):
+        read_journal(str(path))
+
+
+def test_find_journals_skips_running_processes(tmp_path):
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        own = _journal(tmp_path, name=f"session_20220101_120000_{os.getpid()}_1")
+        running = _journal(tmp_path, name=f"session_20220101_120000_{process.pid}_1")
+        crashed = _journal(tmp_path, name="session_20220101_120000_0_1")
+        unknown = _journal(tmp_path, name="copied")
+        (tmp_path / "notes.txt").write_text("")
+
+        assert journal_pid(own) == os.getpid()
+        assert journal_pid(unknown) is None
+        assert find_journals(str(tmp_path)) == sorted([crashed, unknown])
+        assert find_journals(str(tmp_path), exclude_running=False) == sorted([own, running, crashed, unknown])
+    finally:
+        process.kill()
+        process.wait()
+
+    assert not process_running(process.pid)
+    assert running in find_journals(str(tmp_path))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from math import cos, radians
+
+import pytest
+
+from submodules.right_angle import corner_lines
+from submodules.qgis.geometry.local_tiles import apply_local, local_proj, tile
+
+LATITUDE = 60.0
+
+
+def _forward(xs, ys):
+    # equirectangular metres around the latitude, rounded: the inverse does not give the input back
+    scale = 111_320 * cos(radians(LATITUDE))
+    return [round(x * scale, 3) for x in xs], [round(y * 111_320, 3) for y in ys]
+
+
+def _inverse(xs, ys):
+    scale = 111_320 * cos(radians(LATITUDE))
+    return [x / scale for x in xs], [y / 111_320 for y in ys]
+
+
+def test_tile():
+    assert tile((13.4, 52.5)) == (13, 52)
+    assert tile((-0.5, -33.9)) == (-1, -34)
+    assert tile((13.4, 52.5), 0.25) == (53, 210)
+
+
+def test_local_proj_keeps_datum():
+    proj = local_proj("+proj=longlat +datum=WGS84 +no_defs +type=crs", (13, 52))
+    assert proj == "+proj=tmerc +lat_0=52.5 +lon_0=13.5 +k=1 +x_0=0 +y_0=0 +datum=WGS84 +units=m +no_defs"
+    assert "+ellps=bessel" in local_proj("+proj=longlat +ellps=bessel +towgs84=598.1,73.7,418.2 +no_defs", (0, 0))
+    assert "+ellps=WGS84" in local_proj("+proj=longlat +no_defs", (0, 89))
+    assert "+lat_0=90.0" in local_proj("+proj=longlat", (0, 90))
+
+
+def test_apply_local_keeps_given_points():
+    points = [(10.0, LATITUDE), (10.001, LATITUDE + 0.0005), (10.0012, LATITUDE + 0.0011)]
+    shapes = apply_local(corner_lines, points, _forward, _inverse)
+    (a, c), (c2, b) = shapes
+    # given points are bit identical, both lines share the same corner object value
+    assert (a, b) == (points[1], points[2])
+    assert c == c2
+
+    # right angle in the local (metric) projection, not in degrees
+    (ax, ay), (cx, cy), (bx, by) = zip(*_forward([a[0], c[0], b[0]], [a[1], c[1], b[1]]))
+    assert (cx - ax) * (bx - cx) + (cy - ay) * (by - cy) == pytest.approx(0, abs=1e-3)
+    assert (c[0] - a[0]) * (b[0] - c[0]) + (c[1] - a[1]) * (b[1] - c[1]) != pytest.approx(0, abs=1e-12)
+
+
+def test_apply_local_transforms_new_points_once():
+    calls = []
+
+    def inverse(xs, ys):
+        calls.append(len(xs))
+        return _inverse(xs, ys)
+
+    points = [(10.0, LATITUDE), (10.001, LATITUDE + 0.0005), (10.0012, LATITUDE + 0.0011)]
+    apply_local(corner_lines, points, _forward, inverse)
+    # the corner is shared by both lines, it is transformed back once
+    assert calls == [1]
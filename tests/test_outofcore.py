@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import os
+
+from array import array
+
+import pytest
+
+from submodules.right_angle import corner
+from submodules.right_angle.outofcore import process_file
+
+ROWS = [((0, 0), (10, 0), (15 + i, 7)) for i in range(10)]
+
+
+class Interrupted(Exception):
+    ...
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "triples.f64"
+    with open(path, "wb") as file:
+        array("d", [value for row in ROWS for point in row for value in point]).tofile(file)
+    return str(path)
+
+
+def _corners(path: str) -> list:
+    with open(path, "rb") as file:
+        values = array("d", file.read())
+    return list(zip(values[0::2], values[1::2]))
+
+
+def test_process_file(source, tmp_path):
+    target = str(tmp_path / "corners.f64")
+    assert process_file(source, target, chunk_rows=3) == len(ROWS)
+    assert _corners(target) == [corner(*row) for row in ROWS]
+    assert not os.path.exists(f"{target}.progress")
+
+
+def test_process_file_resumes_after_interruption(source, tmp_path):
+    target = str(tmp_path / "corners.f64")
+
+    def interrupt(done, rows):
+        if done >= 6:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        process_file(source, target, chunk_rows=3, progress=interrupt)
+    assert os.path.exists(f"{target}.progress")
+
+    calls = []
+    process_file(source, target, chunk_rows=3, progress=lambda done, rows: calls.append(done))
+    assert calls == [9, 10]
+    assert _corners(target) == [corner(*row) for row in ROWS]
+    assert not os.path.exists(f"{target}.progress")
+
+
+def test_process_file_other_chunk_size_starts_again(source, tmp_path):
+    target = str(tmp_path / "corners.f64")
+
+    def interrupt(done, rows):
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        process_file(source, target, chunk_rows=3, progress=interrupt)
+
+    calls = []
+    process_file(source, target, chunk_rows=4, progress=lambda done, rows: calls.append(done))
+    assert calls == [4, 8, 10]
+    assert _corners(target) == [corner(*row) for row in ROWS]
+
+
+def test_process_empty_file(tmp_path):
+    source = tmp_path / "empty.f64"
+    source.write_bytes(b"")
+    target = str(tmp_path / "corners.f64")
+    assert process_file(str(source), target) == 0
+    assert os.path.getsize(target) == 0
+
+
+def test_process_file_rejects_partial_rows(tmp_path):
+    source = tmp_path / "broken.f64"
+    source.write_bytes(b"\0" * 50)
+    with pytest.raises(ValueError):
+        process_file(str(source), str(tmp_path / "corners.f64"))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import random
+
+import pytest
+
+from submodules.qgis.geometry.packed_index import PackedIndexWriter, PackedSegmentIndex, write_index
+from submodules.qgis.geometry.segment_index import SegmentIndex
+
+
+@pytest.fixture
+def lines():
+    generator = random.Random(1)
+    lines = [[(generator.uniform(-500, 500), generator.uniform(-500, 500)) for _ in range(generator.randint(2, 5))]
+             for _ in range(500)]
+    # large segment, stored outside of the grid
+    lines.append([(-4000.0, -4000.0), (4000.0, 4000.0)])
+    return lines
+
+
+def _index(lines) -> SegmentIndex:
+    index = SegmentIndex(cell_size=10)
+    index.add_lines(lines)
+    return index
+
+
+def test_packed_index_answers_like_segment_index(lines, tmp_path):
+    index = _index(lines)
+    path = str(tmp_path / "lines.idx")
+    write_index(index, path)
+
+    generator = random.Random(2)
+    with PackedSegmentIndex(path) as packed:
+        assert len(packed) == len(index)
+        for _ in range(200):
+            x, y = generator.uniform(-600, 600), generator.uniform(-600, 600)
+            assert packed.nearest_vertex(x, y, 15) == index.nearest_vertex(x, y, 15)
+            assert packed.nearest_segment(x, y, 15) == index.nearest_segment(x, y, 15)
+
+
+@pytest.mark.parametrize("run_references", [5, 1000, 1 << 18])
+def test_streamed_index_equals_written_index(lines, tmp_path, run_references):
+    write_index(_index(lines), str(tmp_path / "written.idx"))
+    with PackedIndexWriter(str(tmp_path / "streamed.idx"), 10, run_references=run_references) as writer:
+        for line in lines:
+            writer.add_line(line)
+
+    assert (tmp_path / "streamed.idx").read_bytes() == (tmp_path / "written.idx").read_bytes()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["streamed.idx", "written.idx"]
+
+
+def test_aborted_writer_leaves_no_files(lines, tmp_path):
+    with pytest.raises(RuntimeError):
+        with PackedIndexWriter(str(tmp_path / "lines.idx"), 10, run_references=5) as writer:
+            for line in lines:
+                writer.add_line(line)
+            raise RuntimeError()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_empty_index(tmp_path):
+    path = str(tmp_path / "empty.idx")
+    with PackedIndexWriter(path, 10):
+        ...
+
+    with PackedSegmentIndex(path) as packed:
+        assert len(packed) == 0
+        assert packed.nearest_vertex(0, 0, 100) is None
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / "broken.idx"
+    path.write_bytes(b"no index")
+    with pytest.raises(ValueError):
+        PackedSegmentIndex(str(path))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import pytest
+
+from submodules.right_angle import DegenerateInputError, corner, corner_lines, orientation, project, rectangle
+
+
+def test_corner_of_collinear_end_point_is_end_point():
+    assert corner((0, 0), (10, 0), (20, 0)) == (20, 0)
+
+
+def test_corner_keeps_precision_of_large_coordinates():
+    xa, a, b = (500000.0, 5800000.0), (500010.0, 5800000.0), (500013.0, 5800004.0)
+    assert corner(xa, a, b) == (500013.0, 5800000.0)
+
+
+@pytest.mark.parametrize("xa, a, b", [
+    ((1, 1), (1, 1), (5, 5)),
+    ((0, 0), (float("nan"), 0), (5, 5)),
+    ((0, 0), (1, 0), (float("inf"), 5)),
+])
+def test_corner_rejects_degenerate_input(xa, a, b):
+    with pytest.raises(DegenerateInputError):
+        corner(xa, a, b)
+
+
+def test_degenerate_input_is_value_error():
+    assert issubclass(DegenerateInputError, ValueError)
+
+
+def test_corner_lines_leave_out_zero_length_lines():
+    assert corner_lines((0, 0), (10, 0), (20, 0)) == [[(10, 0), (20, 0)]]
+    assert corner_lines((0, 0), (10, 0), (10, 5)) == [[(10.0, 0.0), (10, 5)]]
+
+
+def test_corner_lines_reject_equal_points():
+    with pytest.raises(DegenerateInputError):
+        corner_lines((0, 0), (10, 0), (10, 0))
+
+
+def test_rectangle_without_area():
+    with pytest.raises(DegenerateInputError):
+        rectangle((0, 0), (10, 0), (20, 0))
+
+
+def test_orientation():
+    assert orientation((0, 0), (1, 0), (0, 1)) == 1
+    assert orientation((0, 0), (1, 0), (0, -1)) == -1
+    assert orientation((0, 0), (1, 1), (3, 3)) == 0
+
+
+def test_orientation_of_nearly_collinear_points_is_exact():
+    # floating point determinant of these points is rounded to zero
+    a, b = (0.5, 0.5), (12.0, 12.0)
+    assert orientation(a, b, (24.0, 24.000000000000004)) == 1
+    assert orientation(a, b, (24.0, 24.0)) == 0
+
+
+def test_project_is_never_farther_than_end_point():
+    x, y = project((0.0, 0.0), (1e-300, 1e-300), (1.0, 0.0))
+    assert abs(x - 0.5) < 1e-12 and abs(y - 0.5) < 1e-12
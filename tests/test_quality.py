@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import random
+from array import array
+from math import isnan, nan
+
+import pytest
+
+from submodules.right_angle import quality
+from submodules.right_angle.quality import AngleStatistics, angle_violations, vertex_angle, vertex_angles
+
+
+def test_vertex_angle():
+    assert vertex_angle((0, 0), (10, 0), (10, 10)) == pytest.approx(90)
+    assert vertex_angle((0, 0), (10, 0), (20, 0)) == pytest.approx(180)
+    assert isnan(vertex_angle((10, 0), (10, 0), (10, 10)))
+
+
+def test_vertex_angles_of_many_lines():
+    xs = array("d", [0, 10, 10, 0, 10, 20])
+    ys = array("d", [0, 0, 10, 0, 0, 1])
+    angles, index = vertex_angles(xs, ys, [0, 3, 6])
+    assert list(index) == [1, 4]
+    assert angles[0] == pytest.approx(90)
+    assert angles[1] == pytest.approx(vertex_angle((0, 0), (10, 0), (20, 1)))
+
+
+def test_statistics():
+    statistics = AngleStatistics(max_deviation=5, tolerance=0.01, bin_width=10)
+    assert statistics.add([90.0, 92.0, 45.0, nan, 180.0]) == [1]
+    assert (statistics.count, statistics.invalid, statistics.right_angles, statistics.violations) == (4, 1, 1, 1)
+    assert (statistics.minimum, statistics.maximum) == (45.0, 180.0)
+    assert statistics.mean == pytest.approx((90 + 92 + 45 + 180) / 4)
+    assert statistics.summary()["histogram"] == {"40-50": 1, "90-100": 2, "170-180": 1}
+
+
+def test_statistics_bins_beyond_180():
+    statistics = AngleStatistics(bin_width=7)
+    statistics.add([174.9, 175.0, 180.0])
+    assert len(statistics.histogram) == 26
+    assert statistics.histogram[-2:] == [1, 2]
+
+
+def test_angle_violations():
+    xs = array("d", [0, 10, 10, 0, 10, 11])
+    ys = array("d", [0, 0, 10, 0, 0, 10])
+    violations = angle_violations(xs, ys, [0, 3, 6], AngleStatistics(max_deviation=10))
+    assert [(line, vertex) for line, vertex, _ in violations] == [(1, 1)]
+    assert violations[0][2] == pytest.approx(vertex_angle((0, 0), (10, 0), (11, 10)))
+
+
+@pytest.mark.parametrize("bin_width", [1.0, 7.0, 0.3, 50.0])
+def test_numpy_and_python_statistics_agree(monkeypatch, bin_width):
+    pytest.importorskip("numpy")
+    generator = random.Random(4)
+    angles = array("d", [generator.choice((generator.uniform(0, 180), generator.uniform(85, 95),
+                                          generator.randrange(0, 181, 7), 90.0, nan)) for _ in range(5000)])
+
+    fast = AngleStatistics(bin_width=bin_width)
+    fast_violations = fast.add(angles)
+
+    monkeypatch.setattr(quality, "numpy", None)
+    slow = AngleStatistics(bin_width=bin_width)
+    slow_violations = slow.add(angles)
+
+    assert fast_violations == slow_violations
+    assert fast.histogram == slow.histogram
+    assert sum(fast.histogram) == fast.count
+    for name in ("count", "invalid", "right_angles", "violations", "minimum", "maximum"):
+        assert getattr(fast, name) == getattr(slow, name)
+    assert fast.mean == pytest.approx(slow.mean)
+    assert fast.std == pytest.approx(slow.std)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from submodules.qgis.geometry.segment_index import SegmentIndex, SessionIndex
+
+
+def test_segment_index_nearest():
+    index = SegmentIndex(cell_size=50)
+    index.add_line([(0, 0), (100, 0), (100, 100)])
+    assert index.nearest_vertex(99, 2, tolerance=5) == (5 ** 0.5, (100.0, 0.0))
+    assert index.nearest_segment(50, 2, tolerance=5) == (2.0, (50.0, 0.0), (0.0, 0.0), (100.0, 0.0))
+    assert index.nearest_vertex(50, 20, tolerance=5) is None
+
+
+def test_segment_index_large_segments():
+    index = SegmentIndex(cell_size=1)
+    index.add_segment(-1000, 0, 1000, 0)
+    assert index.nearest_segment(500, 1, tolerance=2)[1] == (500.0, 0.0)
+
+
+def test_segment_index_remove():
+    index = SegmentIndex(cell_size=50)
+    index.add_line([(0, 0), (100, 0), (100, 100)])
+    index.remove_line([(100, 0), (100, 100)])
+    assert len(index) == 1
+    assert index.nearest_segment(101, 50, tolerance=5) is None
+    assert not index.remove_segment(5, 5, 6, 6)
+
+
+class Offset:
+    """ map crs, which is the layer crs shifted by an offset """
+
+    def __init__(self, dx: float):
+        self.dx = dx
+
+    def __call__(self, line):
+        return [(x + self.dx, y) for x, y in line]
+
+
+def test_session_index_crs_switch():
+    to_map = Offset(0)
+    session = SessionIndex(to_map)
+    session.add_line([(0, 0), (100, 0)])
+    assert session.nearest_vertex(100, 1, tolerance=2)[1] == (100, 0)
+
+    # project crs changed: old map coordinates must not be found anymore
+    to_map.dx = 1000
+    session.rebuild()
+    assert session.nearest_vertex(100, 1, tolerance=2) is None
+    assert session.nearest_vertex(1100, 1, tolerance=2)[1] == (1100, 0)
+    assert session.lines == [[(0, 0), (100, 0)]]
+
+    session.remove_line([(0, 0), (100, 0)])
+    assert len(session) == 0
+    assert session.nearest_segment(1050, 0, tolerance=2) is None
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from submodules.qgis.geometry.weld import Welder
+
+
+def test_welder_welds_onto_existing_vertices():
+    welder = Welder(0.03)
+    welder.add_existing([(0, 0), (10, 0)])
+    assert welder.weld([[(10.01, 0), (10.01, 10)]]) == [[(10, 0), (10.01, 10)]]
+    assert welder.welded == 1
+
+
+def test_welder_drops_duplicates():
+    welder = Welder(0.03)
+    welder.add_existing([(0, 0), (10, 0)])
+    assert welder.weld([[(10, 0.01), (0, 0)], [(0, 0), (0, 0.01)]]) == []
+    assert welder.dropped == 2
+
+
+def test_welder_new_lines_are_existing_afterwards():
+    welder = Welder(0.03)
+    assert welder.weld([[(0, 0), (5, 0)]]) == [[(0, 0), (5, 0)]]
+    assert welder.weld([[(0, 0), (5, 0.01)]]) == []
+
+
+def test_welder_remove():
+    welder = Welder(0.03)
+    welder.weld([[(0, 0), (5, 0)]])
+    welder.remove([(0, 0), (5, 0)])
+    assert welder.weld([[(0.01, 0), (5, 0)]]) == [[(0.01, 0), (5, 0)]]
+    assert welder.welded == 0
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        copyright            : (C) 2022 Felix von Studsinske
+        email                : felix.vons@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from qgis.core import QgsSettings
+
+from typing import Any
+
+# group of all plugin settings in QgsSettings
+SETTINGS_GROUP = "EasyRightAngleDraw"
+
+
+def read_setting(key: str, default: Any) -> Any:
+    """ reads a plugin setting, value type is the type of `default` """
+    return QgsSettings().value(f"{SETTINGS_GROUP}/{key}", default, type=type(default))
+
+
+def write_setting(key: str, value: Any):
+    """ writes a plugin setting """
+    QgsSettings().setValue(f"{SETTINGS_GROUP}/{key}", value)
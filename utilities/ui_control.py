@@ -20,8 +20,9 @@ from ..plugin import EasyRightAngleDraw
 def load_tool_bar(plugin: EasyRightAngleDraw):
     """ loads default action for your plugin """
     from qgis.PyQt.QtGui import QIcon
+    from qgis.core import QgsApplication
 
-    from ..modules.draw import RightAngleTool
+    from ..modules.draw import RightAngleTool, undo_last_corner
 
     icon = QIcon(plugin.get_icon_path("icon.png"))
     plugin.draw_action = plugin.add_action(
@@ -35,3 +36,237 @@ def load_tool_bar(plugin: EasyRightAngleDraw):
         True,
         True)
     plugin.draw_action.setCheckable(True)
+
+    tool_tip = ("Zeichnet alle Karteninteraktionen der nächsten Zeichensitzungen auf.\n"
+                f"Die Aufzeichnungen werden in '{plugin.log_dir}' gespeichert und können "
+                "mit 'benchmark.py replay' abgespielt werden.")
+    plugin.record_action = plugin.add_action(
+        "Interaktionen aufzeichnen",
+        QIcon(),
+        False,
+        lambda checked, p=plugin: set_record_events(p, checked),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+    plugin.record_action.setCheckable(True)
+
+    tool_tip = ("Die nächsten Zeichensitzungen werden profiliert (Laufzeit und Speicher).\n"
+                f"Beim Beenden des Werkzeugs werden Profil und Zusammenfassung in '{plugin.log_dir}' gespeichert.")
+    plugin.profile_action = plugin.add_action(
+        "Sitzung profilieren",
+        QIcon(),
+        False,
+        lambda checked, p=plugin: set_profile_session(p, checked),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+    plugin.profile_action.setCheckable(True)
+
+    tool_tip = ("Wird der erste Punkt auf ein Segment gefangen, gibt das Segment die Richtung vor.\n"
+                "Ein rechter Winkel braucht dann nur zwei Klicks, sonst wie gewohnt drei.")
+    plugin.two_click_action = plugin.add_action(
+        "Zwei-Klick-Modus (Richtung aus Segment)",
+        QIcon(),
+        False,
+        lambda checked, p=plugin: set_two_click(p, checked),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+    plugin.two_click_action.setCheckable(True)
+    plugin.two_click_action.setChecked(plugin.two_click)
+
+    tool_tip = ("Für Layer mit geographischem KBS (z.B. EPSG:4326): rechte Winkel werden in einer lokalen\n"
+                "winkeltreuen Projektion (Transversale Mercator) berechnet statt in Grad.")
+    plugin.local_projection_action = plugin.add_action(
+        "Geographische Layer: lokal winkeltreu",
+        QIcon(),
+        False,
+        lambda checked, p=plugin: set_local_projection(p, checked),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+    plugin.local_projection_action.setCheckable(True)
+    plugin.local_projection_action.setChecked(plugin.local_projection)
+
+    tool_tip = ("Für sehr große Linienlayer: Fangindex nur für den sichtbaren Ausschnitt und einen Rand.\n"
+                "Beim Verschieben und Zoomen werden Kacheln nachgeladen, alte Kacheln werden verworfen.")
+    plugin.windowed_action = plugin.add_action(
+        "Fenster-Fangmodus (große Layer)",
+        QIcon(),
+        False,
+        lambda checked, p=plugin: set_windowed_snapping(p, checked),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+    plugin.windowed_action.setCheckable(True)
+    plugin.windowed_action.setChecked(plugin.windowed_snapping)
+
+    tool_tip = ("Entfernt die gespeicherten Fangindizes großer Linienlayer.\n"
+                f"Die Indizes liegen in '{plugin.cache_files}' und werden bei Bedarf neu erstellt.")
+    plugin.add_action(
+        "Fangindex-Cache leeren",
+        QIcon(),
+        False,
+        lambda *_, p=plugin: p.snap_index_cache.clear(),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+
+    tool_tip = ("Ausdrücke für Felder des aktiven Layers, die beim Zeichnen ausgewertet werden\n"
+                "(z.B. $length, now(), @user_account_name). Ohne Ausdruck gilt der Standardwert des Feldes.")
+    plugin.add_action(
+        "Attributausdrücke bearbeiten",
+        QgsApplication.getThemeIcon("mIconExpression.svg"),
+        False,
+        lambda *_, p=plugin: edit_field_expression(p),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+
+    tool_tip = ("Entfernt die Linien der zuletzt gezeichneten Ecke des aktiven Layers.\n"
+                "Mehrfach ausführbar, auch nach dem Beenden des Werkzeugs.")
+    plugin.add_action(
+        "Letzte Ecke rückgängig",
+        QgsApplication.getThemeIcon("mActionUndo.svg"),
+        False,
+        lambda *_, p=plugin: undo_last_corner(p),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+
+    tool_tip = ("Prüft alle Stützpunktwinkel des aktiven Linienlayers (nur lesend) und erzeugt\n"
+                "einen Punktlayer mit fast rechten Winkeln sowie Histogramm und Statistik als Bericht.")
+    plugin.add_action(
+        "Rechte Winkel prüfen",
+        QgsApplication.getThemeIcon("mActionMeasureAngle.svg"),
+        False,
+        lambda *_, p=plugin: p.check_right_angles(),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+
+    tool_tip = ("Nach einem Absturz: schreibt die Features nicht gespeicherter Zeichensitzungen\n"
+                "mit einem Schreibvorgang in ihre Layer.")
+    plugin.add_action(
+        "Zeichensitzungen wiederherstellen",
+        QIcon(),
+        False,
+        lambda *_, p=plugin: p.restore_journals(),
+        True,
+        None,
+        None,
+        True,
+        True,
+        tool_tip=tool_tip)
+
+    if plugin.lifecycle_tracker is not None:
+        tool_tip = ("Entwicklermodus: zählt lebende Werkzeuge, Module und Kartenelemente\n"
+                    "und sucht Objekte, die nach dem Entladen noch referenziert werden.")
+        plugin.add_action(
+            "Lebenszyklus-Bericht",
+            QgsApplication.getThemeIcon("mIconWarning.svg"),
+            False,
+            lambda *_, p=plugin: p.write_lifecycle_report(),
+            True,
+            None,
+            None,
+            True,
+            True,
+            tool_tip=tool_tip)
+
+
+def set_record_events(plugin: EasyRightAngleDraw, checked: bool):
+    """ enables/disables recording of canvas events for new drawing sessions """
+    plugin.record_events = checked
+
+
+def set_profile_session(plugin: EasyRightAngleDraw, checked: bool):
+    """ enables/disables profiling for new drawing sessions """
+    plugin.profile_session = checked
+
+
+def set_two_click(plugin: EasyRightAngleDraw, checked: bool):
+    """ enables/disables the two click mode for new drawing sessions, stored in the settings """
+    from .settings import write_setting
+
+    plugin.two_click = checked
+    write_setting("two_click", checked)
+
+
+def set_local_projection(plugin: EasyRightAngleDraw, checked: bool):
+    """ enables/disables local conformal projections of geographic layers for new drawing sessions,
+        stored in the settings
+    """
+    from .settings import write_setting
+
+    plugin.local_projection = checked
+    write_setting("local_projection", checked)
+
+
+def set_windowed_snapping(plugin: EasyRightAngleDraw, checked: bool):
+    """ enables/disables extent windowed snapping for new drawing sessions, stored in the settings """
+    from .settings import write_setting
+
+    plugin.windowed_snapping = checked
+    write_setting("windowed_snapping", checked)
+
+
+def edit_field_expression(plugin: EasyRightAngleDraw):
+    """ asks for a field of the active layer and its expression, stored in the layer """
+    from qgis.PyQt.QtWidgets import QInputDialog
+    from qgis.core import QgsVectorLayer, QgsExpressionContextUtils
+    from qgis.gui import QgsExpressionBuilderDialog
+
+    from ..submodules.qgis.layer.attributes import field_expressions, set_field_expressions
+
+    layer = plugin.iface.activeLayer()
+    if not isinstance(layer, QgsVectorLayer):
+        plugin.iface.messageBar().pushWarning("Easy Right Angle Drawing", "Bitte einen Layer auswählen")
+        return
+
+    names = layer.dataProvider().fields().names()
+    if not names:
+        return
+
+    expressions = field_expressions(layer)
+    name, ok = QInputDialog.getItem(plugin.iface.mainWindow(), "Attributausdrücke",
+                                    "Feld:", names, 0, False)
+    if not ok:
+        return
+
+    context = QgsExpressionContextUtils.globalProjectLayerScopes(layer)
+    dialog = QgsExpressionBuilderDialog(layer, expressions.get(name, ""), plugin.iface.mainWindow(),
+                                        "generic", context)
+    dialog.setWindowTitle(f"Ausdruck für '{name}' (leer: Standardwert)")
+    if not dialog.exec_():
+        return
+
+    expressions[name] = dialog.expressionText().strip()
+    set_field_expressions(layer, expressions)